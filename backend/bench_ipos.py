@@ -0,0 +1,125 @@
+"""
+Benchmark for the /ipos listing: legacy per-row queries vs the set-based
+listing in services.ipo_queries.
+
+Seeds a throwaway SQLite database (or DATABASE_URL when --url is given) and
+reports query count and p50/p99 latency for both paths.
+
+    python bench_ipos.py --ipos 1000 --points 500 --runs 20
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from models import Base, IPO, GMPPrice
+from services.ipo_queries import fetch_ipo_listing, parse_base_price, growth_percent
+
+def legacy_listing(session):
+    # Previous implementation of main.get_ipos: two GMP queries per IPO
+    result = []
+    for ipo in session.query(IPO).all():
+        latest_gmp = session.query(GMPPrice).filter(GMPPrice.ipo_id == ipo.id).order_by(GMPPrice.updated_at.desc()).first()
+        gmp_val = latest_gmp.price if latest_gmp else 0.0
+        prices = session.query(GMPPrice).filter(GMPPrice.ipo_id == ipo.id).order_by(GMPPrice.updated_at.asc()).limit(20).all()
+        trend_data = [{"price": p.price, "date": p.updated_at.strftime("%Y-%m-%d")} for p in prices]
+        base_price = parse_base_price(ipo.price_band)
+        result.append({
+            "id": ipo.id,
+            "gmp": gmp_val,
+            "growth_percent": growth_percent(gmp_val, base_price),
+            "trend": trend_data,
+        })
+    return result
+
+def seed(engine, n_ipos: int, n_points: int):
+    Base.metadata.create_all(bind=engine)
+    start = datetime.datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(IPO), [
+            {
+                "id": i,
+                "name": f"Bench Company {i}",
+                "ipo_type": "SME" if i % 3 == 0 else "Mainboard",
+                "price_band": f"{90 + i % 50}-{100 + i % 50}",
+                "lot_size": 100,
+                "status": "Open",
+                "kostak_rate": 0.0,
+                "retail_subscription_x": 0.0,
+                "sentiment_bullish": 0,
+                "sentiment_bearish": 0,
+            }
+            for i in range(1, n_ipos + 1)
+        ])
+        batch = []
+        for i in range(1, n_ipos + 1):
+            for j in range(n_points):
+                batch.append({
+                    "ipo_id": i,
+                    "price": float((i + j) % 40),
+                    "updated_at": start + datetime.timedelta(hours=j),
+                })
+            if len(batch) >= 50000:
+                conn.execute(insert(GMPPrice), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(GMPPrice), batch)
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+def run(label, fn, Session, counter, runs: int):
+    timings = []
+    queries = 0
+    for _ in range(runs):
+        session = Session()
+        counter["n"] = 0
+        t0 = time.perf_counter()
+        fn(session)
+        timings.append((time.perf_counter() - t0) * 1000)
+        queries = counter["n"]
+        session.close()
+    print(f"{label:<12} queries={queries:<6} p50={percentile(timings, 50):9.1f}ms  "
+          f"p99={percentile(timings, 99):9.1f}ms  (runs={runs})")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ipos", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--legacy-runs", type=int, default=3, help="the N+1 path is slow; fewer runs by default")
+    parser.add_argument("--url", default=None, help="database URL to seed (defaults to a temp SQLite file)")
+    args = parser.parse_args()
+
+    tmpdir = None
+    url = args.url
+    if not url:
+        tmpdir = tempfile.mkdtemp()
+        url = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    engine = create_engine(url)
+    counter = {"n": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_queries(*_):
+        counter["n"] += 1
+
+    print(f"Seeding {args.ipos} IPOs x {args.points} GMP rows into {url} ...")
+    seed(engine, args.ipos, args.points)
+    Session = sessionmaker(bind=engine)
+
+    run("legacy", legacy_listing, Session, counter, args.legacy_runs)
+    run("set-based", fetch_ipo_listing, Session, counter, args.runs)
+
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark for encoding the /ipos payload: FastAPI's default path
+(jsonable_encoder + json.dumps, what JSONResponse does) vs
+services.json_response.dumps, and the wire size of the body with each
+compression the API can send. No database needed; the rows are shaped
+like snapshot_to_dict output with a full trend each.
+
+    python bench_json.py --ipos 2000 --runs 50
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from services.json_response import dumps, compress, brotli, orjson
+from services.ipo_queries import TREND_POINTS
+
+def listing_payload(n_ipos: int) -> list:
+    rng = random.Random(7)
+    start = datetime.date(2026, 1, 1)
+    rows = []
+    for i in range(1, n_ipos + 1):
+        base_price = float(rng.randint(50, 1500))
+        gmp = float(rng.randint(-20, 300))
+        listing = start + datetime.timedelta(days=i % 300)
+        rows.append({
+            "id": i,
+            "name": f"Bench Company {i} Limited",
+            "symbol": f"BENCH{i}",
+            "ipo_type": "SME" if i % 3 == 0 else "Mainboard",
+            "gmp": gmp,
+            "growth_percent": round(gmp / base_price * 100, 2),
+            "listing_date": listing.isoformat(),
+            "base_price": base_price,
+            "status": ["Open", "Upcoming", "Closed"][i % 3],
+            "price_band": f"₹{base_price - 10:.0f}-₹{base_price:.0f}",
+            "type": "SME" if i % 3 == 0 else "Mainboard",
+            "trend": [
+                {"price": float(rng.randint(0, 300)), "date": (listing - datetime.timedelta(days=TREND_POINTS - j)).isoformat()}
+                for j in range(TREND_POINTS)
+            ],
+            "lot_size": rng.choice([10, 50, 100, 1200]),
+            "kostak_rate": 0.0,
+            "retail_subscription_x": round(rng.random() * 80, 2),
+            "allotment_url": None,
+            "sentiment_bullish": rng.randint(0, 500),
+            "sentiment_bearish": rng.randint(0, 500),
+        })
+    return rows
+
+def default_encode(payload) -> bytes:
+    # starlette.responses.JSONResponse.render after FastAPI's serialize_response
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def timed(fn, payload, runs: int):
+    timings = []
+    body = b""
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        body = fn(payload)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), body
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ipos", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    payload = listing_payload(args.ipos)
+    print(f"/ipos payload: {args.ipos} IPOs x {TREND_POINTS} trend points "
+          f"(orjson {'on' if orjson else 'missing'}, brotli {'on' if brotli else 'missing'})")
+
+    default_ms, default_body = timed(default_encode, payload, args.runs)
+    fast_ms, fast_body = timed(dumps, payload, args.runs)
+    assert json.loads(default_body) == json.loads(fast_body)
+    print(f"{'encode':<10} default={default_ms:8.2f}ms  dumps={fast_ms:8.2f}ms  ({default_ms / fast_ms:.1f}x)")
+
+    print(f"{'identity':<10} {len(fast_body):>10,} bytes")
+    for encoding in ["gzip"] + (["br"] if brotli else []):
+        ms, body = timed(lambda b: compress(b, encoding), fast_body, max(1, args.runs // 5))
+        print(f"{encoding:<10} {len(body):>10,} bytes  ({len(body) / len(fast_body):.1%}, {ms:.2f}ms, once per cached version)")
+
+if __name__ == "__main__":
+    main()
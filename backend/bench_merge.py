@@ -0,0 +1,110 @@
+"""
+Benchmark for the fuzzy name-matching step of the merger: the previous
+extractOne-over-every-group loop vs services.name_index.NameIndex.
+
+For each size N it scrapes N names as three sources would (with spelling
+variants), groups them, and matches them against N names already "in the
+DB". No database or network needed.
+
+    python bench_merge.py --sizes 100 1000 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rapidfuzz import process, fuzz
+from scrapers.base import ScrapedIPOData
+from scrapers.utils import normalize_name
+from services.ipo_merger import group_by_name
+from services.name_index import strict_name_index
+
+# Words shared by many Indian company names
+COMMON = ["shree", "sai", "om", "maa", "global", "national", "india", "bharat", "new", "united"]
+KINDS = ["technologies", "foods", "infra", "pharma", "textiles", "logistics", "finance", "energy",
+         "polymers", "motors", "industries", "agro", "chemicals", "steel", "realty"]
+SYLLABLES = ["ka", "ra", "vi", "na", "sh", "ta", "mi", "lo", "de", "pa", "ru", "ga", "jo", "ne", "ti", "sa", "ba", "ko"]
+
+def distinct_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+def company_names(n: int, rng: random.Random):
+    names = set()
+    while len(names) < n:
+        parts = [distinct_word(rng), rng.choice(KINDS)]
+        if rng.random() < 0.5:
+            parts.insert(0, rng.choice(COMMON))
+        names.add(" ".join(p.title() for p in parts))
+    return sorted(names)
+
+def variants(name: str, rng: random.Random):
+    # How the three sources tend to spell the same company
+    typo = name
+    if rng.random() < 0.3:
+        i = rng.randrange(1, len(name) - 1)
+        typo = name[:i] + name[i + 1:]
+    return [f"{name} Ltd", f"{name} Limited IPO", typo]
+
+def legacy_group(items):
+    # Previous scrape_and_merge grouping loop
+    grouped = {}
+    for item in items:
+        norm = normalize_name(item.name)
+        if not norm: continue
+        if norm in grouped:
+            grouped[norm].append(item)
+            continue
+        existing_keys = list(grouped.keys())
+        if existing_keys:
+            match = process.extractOne(norm, existing_keys, scorer=fuzz.token_set_ratio)
+            if match and match[1] > 85:
+                grouped[match[0]].append(item)
+                continue
+        grouped[norm] = [item]
+    return grouped
+
+def legacy_db_match(grouped, db_names):
+    # Previous DB lookup: exact normalized-name hits only
+    existing_map = {normalize_name(n): i for i, n in enumerate(db_names)}
+    return {key: existing_map[key] for key in grouped if key in existing_map}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--legacy-max", type=int, default=10000, help="skip the O(n^2) path above this size")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        rng = random.Random(n)
+        names = company_names(n, rng)
+        items = [ScrapedIPOData(name=v, ipo_type="Mainboard", source="bench") for name in names for v in variants(name, rng)]
+        rng.shuffle(items)
+        # Half of the companies are already in the DB, under their bare name
+        db_names = names[: n // 2]
+
+        print(f"\n{n} companies, {len(items)} scraped rows, {len(db_names)} known in DB")
+
+        if n <= args.legacy_max:
+            t0 = time.perf_counter()
+            grouped = legacy_group(items)
+            matched = legacy_db_match(grouped, db_names)
+            print(f"  legacy     {time.perf_counter() - t0:8.2f}s  groups={len(grouped):<6} matched in DB={len(matched)}")
+        else:
+            print("  legacy     skipped")
+
+        t0 = time.perf_counter()
+        known = strict_name_index()
+        for i, name in enumerate(db_names):
+            known.add(normalize_name(name), i)
+        load_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        grouped, matched = group_by_name(items, known)
+        print(f"  name index {time.perf_counter() - t0:8.2f}s  groups={len(grouped):<6} matched in DB={len(matched)}"
+              f"  (index load {load_time:.2f}s, once per process)")
+
+if __name__ == "__main__":
+    main()
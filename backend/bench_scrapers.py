@@ -0,0 +1,103 @@
+"""
+Benchmark for scraper table extraction against the saved pages in
+fixtures/: per-cell locator round trips vs one page.evaluate call vs
+page.content() parsed with scrapers.tables.parse_html_tables.
+
+Needs Chromium (`playwright install chromium`) but no network.
+
+    python bench_scrapers.py --runs 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from playwright.async_api import async_playwright
+from scrapers.tables import extract_tables, parse_html_tables
+from scrapers.chittorgarh import ChittorgarhScraper
+from scrapers.ipowatch import IPOWatchScraper
+from scrapers.investorgain import InvestorGainScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+SCRAPERS = [ChittorgarhScraper(), IPOWatchScraper(), InvestorGainScraper()]
+
+async def locator_tables(page, counter):
+    # Previous approach: one IPC round trip per table, row, cell and anchor
+    tables = []
+    for table in await page.locator("table").all():
+        headers = await table.locator("thead tr th").all_inner_texts()
+        tr_count = await table.locator("tr").count()
+        counter["calls"] += 3
+        rows = []
+        for row in await table.locator("tbody tr").all():
+            cells = []
+            for cell in await row.locator("td").all():
+                anchor = cell.locator("a").first
+                link = (await anchor.inner_text()).strip() if await anchor.count() > 0 else None
+                cells.append({"text": (await cell.inner_text()).strip(), "link": link})
+                counter["calls"] += 3 if link is not None else 2
+            rows.append(cells)
+            counter["calls"] += 1
+        tables.append({"headers": [h.strip() for h in headers], "tr_count": tr_count, "rows": rows})
+    return tables
+
+async def evaluate_tables(page, counter):
+    counter["calls"] += 1
+    return await extract_tables(page)
+
+async def content_tables(page, counter):
+    counter["calls"] += 1
+    return parse_html_tables(await page.content())
+
+def records(scraper, tables):
+    # Suppress the scrapers' progress prints
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        data = scraper.parse_tables(tables)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return [d.model_dump(exclude={"gmp_updated"}) for d in data]
+
+async def main(runs: int):
+    paths = [("locators", locator_tables), ("evaluate", evaluate_tables), ("content+parse", content_tables)]
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+
+        for scraper in SCRAPERS:
+            with open(os.path.join(FIXTURES_DIR, f"{scraper.source}.html"), encoding="utf-8") as f:
+                html = f.read()
+            await page.set_content(html)
+
+            print(f"\n{scraper.source} ({len(html) // 1024} KB)")
+            baseline = None
+            for label, extract in paths:
+                timings = []
+                for _ in range(runs):
+                    counter = {"calls": 0}
+                    t0 = time.perf_counter()
+                    tables = await extract(page, counter)
+                    result = records(scraper, tables)
+                    timings.append((time.perf_counter() - t0) * 1000)
+
+                if baseline is None:
+                    baseline = result
+                same = "same records" if result == baseline else "RECORDS DIFFER"
+                print(f"  {label:<14} round trips={counter['calls']:<6} median={statistics.median(timings):8.1f}ms  "
+                      f"{len(result)} records, {same}")
+
+        await browser.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs))
@@ -0,0 +1,93 @@
+"""
+Shared test harness: a throwaway SQLite database, and the canned scrape the
+merger tests run against. Test modules import these directly, so each one
+still runs on its own with `python test_x.py`.
+"""
+import os
+import tempfile
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from migrations import run_migrations
+from scrapers.base import ScrapedIPOData
+from scrapers.runner import ScrapeResult
+from services.gmp_writer import GMPChangeWriter
+import services.ipo_merger as merger
+
+class TempDB:
+    """
+    A SQLite database in a temporary file, migrated unless `migrate` is
+    false. Extra keyword arguments go to create_engine. Use it as a context
+    manager, or call close().
+    """
+    def __init__(self, migrate: bool = True, **engine_args):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.engine = create_engine(f"sqlite:///{self.path}", **engine_args)
+        if migrate:
+            run_migrations(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.engine.dispose()
+        os.remove(self.path)
+
+SCRAPED = {
+    "ipowatch": [
+        dict(name="Alpha Tech Ltd", ipo_type="Mainboard", price_band="₹100", gmp=42.0,
+             open_date="2026-10-15", close_date="2026-10-20"),
+        dict(name="Beta Foods IPO", ipo_type="SME", price_band="₹50", gmp=5.0),
+    ],
+    "investorgain": [
+        dict(name="Alpha Tech Limited", ipo_type="Mainboard", price_band="95-100", gmp=40.0),
+    ],
+    "chittorgarh": [
+        dict(name="Alpha Tech", ipo_type="Mainboard", price_band="95-100", lot_size=150,
+             open_date="2026-10-15", close_date="2026-10-20", listing_date="2026-10-23"),
+    ],
+}
+
+def fake_run_scrapers(scrapers):
+    return [
+        ScrapeResult(source=s.source, seconds=0.0,
+                     records=[ScrapedIPOData(source=s.source, **item) for item in SCRAPED.get(s.source, [])])
+        for s in scrapers
+    ]
+
+class MergerEnv(TempDB):
+    """
+    A TempDB the merger scrapes SCRAPED into, with fresh merger caches.
+    Statements run by the last merge() are in `statements`.
+    """
+    def __init__(self):
+        super().__init__()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.count)
+
+        self.original = (merger.run_scrapers, merger.known_names, merger.gmp_writer, merger.source_records)
+        merger.run_scrapers = fake_run_scrapers
+        merger.known_names = merger.KnownIPONames()
+        merger.gmp_writer = GMPChangeWriter()
+        merger.source_records = {}
+
+    def count(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def merge(self, sources=None):
+        session = self.Session()
+        try:
+            self.statements.clear()
+            return merger.IPOMergerService(session).scrape_and_merge(sources)
+        finally:
+            session.close()
+
+    def close(self):
+        merger.run_scrapers, merger.known_names, merger.gmp_writer, merger.source_records = self.original
+        super().close()
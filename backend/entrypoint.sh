@@ -5,6 +5,14 @@ set -e
 echo "Initializing database..."
 python init_db.py
 
+# Start the scheduler worker next to the API unless it runs as its own
+# service (RUN_WORKER=false). Extra workers are harmless: only the one
+# holding the scheduler lease runs jobs.
+if [ "${RUN_WORKER:-true}" = "true" ]; then
+    echo "Starting worker..."
+    python worker.py &
+fi
+
 # Start the server
 echo "Starting server..."
-exec uvicorn main:app --host 0.0.0.0 --port 8000
+exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers "${WEB_CONCURRENCY:-1}"
@@ -4,13 +4,22 @@ import os
 # Ensure backend directory is in python path if run from root
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from models import engine, Base, IPO, GMPPrice, MarketIndex
+from models import engine, Session
+from services.snapshot import ensure_snapshots
+from worker import migrate
 
 def init_db():
     print(f"Initializing database with engine: {engine.url}")
     try:
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully.")
+        # Under the migrations lease, like the workers it may race with
+        migrate()
+        print("Database tables created and migrated successfully.")
+
+        session = Session()
+        try:
+            ensure_snapshots(session)
+        finally:
+            session.close()
     except Exception as e:
         print(f"Error creating database tables: {e}")
         sys.exit(1)
@@ -1,20 +1,35 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Depends
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy.orm import Session
-from apscheduler.schedulers.background import BackgroundScheduler
-from models import engine, Base, Session as DBSession, IPO, GMPPrice, MarketIndex
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Session as DBSession, get_session, get_async_session, MarketIndex
+import asyncio
 import uvicorn
 import datetime
-from pydantic import BaseModel
-
-# Import Merger Service
-from services.ipo_merger import IPOMergerService
-from services.market_data import update_market_data
-
-# Initialize DB
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from services.snapshot import fetch_snapshot_listing, fetch_snapshot_page, LISTING_FIELDS, MAX_PAGE_SIZE
+from services.json_response import FastJSONResponse, COMPRESS_MIN_BYTES
+from services.response_cache import response_cache, WithHeaders
+from services.data_version import (
+    DataVersionWatcher, ipo_data_version, IPOS_SCOPE, MARKET_SCOPE, SENTIMENT_SCOPE, IPO_DATA_SCOPE,
+)
+from services.db_metrics import render_metrics
+from services.gmp_history import RESOLUTIONS
+from services.ipo_detail import build_ipo_detail, ipo_detail_cache
+from services.vote_buffer import vote_buffer, VOTE_TYPES
+from services.predictions import predict_batch, Scenario, MAX_BATCH_SCENARIOS, MAX_LOTS
+from services.analytics import analytics_store, screen, SORT_FIELDS
+from services.live_updates import LiveBroker
+from services.export import export_ipos, export_gmp, FORMATS as EXPORT_FORMATS
+
+# API processes only serve reads (and votes). Migrations and the scheduled
+# jobs run in init_db.py and worker.py; writes made there reach the caches
+# here through data_versions.
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # CORS
 app.add_middleware(
@@ -23,265 +38,262 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
-
-# --- TASKS ---
-def scrape_job():
-    print("Running scheduled scrape...")
-    session = DBSession()
-    try:
-        service = IPOMergerService(session)
-        service.scrape_and_merge()
-    except Exception as e:
-        print(f"Scrape Job Failed: {e}")
-    finally:
-        session.close()
-
-def market_data_job():
-    print("Running market data update...")
-    session = DBSession()
-    try:
-        update_market_data(session)
-    except Exception as e:
-        print(f"Market Data Update Failed: {e}")
-    finally:
-        session.close()
-
-scheduler = BackgroundScheduler()
-# Schedule every hour
-scheduler.add_job(scrape_job, 'interval', hours=1)
-scheduler.add_job(market_data_job, 'interval', hours=1)
-scheduler.start()
+# Cached responses come compressed already (see response_cache); this
+# covers the rest
+app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES)
 
 # --- ROUTES ---
 
 @app.get("/")
-def read_root():
-    return {"status": "ok", "service": "IPO Tracker Pro API"}
+async def read_root():
+    return FastJSONResponse({"status": "ok", "service": "IPO Tracker Pro API"})
+
+def split_param(value: Optional[str]) -> Optional[list]:
+    if value is None:
+        return None
+    return [v.strip() for v in value.split(",") if v.strip()]
 
 @app.get("/ipos")
-def get_ipos():
-    session = DBSession()
-    try:
-        # Get all IPOs
-        ipos = session.query(IPO).all()
-        result = []
-        for ipo in ipos:
-            # Get latest GMP
-            latest_gmp = session.query(GMPPrice).filter(GMPPrice.ipo_id == ipo.id).order_by(GMPPrice.updated_at.desc()).first()
-            gmp_val = latest_gmp.price if latest_gmp else 0.0
-
-            # Trend (last 7 days)
-            trend_data = []
-            prices = session.query(GMPPrice).filter(GMPPrice.ipo_id == ipo.id).order_by(GMPPrice.updated_at.asc()).limit(20).all()
-            for p in prices:
-                trend_data.append({"price": p.price, "date": p.updated_at.strftime("%Y-%m-%d")})
-
-            # Calculate growth
-            base_price = 0.0
-            try:
-                # Clean price band to get base price (e.g., "100-120" -> 120, "100" -> 100)
-                if ipo.price_band:
-                    parts = ipo.price_band.split("-")
-                    base_price = float(parts[-1].strip().replace("₹", "").replace(",", ""))
-            except:
-                pass
-
-            growth_pct = 0.0
-            if base_price > 0:
-                growth_pct = round((gmp_val / base_price) * 100, 2)
-
-            result.append({
-                "id": ipo.id,
-                "name": ipo.name,
-                "symbol": ipo.symbol,
-                "ipo_type": ipo.ipo_type,
-                "gmp": gmp_val,
-                "growth_percent": growth_pct,
-                "listing_date": ipo.listing_date,
-                "base_price": base_price,
-                "status": ipo.status,
-                "price_band": ipo.price_band,
-                "type": ipo.ipo_type,
-                "trend": trend_data,
-                "lot_size": ipo.lot_size,
-                "kostak_rate": ipo.kostak_rate,
-                "retail_subscription_x": ipo.retail_subscription_x,
-                "allotment_url": ipo.allotment_url,
-                "sentiment_bullish": ipo.sentiment_bullish,
-                "sentiment_bearish": ipo.sentiment_bearish
-            })
-        return result
-    finally:
-        session.close()
+async def get_ipos(request: Request, status: Optional[str] = None, ipo_type: Optional[str] = None,
+             open_from: Optional[datetime.date] = None, open_to: Optional[datetime.date] = None,
+             fields: Optional[str] = None, cursor: Optional[int] = None, limit: Optional[int] = None,
+             session: AsyncSession = Depends(get_async_session)):
+    # status, ipo_type and fields take comma separated lists. With `limit`
+    # the next page's cursor comes back in the X-Next-Cursor header.
+    fields = split_param(fields)
+    if fields:
+        unknown = [f for f in fields if f not in LISTING_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    # The session only checks out a connection when a cache miss queries
+    async def build():
+        rows, next_cursor = await session.run_sync(
+            fetch_snapshot_page, fields=fields, status=split_param(status), ipo_type=split_param(ipo_type),
+            open_from=open_from, open_to=open_to, after=cursor, limit=limit,
+        )
+        if next_cursor is None:
+            return rows
+        return WithHeaders(rows, {"X-Next-Cursor": str(next_cursor)})
+
+    return await response_cache.respond_async(request, IPOS_SCOPE, build)
+
+@app.get("/ipos/{ipo_id}")
+async def get_ipo_detail(ipo_id: int, request: Request, resolution: Optional[str] = None, days: Optional[int] = None,
+                         session: AsyncSession = Depends(get_async_session)):
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    if days is not None and days <= 0:
+        raise HTTPException(status_code=400, detail="days must be positive")
+
+    async def build():
+        return await session.run_sync(build_ipo_detail, ipo_id, resolution, days)
+
+    response = await ipo_detail_cache.respond_async(request, ipo_id, (resolution, days), build)
+    if response is None:
+        raise HTTPException(status_code=404, detail="IPO not found")
+    return response
+
+@app.get("/analytics")
+async def get_analytics(request: Request, status: Optional[str] = None, ipo_type: Optional[str] = None,
+                        sort: Optional[str] = None, limit: Optional[int] = None,
+                        session: AsyncSession = Depends(get_async_session)):
+    # GMP statistics of every IPO; status and ipo_type take comma separated
+    # lists, sort names a column to order by (descending)
+    if sort is not None and sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_FIELDS)}")
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    # No vote counts in here, so votes leave the frame and responses cached
+    async def build():
+        frame = await session.run_sync(analytics_store.frame, response_cache.version(IPO_DATA_SCOPE))
+        return screen(frame, split_param(status), split_param(ipo_type), sort, limit)
+
+    return await response_cache.respond_async(request, IPO_DATA_SCOPE, build)
 
 @app.get("/market-indices")
-def get_indices():
-    session = DBSession()
-    try:
-        indices = session.query(MarketIndex).all()
-        if not indices:
-             # Fallback to mock if empty (or return empty list)
-             return []
-
-        result = []
-        # Sort so NIFTY 50 and SENSEX are first
-        def sort_key(x):
-            if x.name == "NIFTY 50": return 0
-            if x.name == "SENSEX": return 1
-            return 2
-
-        sorted_indices = sorted(indices, key=sort_key)
-
-        for idx in sorted_indices:
-            result.append({
-                "name": idx.name,
-                "price": idx.current_price,
-                "percent": idx.change_percent,
-                "is_positive": idx.change_percent >= 0
-            })
-        return result
-    finally:
-        session.close()
+async def get_indices(request: Request, session: AsyncSession = Depends(get_async_session)):
+    async def build():
+        return await session.run_sync(fetch_indices)
+
+    return await response_cache.respond_async(request, MARKET_SCOPE, build)
+
+def fetch_indices(session: Session):
+    indices = session.query(MarketIndex).all()
+    if not indices:
+         # Fallback to mock if empty (or return empty list)
+         return []
+
+    result = []
+    # Sort so NIFTY 50 and SENSEX are first
+    def sort_key(x):
+        if x.name == "NIFTY 50": return 0
+        if x.name == "SENSEX": return 1
+        return 2
+
+    sorted_indices = sorted(indices, key=sort_key)
+
+    for idx in sorted_indices:
+        result.append({
+            "name": idx.name,
+            "price": idx.current_price,
+            "percent": idx.change_percent,
+            "is_positive": idx.change_percent >= 0
+        })
+    return result
 
 # --- PREDICTION ENDPOINTS ---
 
 class ProfitRequest(BaseModel):
     ipo_id: int
-    lots: int
-
-@app.post("/predict/profit")
-def predict_profit(req: ProfitRequest):
-    session = DBSession()
-    try:
-        ipo = session.query(IPO).filter(IPO.id == req.ipo_id).first()
-        if not ipo:
-            raise HTTPException(status_code=404, detail="IPO not found")
-
-        # Get latest GMP
-        latest_gmp = session.query(GMPPrice).filter(GMPPrice.ipo_id == ipo.id).order_by(GMPPrice.updated_at.desc()).first()
-        gmp_val = latest_gmp.price if latest_gmp else 0.0
-
-        # Try to determine lot size
-        lot_size = ipo.lot_size
-
-        # Heuristic for lot size if 0
-        base_price = 0.0
-        try:
-             if ipo.price_band:
-                parts = ipo.price_band.split("-")
-                base_price = float(parts[-1].strip().replace("₹", "").replace(",", ""))
-        except:
-             pass
-
-        if lot_size == 0 and base_price > 0:
-            # Standard IPO lot is ~15000 INR
-            lot_size = int(15000 / base_price)
-        elif lot_size == 0:
-            lot_size = 1 # Fallback
-
-        total_profit = gmp_val * lot_size * req.lots
-        investment = base_price * lot_size * req.lots
-
-        return {
-            "ipo_name": ipo.name,
-            "estimated_profit": total_profit,
-            "investment_amount": investment,
-            "gmp": gmp_val,
-            "lot_size": lot_size,
-            "lots": req.lots
-        }
-    finally:
-        session.close()
+    lots: int = Field(ge=1, le=MAX_LOTS)
 
 class AllotmentRequest(BaseModel):
     ipo_id: int
     category: str # "RII", "HNI"
-    lots_applied: int
+    lots_applied: int = Field(ge=1, le=MAX_LOTS)
 
-class VoteRequest(BaseModel):
-    vote_type: str # "bullish" | "bearish"
+class ScenarioRequest(BaseModel):
+    ipo_id: int
+    lots: int = Field(1, ge=1, le=MAX_LOTS)
+    category: str = "RII"
 
-@app.post("/ipos/{ipo_id}/vote")
-def vote_sentiment(ipo_id: int, req: VoteRequest):
-    session = DBSession()
-    try:
-        ipo = session.query(IPO).filter(IPO.id == ipo_id).first()
-        if not ipo:
-            raise HTTPException(status_code=404, detail="IPO not found")
-
-        if req.vote_type == "bullish":
-            ipo.sentiment_bullish += 1
-        elif req.vote_type == "bearish":
-            ipo.sentiment_bearish += 1
-        else:
-            raise HTTPException(status_code=400, detail="Invalid vote type")
+class BatchPredictionRequest(BaseModel):
+    scenarios: List[ScenarioRequest]
+
+def predict_one(session: Session, scenario: Scenario) -> dict:
+    result = predict_batch(session, [scenario])[0]
+    if result is None:
+        raise HTTPException(status_code=404, detail="IPO not found")
+    return result
 
-        session.commit()
-        return {
-            "status": "success",
-            "bullish": ipo.sentiment_bullish,
-            "bearish": ipo.sentiment_bearish
-        }
-    finally:
-        session.close()
+@app.post("/predict/profit")
+def predict_profit(req: ProfitRequest, session: Session = Depends(get_session)):
+    return FastJSONResponse(predict_one(session, Scenario(req.ipo_id, req.lots))["profit"])
 
 @app.post("/predict/allotment")
-def predict_allotment(req: AllotmentRequest):
-    session = DBSession()
+def predict_allotment(req: AllotmentRequest, session: Session = Depends(get_session)):
+    return FastJSONResponse(predict_one(session, Scenario(req.ipo_id, req.lots_applied, req.category))["allotment"])
+
+@app.post("/predict/batch")
+def predict_batch_route(req: BatchPredictionRequest, session: Session = Depends(get_session)):
+    # Profit and allotment for every scenario, in request order. Unknown
+    # IPOs get an error entry instead of failing the whole batch.
+    if len(req.scenarios) > MAX_BATCH_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SCENARIOS} scenarios per request")
+
+    scenarios = [Scenario(s.ipo_id, s.lots, s.category) for s in req.scenarios]
+    results = []
+    for scenario, result in zip(scenarios, predict_batch(session, scenarios)):
+        entry = scenario._asdict()
+        if result is None:
+            entry["error"] = "IPO not found"
+        else:
+            entry.update(result)
+        results.append(entry)
+    return FastJSONResponse({"results": results})
+
+class VoteRequest(BaseModel):
+    vote_type: str # "bullish" | "bearish"
+
+@app.post("/ipos/{ipo_id}/vote")
+async def vote_sentiment(ipo_id: int, req: VoteRequest, session: AsyncSession = Depends(get_async_session)):
+    # Counted in memory and written by the vote flusher; only the first
+    # vote for an IPO in this process reads the database
+    if req.vote_type not in VOTE_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid vote type")
+    if not vote_buffer.known(ipo_id) and not await session.run_sync(vote_buffer.load, ipo_id):
+        raise HTTPException(status_code=404, detail="IPO not found")
+
+    bullish, bearish = vote_buffer.add(ipo_id, req.vote_type)
+    return FastJSONResponse({
+        "status": "success",
+        "bullish": bullish,
+        "bearish": bearish
+    })
+
+@app.get("/stream")
+async def stream_updates(channels: Optional[str] = None):
+    # Server-Sent Events: a snapshot of each channel ("ipos", "market"),
+    # then a diff event whenever the worker or a vote flush changes it
+    names = split_param(channels) or list(live_broker.channels)
+    unknown = [n for n in names if n not in live_broker.channels]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown channels: {', '.join(unknown)}")
+    return StreamingResponse(live_broker.stream(names), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- EXPORTS ---
+
+def export_response(name: str, export, format: str, ipo_id: Optional[str],
+                    start: Optional[datetime.date], end: Optional[datetime.date]) -> StreamingResponse:
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
     try:
-        ipo = session.query(IPO).filter(IPO.id == req.ipo_id).first()
-        if not ipo:
-            raise HTTPException(status_code=404, detail="IPO not found")
-
-        latest_gmp = session.query(GMPPrice).filter(GMPPrice.ipo_id == ipo.id).order_by(GMPPrice.updated_at.desc()).first()
-        gmp_val = latest_gmp.price if latest_gmp else 0.0
-
-        base_price = 0.0
-        try:
-             if ipo.price_band:
-                parts = ipo.price_band.split("-")
-                base_price = float(parts[-1].strip().replace("₹", "").replace(",", ""))
-        except:
-             pass
-
-        growth_pct = 0.0
-        if base_price > 0:
-            growth_pct = (gmp_val / base_price) * 100
-
-        # Heuristic Probability
-        probability = "High"
-        details = "Low demand expected, allotment likely."
-
-        if growth_pct > 50:
-            probability = "Very Low"
-            details = f"GMP is very high ({growth_pct:.1f}%). Oversubscription likely > 50x. Lottery basis."
-        elif growth_pct > 20:
-            probability = "Low"
-             # 1 lot vs multiple lots logic for Retail (RII usually 1 lot max benefit in oversub)
-            if req.category == "RII" and req.lots_applied > 1:
-                 details = "High demand. Applying for >1 lot in Retail usually doesn't increase chance (1 lot lottery)."
-            else:
-                 details = "Moderate to High demand. Lottery basis likely."
-        elif growth_pct < 5:
-            probability = "High"
-            details = "Low GMP suggests low subscription interest."
-
-        return {
-            "ipo_name": ipo.name,
-            "probability": probability,
-            "reasoning": details,
-            "category": req.category
-        }
-
-    finally:
-        session.close()
+        ipo_ids = [int(v) for v in split_param(ipo_id) or []]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ipo_id must be a comma separated list of ids")
+
+    # A sync generator: each chunk runs on the threadpool, so a long
+    # download does not hold a worker thread between chunks
+    body = export(DBSession, format, ipo_ids=ipo_ids, start=start, end=end)
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format], headers={
+        "Content-Disposition": f'attachment; filename="{name}.{format}"',
+    })
+
+@app.get("/export/ipos")
+async def export_ipos_route(format: str = "ndjson", ipo_id: Optional[str] = None,
+                            start: Optional[datetime.date] = None, end: Optional[datetime.date] = None):
+    # start/end bound the open date
+    return export_response("ipos", export_ipos, format, ipo_id, start, end)
+
+@app.get("/export/gmp")
+async def export_gmp_route(format: str = "ndjson", ipo_id: Optional[str] = None,
+                           start: Optional[datetime.date] = None, end: Optional[datetime.date] = None):
+    # Every stored GMP point (raw, hourly, daily) by IPO and time
+    return export_response("gmp", export_gmp, format, ipo_id, start, end)
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+def apply_data_version(scope: str, version: int):
+    response_cache.set_version(scope, version)
+    if scope in (IPOS_SCOPE, SENTIMENT_SCOPE):
+        # The watcher's versions already include every scope of this poll
+        response_cache.set_version(IPO_DATA_SCOPE, ipo_data_version(data_versions.versions))
+        ipo_detail_cache.follow_versions(data_versions.versions, DBSession)
+
+def apply_vote_flush(ipo_ids: list, version: int):
+    response_cache.set_version(IPOS_SCOPE, version)
+    ipo_detail_cache.invalidate(ipo_ids)
+
+live_broker = LiveBroker(DBSession, {
+    IPOS_SCOPE: (fetch_snapshot_listing, "id"),
+    MARKET_SCOPE: (fetch_indices, "name"),
+})
+
+data_versions = DataVersionWatcher(DBSession)
+data_versions.subscribe(apply_data_version)
+data_versions.subscribe(live_broker.notify)
+vote_buffer.subscribe(apply_vote_flush)
 
 @app.on_event("startup")
-def startup_event():
-    # Trigger a scrape shortly after startup
-    scheduler.add_job(scrape_job, 'date', run_date=datetime.datetime.now() + datetime.timedelta(seconds=5))
-    scheduler.add_job(market_data_job, 'date', run_date=datetime.datetime.now() + datetime.timedelta(seconds=10))
+async def startup_event():
+    live_broker.start(asyncio.get_running_loop())
+    data_versions.start()
+    vote_buffer.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    live_broker.stop()
+    vote_buffer.stop()
+    data_versions.stop()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,129 @@
+"""
+Schema changes that create_all cannot make on an existing database (new
+columns, indexes, type changes, data fixes). Each migration runs once, in
+order, and is recorded in the schema_migrations table.
+
+    python migrations.py
+"""
+import sys
+import os
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text, Date
+from models import engine as default_engine, Base
+from scrapers.utils import normalize_name
+from services.ipo_queries import parse_price_band, to_date
+
+def _columns(conn, table: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+# --- MIGRATIONS ---
+
+def add_ipo_name_key(conn):
+    # Unique normalized name, the conflict target of the merger's upsert
+    if "name_key" not in _columns(conn, "ipos"):
+        conn.execute(text("ALTER TABLE ipos ADD COLUMN name_key VARCHAR"))
+
+    taken = {row[0] for row in conn.execute(text("SELECT name_key FROM ipos WHERE name_key IS NOT NULL"))}
+    updates = []
+    for ipo_id, name in conn.execute(text("SELECT id, name FROM ipos WHERE name_key IS NULL ORDER BY id")):
+        key = normalize_name(name)
+        # Older duplicates keep a NULL key; the name index still finds them
+        if key and key not in taken:
+            taken.add(key)
+            updates.append({"id": ipo_id, "key": key})
+    if updates:
+        conn.execute(text("UPDATE ipos SET name_key = :key WHERE id = :id"), updates)
+
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_ipos_name_key ON ipos (name_key)"))
+
+def compact_gmp_runs(conn):
+    # Drop samples repeating the previous value of the same IPO, keeping the
+    # first of each run and each IPO's latest sample
+    result = conn.execute(text(
+        "DELETE FROM gmp_prices WHERE id IN ("
+        " SELECT id FROM ("
+        "  SELECT id, price,"
+        "   LAG(price) OVER (PARTITION BY ipo_id ORDER BY updated_at, id) AS prev_price,"
+        "   LEAD(id) OVER (PARTITION BY ipo_id ORDER BY updated_at, id) AS next_id"
+        "  FROM gmp_prices"
+        " ) ranked"
+        " WHERE price = prev_price AND next_id IS NOT NULL"
+        ")"
+    ))
+    print(f"Removed {result.rowcount} repeated GMP samples.")
+
+IPO_DATE_COLUMNS = ["open_date", "close_date", "listing_date"]
+
+def typed_ipo_columns(conn):
+    # Composite index for the latest-GMP and trend queries
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_gmp_prices_ipo_id_updated_at "
+        "ON gmp_prices (ipo_id, updated_at DESC, id DESC)"
+    ))
+
+    # Numeric ends of price_band
+    columns = _columns(conn, "ipos")
+    for column in ("price_low", "price_high"):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE ipos ADD COLUMN {column} FLOAT"))
+    updates = []
+    for ipo_id, price_band in conn.execute(text("SELECT id, price_band FROM ipos WHERE price_high IS NULL")):
+        low, high = parse_price_band(price_band)
+        if high is not None:
+            updates.append({"id": ipo_id, "low": low, "high": high})
+    if updates:
+        conn.execute(text("UPDATE ipos SET price_low = :low, price_high = :high WHERE id = :id"), updates)
+
+    # Dates: anything that is not a valid YYYY-MM-DD becomes NULL
+    rows = conn.execute(text(f"SELECT id, {', '.join(IPO_DATE_COLUMNS)} FROM ipos")).all()
+    for column_index, column in enumerate(IPO_DATE_COLUMNS, start=1):
+        invalid = [{"id": row[0]} for row in rows
+                   if row[column_index] is not None and to_date(str(row[column_index])) is None]
+        if invalid:
+            conn.execute(text(f"UPDATE ipos SET {column} = NULL WHERE id = :id"), invalid)
+
+    # SQLite keeps ISO strings, which the Date type reads as is; Postgres
+    # needs the column type changed
+    if conn.dialect.name == "postgresql":
+        types = {c["name"]: c["type"] for c in inspect(conn).get_columns("ipos")}
+        for column in IPO_DATE_COLUMNS:
+            if not isinstance(types[column], Date):
+                conn.execute(text(f"ALTER TABLE ipos ALTER COLUMN {column} TYPE DATE USING {column}::date"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_ipos_open_date ON ipos (open_date)"))
+
+MIGRATIONS = [
+    ("0001_ipo_name_key", add_ipo_name_key),
+    ("0002_compact_gmp_runs", compact_gmp_runs),
+    ("0003_typed_ipo_columns", typed_ipo_columns),
+]
+
+def run_migrations(engine=default_engine):
+    """
+    Creates missing tables, then applies pending migrations, each in its
+    own transaction.
+    """
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR PRIMARY KEY, applied_at TIMESTAMP)"
+        ))
+        applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    for version, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)"),
+                {"version": version, "applied_at": datetime.utcnow()},
+            )
+        print(f"Applied migration {version}.")
+
+if __name__ == "__main__":
+    run_migrations()
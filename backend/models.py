@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import create_engine, event, make_url, Column, Integer, String, Float, Date, DateTime, ForeignKey, Boolean, Text, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from datetime import datetime
 import os
+from services.db_metrics import timed_pool
 
 Base = declarative_base()
 
@@ -11,16 +14,21 @@ class IPO(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
+    # normalize_name(name); what the merger upserts on
+    name_key = Column(String, unique=True, index=True, nullable=True)
     symbol = Column(String, nullable=True)  # NSE/BSE Symbol
     ipo_type = Column(String)  # 'Mainboard' or 'SME'
 
     # Dates
-    open_date = Column(String, nullable=True)
-    close_date = Column(String, nullable=True)
-    listing_date = Column(String, nullable=True)
+    open_date = Column(Date, nullable=True, index=True)
+    close_date = Column(Date, nullable=True)
+    listing_date = Column(Date, nullable=True)
 
     # Financials
     price_band = Column(String, nullable=True)
+    # Ends of price_band, parsed when it is written
+    price_low = Column(Float, nullable=True)
+    price_high = Column(Float, nullable=True)
     lot_size = Column(Integer, nullable=True, default=0)
     issue_size = Column(String, nullable=True)
 
@@ -49,6 +57,60 @@ class GMPPrice(Base):
 
     ipo = relationship("IPO", back_populates="gmp_prices")
 
+    # Latest-first history of one IPO; id breaks ties as the queries do
+    __table_args__ = (
+        Index("ix_gmp_prices_ipo_id_updated_at", ipo_id, updated_at.desc(), id.desc()),
+    )
+
+class GMPBucket(Base):
+    """
+    OHLC of the GMP samples of one IPO over an hour or a day. Raw GMPPrice
+    rows are rolled up into these as they age (see services/gmp_history.py).
+    """
+    __tablename__ = "gmp_buckets"
+
+    # Key order serves "buckets of one IPO by time"
+    ipo_id = Column(Integer, ForeignKey("ipos.id", ondelete="CASCADE"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    resolution = Column(String, primary_key=True)  # 'hour' or 'day'
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    samples = Column(Integer, default=0)
+    # Times of the first and last sample, so later rollups merge in order
+    first_at = Column(DateTime)
+    last_at = Column(DateTime)
+
+class IPOSnapshot(Base):
+    """
+    Denormalized read model of the /ipos row for one IPO. Written by the
+    merger and the vote handler so the read endpoints never join or parse.
+    """
+    __tablename__ = "ipo_snapshots"
+
+    ipo_id = Column(Integer, ForeignKey("ipos.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String)
+    symbol = Column(String, nullable=True)
+    ipo_type = Column(String)
+    status = Column(String)
+    listing_date = Column(String, nullable=True)
+    price_band = Column(String, nullable=True)
+    lot_size = Column(Integer, default=0)
+    kostak_rate = Column(Float, default=0.0)
+    retail_subscription_x = Column(Float, default=0.0)
+    allotment_url = Column(String, nullable=True)
+    sentiment_bullish = Column(Integer, default=0)
+    sentiment_bearish = Column(Integer, default=0)
+
+    # Derived values
+    gmp = Column(Float, default=0.0)
+    base_price = Column(Float, default=0.0)
+    growth_percent = Column(Float, default=0.0)
+    trend = Column(JSON, default=list)
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow)
+
 class MarketIndex(Base):
     __tablename__ = "market_indices"
 
@@ -58,6 +120,29 @@ class MarketIndex(Base):
     change_percent = Column(Float)
     last_updated = Column(DateTime, default=datetime.utcnow)
 
+class DataVersion(Base):
+    """
+    Version counter per data scope ("ipos", "market"), bumped in the
+    transaction that changes the data. API processes poll it to know when
+    their response caches are stale.
+    """
+    __tablename__ = "data_versions"
+
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SchedulerLease(Base):
+    """
+    Named lease held by at most one worker process at a time; the holder
+    renews it before `expires_at`, anyone may take it over after.
+    """
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
 # Database Setup
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, "ipo_tracker.db")
@@ -66,9 +151,115 @@ DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Pool settings, per engine (the sync and the async one each have a pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds a checkout waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections older than this are replaced; the Supabase pooler and
+# Render's sleep both drop idle connections from under us
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Postgres statement_timeout in milliseconds; 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+def uses_transaction_pooler(url) -> bool:
+    """Supabase's transaction pooler (port 6543, or marked pgbouncer=true)."""
+    return url.port == 6543 or url.query.get("pgbouncer") == "true"
+
+def pool_options() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def apply_statement_timeout(engine, transaction_pooler: bool):
+    if engine.dialect.name != "postgresql" or DB_STATEMENT_TIMEOUT_MS <= 0:
+        return
+    setting = f"statement_timeout = {DB_STATEMENT_TIMEOUT_MS}"
+
+    if transaction_pooler:
+        # A session-level SET would stay on whichever server connection ran
+        # it, so set it for each transaction instead
+        @event.listens_for(engine, "begin")
+        def set_local_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL {setting}")
+    else:
+        @event.listens_for(engine, "connect")
+        def set_timeout(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"SET {setting}")
+            cursor.close()
+
 connect_args = {}
 if "sqlite" in DATABASE_URL:
     connect_args = {"check_same_thread": False}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+TRANSACTION_POOLER = uses_transaction_pooler(make_url(DATABASE_URL))
+
+# pgbouncer=true is a marker for us, not a libpq parameter
+engine = create_engine(make_url(DATABASE_URL).difference_update_query(["pgbouncer"]), connect_args=connect_args,
+                       poolclass=timed_pool(QueuePool, "sync"), **pool_options())
+apply_statement_timeout(engine, TRANSACTION_POOLER)
 Session = sessionmaker(bind=engine)
+
+def async_database_url(database_url: str):
+    """
+    The same database through its async driver (aiosqlite / asyncpg), and
+    the connect_args that driver needs.
+    """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite"), {}
+    if backend != "postgresql":
+        if url.get_dialect().is_async:
+            # Already names an async driver, e.g. mysql+aiomysql
+            return url, {}
+        raise ValueError(f"No async driver configured for {url.drivername}; "
+                         f"name one in DATABASE_URL, e.g. {backend}+<async driver>://")
+
+    query = dict(url.query)
+    # asyncpg spells libpq's sslmode as ssl
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    async_connect_args = {}
+    if uses_transaction_pooler(url):
+        # Supabase's transaction pooler hands each transaction to any server
+        # connection, so prepared statements cannot be cached
+        query.pop("pgbouncer", None)
+        query["prepared_statement_cache_size"] = "0"
+        async_connect_args = {"statement_cache_size": 0}
+    return url.set(drivername="postgresql+asyncpg", query=query), async_connect_args
+
+# Used by the async read routes; jobs and writes stay on the sync engine.
+# Without an async driver the worker and init_db still run, and only the
+# routes fail, with the reason.
+try:
+    ASYNC_DATABASE_URL, async_connect_args = async_database_url(DATABASE_URL)
+except ValueError as e:
+    ASYNC_DATABASE_URL = async_engine = AsyncSession = None
+    async_config_error = str(e)
+else:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=async_connect_args,
+                                       poolclass=timed_pool(AsyncAdaptedQueuePool, "async"), **pool_options())
+    apply_statement_timeout(async_engine.sync_engine, TRANSACTION_POOLER)
+    AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+def get_session():
+    """FastAPI dependency: a session for the request, closed after it."""
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+async def get_async_session():
+    """get_session for async routes."""
+    if AsyncSession is None:
+        raise RuntimeError(async_config_error)
+    async with AsyncSession() as session:
+        yield session
@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Callable, Awaitable, Tuple
 from datetime import datetime
 from pydantic import BaseModel, Field
+import asyncio
+from .context import new_scraping_context, RequestStats
+from .fetch import http_fetcher
+from .tables import parse_html_tables
 
 class ScrapedIPOData(BaseModel):
     name: str
@@ -17,9 +21,91 @@ class ScrapedIPOData(BaseModel):
     source: str
 
 class BaseScraper(ABC):
+    # Short identifier stored on ScrapedIPOData.source
+    source: str = ""
+    # Page holding the table
+    url: str = ""
+    # "http": try a plain GET first and only escalate to Playwright when the
+    # expected table is missing. "browser": always drive Chromium.
+    fetch_mode: str = "browser"
+    # Hosts (and their subdomains) the browser context may load from.
+    # Everything else, plus images, media and fonts, is aborted.
+    allowed_hosts: Tuple[str, ...] = ()
+
+    # How the last run got its data: "http", "http-304" or "browser"
+    last_fetch_mode: Optional[str] = None
+    # Allowed / blocked requests of the last browser run
+    last_request_stats: Optional[RequestStats] = None
+
     @abstractmethod
-    def scrape(self) -> List[ScrapedIPOData]:
+    async def scrape_page(self, page) -> List[ScrapedIPOData]:
+        """
+        Navigates `page` (a Playwright async Page in a context of its own)
+        and returns a list of ScrapedIPOData.
+        """
+        pass
+
+    @abstractmethod
+    def parse_tables(self, tables: List[dict]) -> List[ScrapedIPOData]:
         """
-        Scrapes the website and returns a list of ScrapedIPOData.
+        Maps tables from scrapers.tables to ScrapedIPOData.
         """
         pass
+
+    def has_expected_table(self, tables: List[dict]) -> bool:
+        """
+        Whether a server-rendered page already contains the data table.
+        """
+        return any(table["rows"] for table in tables)
+
+    async def scrape_http(self) -> Optional[List[ScrapedIPOData]]:
+        """
+        HTTP tier: returns None when the page has to be rendered in a browser.
+        """
+        html = await asyncio.to_thread(http_fetcher.fetch, self.url)
+        status = http_fetcher.last_status.get(self.url)
+        if html is None:
+            print(f"{self.source}: HTTP fetch failed ({status}), falling back to Playwright")
+            return None
+
+        tables = parse_html_tables(html)
+        if not self.has_expected_table(tables):
+            print(f"{self.source}: expected table missing in HTTP response, falling back to Playwright")
+            return None
+
+        self.last_fetch_mode = "http-304" if status == "304" else "http"
+        return self.parse_tables(tables)
+
+    async def run(self, get_browser: Callable[[], Awaitable]) -> List[ScrapedIPOData]:
+        """
+        Tiered fetch. `get_browser` launches (or returns) the shared browser
+        and is only awaited when the HTTP tier cannot serve the page.
+        """
+        if self.fetch_mode == "http":
+            records = await self.scrape_http()
+            if records is not None:
+                return records
+
+        browser = await get_browser()
+        self.last_fetch_mode = "browser"
+        return await self.scrape_with_browser(browser)
+
+    async def scrape_with_browser(self, browser) -> List[ScrapedIPOData]:
+        """
+        Runs the scraper in a fresh context of a shared browser.
+        """
+        context, self.last_request_stats = await new_scraping_context(browser, self.allowed_hosts)
+        try:
+            page = await context.new_page()
+            return await self.scrape_page(page)
+        finally:
+            await context.close()
+
+    def scrape(self) -> List[ScrapedIPOData]:
+        """
+        Scrapes the website with a browser of its own and returns a list of
+        ScrapedIPOData. Use scrapers.runner.run_scrapers to share one browser
+        across several sources.
+        """
+        from .runner import run_scrapers
+        return run_scrapers([self])[0].records
@@ -0,0 +1,49 @@
+from typing import Iterable, Tuple
+from urllib.parse import urlparse
+from pydantic import BaseModel
+import fake_useragent
+
+# Never needed to read a table
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+class RequestStats(BaseModel):
+    allowed: int = 0
+    blocked: int = 0
+    bytes_received: int = 0
+
+def host_allowed(host: str | None, allowed_hosts: Iterable[str]) -> bool:
+    if not host:
+        return False
+    return any(host == h or host.endswith("." + h) for h in allowed_hosts)
+
+async def new_scraping_context(browser, allowed_hosts: Iterable[str]) -> Tuple[object, RequestStats]:
+    """
+    Browser context that aborts images, media, fonts and every request to a
+    host outside `allowed_hosts` (ads, analytics, social widgets), and
+    counts what it let through.
+    """
+    allowed_hosts = tuple(allowed_hosts)
+    stats = RequestStats()
+    context = await browser.new_context(user_agent=fake_useragent.UserAgent().random)
+
+    async def route_request(route):
+        request = route.request
+        if request.url.startswith("data:"):
+            await route.continue_()
+            return
+        if (request.resource_type in BLOCKED_RESOURCE_TYPES
+                or not host_allowed(urlparse(request.url).hostname, allowed_hosts)):
+            stats.blocked += 1
+            await route.abort()
+            return
+        stats.allowed += 1
+        await route.continue_()
+
+    def count_response(response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            stats.bytes_received += int(length)
+
+    await context.route("**/*", route_request)
+    context.on("response", count_response)
+    return context, stats
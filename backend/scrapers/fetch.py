@@ -0,0 +1,79 @@
+import threading
+from typing import Dict, Optional, Tuple
+import httpx
+import fake_useragent
+
+class HTTPFetcher:
+    """
+    Plain HTTP GET with a keep-alive connection pool and conditional
+    requests. Validators (ETag / Last-Modified) and the last body are kept
+    per URL, so an unchanged page costs a 304 and no download.
+    """
+    def __init__(self, timeout: float = 20.0):
+        self._timeout = timeout
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        # url -> (etag, last_modified, body)
+        self._cache: Dict[str, Tuple[Optional[str], Optional[str], str]] = {}
+        # url -> "200" / "304" / error text of the last request
+        self.last_status: Dict[str, str] = {}
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    timeout=self._timeout,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+                    headers={
+                        "User-Agent": fake_useragent.UserAgent().random,
+                        "Accept": "text/html,application/xhtml+xml",
+                        "Accept-Language": "en-IN,en;q=0.9",
+                    },
+                )
+            return self._client
+
+    def fetch(self, url: str) -> Optional[str]:
+        """
+        Returns the page body, or None if it could not be fetched.
+        """
+        headers = {}
+        cached = self._cache.get(url)
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        try:
+            response = self.client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            self.last_status[url] = f"error: {e}"
+            return None
+
+        if response.status_code == 304 and cached:
+            self.last_status[url] = "304"
+            return cached[2]
+
+        if response.status_code != 200:
+            self.last_status[url] = str(response.status_code)
+            return None
+
+        self.last_status[url] = "200"
+        body = response.text
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._cache[url] = (etag, last_modified, body)
+        return body
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+# Shared for the life of the process so validators survive between cycles
+http_fetcher = HTTPFetcher()
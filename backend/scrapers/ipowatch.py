@@ -1,89 +1,88 @@
 from typing import List
-from playwright.sync_api import sync_playwright
 from datetime import datetime
 from .base import BaseScraper, ScrapedIPOData
+from .tables import extract_tables
 from .utils import parse_ipo_date, clean_currency
-import fake_useragent
 
 class IPOWatchScraper(BaseScraper):
-    def scrape(self) -> List[ScrapedIPOData]:
+    source = "ipowatch"
+    url = "https://ipowatch.in/ipo-grey-market-premium-latest-ipo-gmp/"
+    # GMP table is server-rendered
+    fetch_mode = "http"
+    allowed_hosts = ("ipowatch.in",)
+
+    async def scrape_page(self, page) -> List[ScrapedIPOData]:
+        # Errors propagate to the runner, see ChittorgarhScraper.scrape_page
         print("Starting Playwright scraper for ipowatch.in...")
+
+        print(f"Navigating to {self.url}...")
+        await page.goto(self.url, wait_until="domcontentloaded", timeout=60000)
+
+        # Wait for a data row rather than the full page load
+        await page.wait_for_selector("table tbody tr td:nth-child(5)", timeout=20000)
+
+        # Pull every table in one round trip, map rows in Python
+        data = self.parse_tables(await extract_tables(page))
+        print(f"IPOWatch: Scraped {len(data)} records.")
+        return data
+
+    def has_expected_table(self, tables: List[dict]) -> bool:
+        return any(len(row) >= 5 for table in tables for row in table["rows"])
+
+    def parse_tables(self, tables: List[dict]) -> List[ScrapedIPOData]:
         data = []
-        ua = fake_useragent.UserAgent()
-
-        with sync_playwright() as p:
-            # Launch with random user agent
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(user_agent=ua.random)
-            page = context.new_page()
-
-            try:
-                url = "https://ipowatch.in/ipo-grey-market-premium-latest-ipo-gmp/"
-                print(f"Navigating to {url}...")
-                page.goto(url, timeout=60000)
-
-                # Wait for table
-                page.wait_for_selector("table", timeout=20000)
-
-                # Find the main data table
-                rows = page.locator("table tbody tr").all()
-                print(f"Found {len(rows)} rows.")
-
-                for row in rows:
-                    cells = row.locator("td").all()
-                    if len(cells) < 5:
-                        continue
-
-                    texts = [c.inner_text().strip() for c in cells]
-
-                    # Headers check
-                    if "Stock" in texts[0] or "IPO" in texts[0]:
-                        continue
-
-                    # Mapping based on observation:
-                    # 0: Name (e.g., "Fractal Analytics")
-                    # 1: GMP (e.g., "₹42")
-                    # 2: IPO Price (e.g., "₹900")
-                    # 3: Gain (e.g., "4.66%") - Skip
-                    # 4: Date (e.g., "9-11 Feb")
-                    # 5: Type (e.g., "Mainboard" or "SME")
-
-                    ipo_name = texts[0]
-                    gmp_str = texts[1]
-                    price_str = texts[2]
-                    date_str = texts[4]
-                    ipo_type_raw = texts[5] if len(texts) > 5 else "Mainboard"
-
-                    # Parse Dates
-                    open_date, close_date = parse_ipo_date(date_str)
-
-                    # Normalize Type
-                    if "SME" in ipo_type_raw:
-                        ipo_type = "SME"
-                    else:
-                        ipo_type = "Mainboard"
-
-                    # Parse Values
-                    gmp_value = clean_currency(gmp_str)
-
-                    # Create Data Object
-                    ipo_data = ScrapedIPOData(
-                        name=ipo_name,
-                        ipo_type=ipo_type,
-                        price_band=price_str,
-                        open_date=open_date,
-                        close_date=close_date,
-                        gmp=gmp_value,
-                        source="ipowatch",
-                        last_updated=datetime.utcnow()
-                    )
-                    data.append(ipo_data)
-
-                print(f"IPOWatch: Scraped {len(data)} records.")
-
-            except Exception as e:
-                print(f"IPOWatch Scraper Error: {e}")
-            finally:
-                browser.close()
+
+        # Find the main data table
+        rows = [row for table in tables for row in table["rows"]]
+        print(f"Found {len(rows)} rows.")
+
+        for cells in rows:
+            if len(cells) < 5:
+                continue
+
+            texts = [c["text"] for c in cells]
+
+            # Headers check
+            if "Stock" in texts[0] or "IPO" in texts[0]:
+                continue
+
+            # Mapping based on observation:
+            # 0: Name (e.g., "Fractal Analytics")
+            # 1: GMP (e.g., "₹42")
+            # 2: IPO Price (e.g., "₹900")
+            # 3: Gain (e.g., "4.66%") - Skip
+            # 4: Date (e.g., "9-11 Feb")
+            # 5: Type (e.g., "Mainboard" or "SME")
+
+            ipo_name = texts[0]
+            gmp_str = texts[1]
+            price_str = texts[2]
+            date_str = texts[4]
+            ipo_type_raw = texts[5] if len(texts) > 5 else "Mainboard"
+
+            # Parse Dates
+            open_date, close_date = parse_ipo_date(date_str)
+
+            # Normalize Type
+            if "SME" in ipo_type_raw:
+                ipo_type = "SME"
+            else:
+                ipo_type = "Mainboard"
+
+            # Parse Values
+            gmp_value = clean_currency(gmp_str)
+
+            # Create Data Object
+            ipo_data = ScrapedIPOData(
+                name=ipo_name,
+                ipo_type=ipo_type,
+                price_band=price_str,
+                open_date=open_date,
+                close_date=close_date,
+                gmp=gmp_value,
+                source="ipowatch",
+                last_updated=datetime.utcnow()
+            )
+            data.append(ipo_data)
 
         return data
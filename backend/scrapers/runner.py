@@ -0,0 +1,80 @@
+from typing import List, Optional
+import asyncio
+import time
+from pydantic import BaseModel, Field
+from playwright.async_api import async_playwright
+from .base import BaseScraper, ScrapedIPOData
+from .context import RequestStats
+
+class ScrapeResult(BaseModel):
+    source: str
+    records: List[ScrapedIPOData] = Field(default_factory=list)
+    seconds: float = 0.0
+    fetch_mode: Optional[str] = None
+    request_stats: Optional[RequestStats] = None
+    error: Optional[str] = None
+
+class SharedBrowser:
+    """
+    Launches Chromium on first use only, so a cycle served entirely over
+    HTTP never starts a browser.
+    """
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+
+    async def get(self):
+        async with self._lock:
+            if self._browser is None:
+                print("Launching shared Chromium...")
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+            return self._browser
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+async def _run_one(scraper: BaseScraper, browser: SharedBrowser) -> ScrapeResult:
+    name = scraper.source or scraper.__class__.__name__
+    started = time.perf_counter()
+    try:
+        records = await scraper.run(browser.get)
+        return ScrapeResult(source=name, records=records, seconds=time.perf_counter() - started,
+                            fetch_mode=scraper.last_fetch_mode, request_stats=scraper.last_request_stats)
+    except Exception as e:
+        print(f"Error running scraper {scraper.__class__.__name__}: {e}")
+        return ScrapeResult(source=name, seconds=time.perf_counter() - started,
+                            fetch_mode=scraper.last_fetch_mode, request_stats=scraper.last_request_stats,
+                            error=str(e))
+
+async def run_scrapers_async(scrapers: List[BaseScraper]) -> List[ScrapeResult]:
+    """
+    Runs every scraper concurrently. Sources that need a browser share one
+    Chromium, each in its own context. Results come back in the order of
+    `scrapers`.
+    """
+    browser = SharedBrowser()
+    try:
+        return list(await asyncio.gather(*(_run_one(s, browser) for s in scrapers)))
+    finally:
+        await browser.close()
+
+def run_scrapers(scrapers: List[BaseScraper]) -> List[ScrapeResult]:
+    """
+    Blocking entry point for the scheduler thread.
+    """
+    started = time.perf_counter()
+    results = asyncio.run(run_scrapers_async(scrapers))
+
+    timings = ", ".join(f"{r.source} {r.seconds:.1f}s via {r.fetch_mode} ({len(r.records)} records)" for r in results)
+    print(f"Scrape cycle finished in {time.perf_counter() - started:.1f}s: {timings}")
+    for r in results:
+        if r.request_stats:
+            stats = r.request_stats
+            print(f"  {r.source}: {stats.allowed} requests allowed, {stats.blocked} blocked, "
+                  f"{stats.bytes_received // 1024} KB received")
+    return results
@@ -0,0 +1,138 @@
+"""
+Whole-page table extraction.
+
+Both extractors return the same structure, one dict per <table>:
+
+    {
+        "headers": ["Company", "Open", ...],        # text of thead th cells
+        "tr_count": 42,                             # all <tr> in the table
+        "rows": [[{"text": "...", "link": "..."}]]  # td cells of body rows
+    }
+
+`link` is the text of the first anchor in the cell, or None. Scrapers map
+these rows to ScrapedIPOData in pure Python.
+"""
+import re
+from html.parser import HTMLParser
+from typing import List, Optional
+
+# Runs inside the page: one IPC round trip for every table on the page.
+TABLES_JS = """
+() => Array.from(document.querySelectorAll("table")).map(table => ({
+    headers: Array.from(table.querySelectorAll("thead tr th")).map(th => th.innerText.trim()),
+    tr_count: table.querySelectorAll("tr").length,
+    rows: Array.from(table.querySelectorAll("tbody tr")).map(tr =>
+        Array.from(tr.querySelectorAll("td")).map(td => {
+            const a = td.querySelector("a");
+            return { text: td.innerText.trim(), link: a ? a.innerText.trim() : null };
+        })
+    ),
+}))
+"""
+
+async def extract_tables(page) -> List[dict]:
+    return await page.evaluate(TABLES_JS)
+
+# Elements that start a new line in innerText
+_BLOCK_TAGS = {"br", "p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6"}
+_SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+def _clean_text(parts: List[str]) -> str:
+    lines = "".join(parts).split("\n")
+    lines = [re.sub(r"[ \t\r\f\v\xa0]+", " ", line).strip() for line in lines]
+    return "\n".join(line for line in lines if line)
+
+class _TableParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables: List[dict] = []
+        self._stack: List[dict] = []   # open tables (nested tables are kept separate)
+        self._skip = 0
+
+    @property
+    def _table(self) -> Optional[dict]:
+        return self._stack[-1] if self._stack else None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+            return
+        if tag == "table":
+            table = {"headers": [], "tr_count": 0, "rows": [],
+                     "_section": "tbody", "_row": None, "_cell": None, "_link": None}
+            self.tables.append(table)
+            self._stack.append(table)
+            return
+
+        t = self._table
+        if t is None:
+            return
+        if tag in ("thead", "tbody", "tfoot"):
+            t["_section"] = tag
+        elif tag == "tr":
+            self._close_cell(t)
+            t["tr_count"] += 1
+            t["_row"] = [] if t["_section"] == "tbody" else None
+            if t["_row"] is not None:
+                t["rows"].append(t["_row"])
+        elif tag in ("td", "th"):
+            # Cells may be left unclosed, as HTML allows
+            self._close_cell(t)
+            t["_cell"] = {"tag": tag, "parts": [], "link": None}
+        elif tag == "a" and t["_cell"] is not None and t["_cell"]["link"] is None:
+            t["_link"] = []
+        elif tag in _BLOCK_TAGS and t["_cell"] is not None:
+            t["_cell"]["parts"].append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+            return
+        t = self._table
+        if t is None:
+            return
+        if tag == "table":
+            self._close_cell(t)
+            for key in ("_section", "_row", "_cell", "_link"):
+                t.pop(key)
+            self._stack.pop()
+        elif tag in ("thead", "tfoot"):
+            # Rows outside any section end up in an implicit tbody
+            t["_section"] = "tbody"
+        elif tag in ("td", "th"):
+            self._close_cell(t)
+        elif tag == "a" and t["_link"] is not None and t["_cell"] is not None:
+            t["_cell"]["link"] = _clean_text(t["_link"])
+            t["_link"] = None
+        elif tag in _BLOCK_TAGS and t["_cell"] is not None:
+            t["_cell"]["parts"].append("\n")
+
+    def handle_data(self, data):
+        t = self._table
+        if self._skip or t is None or t["_cell"] is None:
+            return
+        t["_cell"]["parts"].append(data)
+        if t["_link"] is not None:
+            t["_link"].append(data)
+
+    def _close_cell(self, t):
+        cell = t["_cell"]
+        if cell is None:
+            return
+        t["_cell"] = None
+        t["_link"] = None
+        text = _clean_text(cell["parts"])
+        if cell["tag"] == "th" and t["_section"] == "thead":
+            t["headers"].append(text)
+        elif cell["tag"] == "td" and t["_row"] is not None:
+            t["_row"].append({"text": text, "link": cell["link"]})
+
+def parse_html_tables(html: str) -> List[dict]:
+    """
+    Same output as extract_tables, from raw HTML (page.content() or an
+    HTTP response body) without a browser.
+    """
+    parser = _TableParser()
+    parser.feed(html)
+    parser.close()
+    return parser.tables
@@ -1,4 +1,5 @@
 from models import Session, engine, Base, IPO, GMPPrice
+from services.snapshot import refresh_snapshots
 import datetime
 import random
 
@@ -11,9 +12,11 @@ ipos = [
         name="Tata Technologies",
         symbol="TATA",
         ipo_type="Mainboard",
-        listing_date="2025-03-01",
+        listing_date=datetime.date(2025, 3, 1),
         status="Open",
         price_band="475-500",
+        price_low=475,
+        price_high=500,
         lot_size=30,
         kostak_rate=150,
         retail_subscription_x=45.5,
@@ -25,9 +28,11 @@ ipos = [
         name="Plaza Wires",
         symbol="PLAZA",
         ipo_type="SME",
-        listing_date="2025-03-05",
+        listing_date=datetime.date(2025, 3, 5),
         status="Upcoming",
         price_band="51-54",
+        price_low=51,
+        price_high=54,
         lot_size=2000,
         kostak_rate=0,
         retail_subscription_x=2.5,
@@ -38,9 +43,11 @@ ipos = [
         name="Valiant Labs",
         symbol="VALIANT",
         ipo_type="Mainboard",
-        listing_date="2025-02-28",
+        listing_date=datetime.date(2025, 2, 28),
         status="Closed",
         price_band="133-140",
+        price_low=133,
+        price_high=140,
         lot_size=105,
         kostak_rate=20,
         retail_subscription_x=12.0,
@@ -73,6 +80,7 @@ for ipo in ipos:
         gmp = GMPPrice(ipo_id=ipo.id, price=price, updated_at=date)
         session.add(gmp)
 
+refresh_snapshots(session, [ipo.id for ipo in ipos])
 session.commit()
 print("Seeded dense data successfully.")
 session.close()
@@ -0,0 +1,147 @@
+"""
+Per-IPO GMP statistics computed in bulk with pandas. The IPO columns and
+the whole GMP history (raw samples, plus the closes of the rolled-up
+buckets) are loaded into columnar frames once per "ipos" data version;
+every statistic is then a grouped, vectorized pass over those frames
+rather than a loop over ORM objects.
+"""
+import os
+import threading
+from datetime import date
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import IPO, IPOSnapshot, GMPPrice, GMPBucket
+
+# GMP change over this many days is the momentum
+MOMENTUM_DAYS = float(os.getenv("ANALYTICS_MOMENTUM_DAYS", "3"))
+# Time windows of the rolling GMP averages
+ROLLING_WINDOWS = {"gmp_avg_3d": "3 days", "gmp_avg_7d": "7 days"}
+
+ANALYTICS_FIELDS = [
+    "id", "name", "ipo_type", "status", "base_price", "gmp", "growth_percent",
+    "gmp_max", "gmp_min", "gmp_momentum", "gmp_volatility", *ROLLING_WINDOWS,
+    "samples", "last_sample_at", "listing_date", "days_to_listing",
+]
+# Columns /analytics can sort by, descending
+SORT_FIELDS = [
+    "gmp", "growth_percent", "gmp_max", "gmp_min", "gmp_momentum", "gmp_volatility",
+    *ROLLING_WINDOWS, "days_to_listing",
+]
+
+def load_ipos(session: Session) -> pd.DataFrame:
+    rows = session.execute(
+        select(IPOSnapshot.ipo_id, IPOSnapshot.name, IPOSnapshot.ipo_type, IPOSnapshot.status,
+               IPOSnapshot.base_price, IPOSnapshot.gmp, IPOSnapshot.growth_percent, IPO.listing_date)
+        .join(IPO, IPO.id == IPOSnapshot.ipo_id)
+    ).all()
+    columns = ["id", "name", "ipo_type", "status", "base_price", "gmp", "growth_percent", "listing_date"]
+    return pd.DataFrame(rows, columns=columns)
+
+def load_gmp_history(session: Session) -> pd.DataFrame:
+    """(ipo_id, at, price) of every raw sample and every bucket close."""
+    raw = session.execute(select(GMPPrice.ipo_id, GMPPrice.updated_at, GMPPrice.price)).all()
+    buckets = session.execute(select(GMPBucket.ipo_id, GMPBucket.last_at, GMPBucket.close)).all()
+    history = pd.DataFrame(raw + buckets, columns=["ipo_id", "at", "price"])
+    history["at"] = pd.to_datetime(history["at"])
+    history["price"] = history["price"].astype(float)
+    # Hourly and daily buckets of the same hour can overlap
+    history = history.drop_duplicates(["ipo_id", "at"], keep="first")
+    return history.sort_values(["ipo_id", "at"], kind="stable").reset_index(drop=True)
+
+def gmp_statistics(history: pd.DataFrame) -> pd.DataFrame:
+    """One row per IPO id with the GMP statistics of its history."""
+    by_ipo = history.groupby("ipo_id", sort=True)["price"]
+    stats = pd.DataFrame({
+        "gmp_max": by_ipo.max(),
+        "gmp_min": by_ipo.min(),
+        "samples": by_ipo.size(),
+        "last_sample_at": history.groupby("ipo_id")["at"].max(),
+        # Spread of the sample-to-sample moves
+        "gmp_volatility": history.assign(move=by_ipo.diff()).groupby("ipo_id")["move"].std(ddof=0),
+    })
+    latest = by_ipo.last()
+
+    # Latest GMP minus the GMP as of MOMENTUM_DAYS before the latest sample
+    targets = pd.DataFrame({
+        "ipo_id": stats.index,
+        "at": stats["last_sample_at"].to_numpy() - pd.Timedelta(days=MOMENTUM_DAYS),
+    }).sort_values("at", kind="stable")
+    earlier = pd.merge_asof(targets, history.sort_values("at", kind="stable"),
+                            on="at", by="ipo_id", direction="backward")
+    earlier = earlier.set_index("ipo_id")["price"].reindex(stats.index)
+    # Histories shorter than the window compare with their first sample
+    earlier = earlier.fillna(by_ipo.first())
+    stats["gmp_momentum"] = latest - earlier
+
+    # Rolling means as of the latest sample: mean over (latest - window, latest]
+    last_at = history["ipo_id"].map(stats["last_sample_at"])
+    for column, window in ROLLING_WINDOWS.items():
+        recent = history["at"] > last_at - pd.Timedelta(window)
+        stats[column] = history["price"][recent].groupby(history["ipo_id"][recent]).mean()
+    return stats
+
+class AnalyticsStore:
+    """
+    The joined IPO + statistics frame, rebuilt when the "ipos" data version
+    it was built for is no longer current. The lock only guards the swap.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._frame: Optional[pd.DataFrame] = None
+
+    def frame(self, session: Session, version: int) -> pd.DataFrame:
+        with self._lock:
+            if self._frame is not None and self._version == version:
+                return self._frame
+        # Built without the lock held: under AsyncSession.run_sync the queries
+        # suspend to the event loop, and a second miss waiting on a thread lock
+        # there would block the loop the first one needs to finish. Concurrent
+        # misses may each build; the frames are equivalent.
+        frame = self._build(session)
+        with self._lock:
+            if self._frame is None or self._version is None or version >= self._version:
+                self._frame, self._version = frame, version
+        return frame
+
+    @staticmethod
+    def _build(session: Session) -> pd.DataFrame:
+        ipos = load_ipos(session).set_index("id", drop=False)
+        history = load_gmp_history(session)
+        frame = ipos.join(gmp_statistics(history), how="left")
+        frame["samples"] = frame["samples"].fillna(0).astype(int)
+
+        listing = pd.to_datetime(frame["listing_date"])
+        today = pd.Timestamp(date.today())
+        frame["days_to_listing"] = (listing - today).dt.days.astype("Int64")
+        frame["listing_date"] = listing.dt.strftime("%Y-%m-%d")
+        frame["last_sample_at"] = pd.to_datetime(frame["last_sample_at"]).dt.strftime("%Y-%m-%dT%H:%M:%S")
+        for column in ["gmp_momentum", "gmp_volatility", *ROLLING_WINDOWS]:
+            frame[column] = frame[column].round(2)
+        return frame[ANALYTICS_FIELDS].sort_index()
+
+    def clear(self):
+        with self._lock:
+            self._frame = None
+            self._version = None
+
+def screen(frame: pd.DataFrame, status: Optional[List[str]] = None, ipo_type: Optional[List[str]] = None,
+           sort: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+    """Rows of `frame` filtered (case-insensitively), sorted descending and cut to `limit`."""
+    mask = np.ones(len(frame), dtype=bool)
+    if status:
+        mask &= frame["status"].str.lower().isin([s.lower() for s in status]).to_numpy()
+    if ipo_type:
+        mask &= frame["ipo_type"].str.lower().isin([t.lower() for t in ipo_type]).to_numpy()
+    rows = frame[mask]
+    if sort:
+        rows = rows.sort_values(sort, ascending=False, na_position="last", kind="stable")
+    if limit is not None:
+        rows = rows.head(limit)
+    # NaN/NaT -> None for JSON
+    return rows.astype(object).where(rows.notna(), None).to_dict("records")
+
+analytics_store = AnalyticsStore()
@@ -0,0 +1,103 @@
+"""
+Cross-process cache invalidation. Writers bump the version of a data scope
+in the data_versions table, in the same transaction as the change; every
+API process polls the table and drops its cached responses of a scope
+when its version moves.
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import DataVersion
+from services.upsert import dialect_insert
+
+# Data scopes. Each one has its own version so a vote does not invalidate
+# the market ticker and vice versa.
+IPOS_SCOPE = "ipos"
+MARKET_SCOPE = "market"
+# Bumped by vote flushes along with "ipos", so a reader can tell a write
+# that only changed vote counts from any other
+SENTIMENT_SCOPE = "sentiment"
+# Response cache scope of views that leave out vote counts (analytics). It
+# has no row of its own; its version is ipo_data_version() of the others.
+IPO_DATA_SCOPE = "ipo-data"
+
+# How often API processes look for writes made by other processes
+DATA_VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "2"))
+
+def bump_data_version(session: Session, scope: str) -> int:
+    """
+    Increments the version of `scope` and returns the new one. Does not
+    commit; call it in the transaction that changes the data.
+    """
+    now = datetime.utcnow()
+    stmt = dialect_insert(session, DataVersion).values(scope=scope, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DataVersion.scope],
+        set_={"version": DataVersion.version + 1, "updated_at": now},
+    ).returning(DataVersion.version)
+    return session.execute(stmt).scalar_one()
+
+def ipo_data_version(versions: Dict[str, int]) -> int:
+    """
+    The "ipos" version less the bumps of vote flushes: it moves only when a
+    write changed more than vote counts.
+    """
+    return versions.get(IPOS_SCOPE, 0) - versions.get(SENTIMENT_SCOPE, 0)
+
+def read_data_versions(session: Session) -> Dict[str, int]:
+    return {scope: version for scope, version in session.execute(select(DataVersion.scope, DataVersion.version))}
+
+class DataVersionWatcher:
+    """
+    Polls data_versions from a background thread and calls the subscribed
+    listeners with (scope, version) for every scope whose version changed
+    since the last poll (all of them on the first one).
+    """
+    def __init__(self, session_factory: Callable[[], Session], interval: float = DATA_VERSION_POLL_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.versions: Dict[str, int] = {}
+        self._listeners: List[Callable[[str, int], None]] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, listener: Callable[[str, int], None]):
+        self._listeners.append(listener)
+
+    def poll(self) -> Dict[str, int]:
+        session = self.session_factory()
+        try:
+            current = read_data_versions(session)
+        finally:
+            session.close()
+
+        changed = {scope: v for scope, v in current.items() if self.versions.get(scope) != v}
+        self.versions.update(changed)
+        for scope, version in changed.items():
+            for listener in self._listeners:
+                listener(scope, version)
+        return changed
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Data version poll failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-version-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
@@ -0,0 +1,97 @@
+"""
+Connection pool metrics: how long checkouts wait for a pooled connection,
+per engine, exported in the Prometheus text format by GET /metrics.
+"""
+import threading
+import time
+from typing import Dict, List, Type
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool
+
+# Upper bounds in seconds of the wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class PoolWaitMetric:
+    """Histogram of checkout wait times of one pool, plus timed out checkouts."""
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.buckets = [0] * len(WAIT_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            if timed_out:
+                self.timeouts += 1
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.buckets[i] += 1
+                    break
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "total": self.total,
+                "max": self.max,
+                "timeouts": self.timeouts,
+                "buckets": list(self.buckets),
+            }
+
+pool_metrics: Dict[str, PoolWaitMetric] = {}
+
+def timed_pool(base: Type[Pool], name: str) -> Type[Pool]:
+    """
+    `base` with every checkout timed into pool_metrics[name]. The time
+    covers waiting for a free connection and opening an overflow one.
+    """
+    metric = pool_metrics.setdefault(name, PoolWaitMetric(name))
+
+    class TimedPool(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            metric.pool = self
+
+        def _do_get(self):
+            start = time.perf_counter()
+            timed_out = False
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                timed_out = True
+                raise
+            finally:
+                metric.observe(time.perf_counter() - start, timed_out)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+def render_metrics() -> str:
+    lines: List[str] = [
+        "# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled database connection.",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    gauges: List[str] = []
+    for name, metric in sorted(pool_metrics.items()):
+        snap = metric.snapshot()
+        label = f'engine="{name}"'
+        cumulative = 0
+        for bound, count in zip(WAIT_BUCKETS, snap["buckets"]):
+            cumulative += count
+            lines.append(f'db_pool_checkout_wait_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'db_pool_checkout_wait_seconds_bucket{{{label},le="+Inf"}} {snap["count"]}')
+        lines.append(f"db_pool_checkout_wait_seconds_sum{{{label}}} {snap['total']:.6f}")
+        lines.append(f"db_pool_checkout_wait_seconds_count{{{label}}} {snap['count']}")
+        gauges.append(f"db_pool_checkout_wait_seconds_max{{{label}}} {snap['max']:.6f}")
+        gauges.append(f"db_pool_checkout_timeouts_total{{{label}}} {snap['timeouts']}")
+        if metric.pool is not None and hasattr(metric.pool, "checkedout"):
+            gauges.append(f"db_pool_checked_out{{{label}}} {metric.pool.checkedout()}")
+            gauges.append(f"db_pool_size{{{label}}} {metric.pool.size()}")
+    return "\n".join(lines + gauges) + "\n"
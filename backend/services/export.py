@@ -0,0 +1,147 @@
+"""
+Streaming exports of the IPO table and the full GMP history as NDJSON or
+CSV. Rows come off a server-side cursor (yield_per) and are encoded in
+batches by a generator, so memory stays flat however large the table is,
+and a sync generator only holds a threadpool worker per chunk rather than
+for the whole download.
+"""
+import csv
+import io
+import os
+from datetime import date, datetime, time
+from typing import Callable, Iterable, Iterator, List, Optional
+from sqlalchemy import Select, literal, select, union_all
+from sqlalchemy.orm import Session
+from models import IPO, IPOSnapshot, GMPPrice, GMPBucket
+from services.gmp_history import RAW
+from services.json_response import dumps
+
+# Rows fetched per round trip, and encoded per yielded chunk
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+IPO_EXPORT_COLUMNS = {
+    "id": IPO.id,
+    "name": IPO.name,
+    "symbol": IPO.symbol,
+    "ipo_type": IPO.ipo_type,
+    "status": IPO.status,
+    "open_date": IPO.open_date,
+    "close_date": IPO.close_date,
+    "listing_date": IPO.listing_date,
+    "price_band": IPO.price_band,
+    "price_low": IPO.price_low,
+    "price_high": IPO.price_high,
+    "lot_size": IPO.lot_size,
+    "issue_size": IPO.issue_size,
+    "gmp": IPOSnapshot.gmp,
+    "growth_percent": IPOSnapshot.growth_percent,
+    "sentiment_bullish": IPO.sentiment_bullish,
+    "sentiment_bearish": IPO.sentiment_bearish,
+}
+GMP_EXPORT_FIELDS = ["ipo_id", "time", "resolution", "open", "high", "low", "close", "samples"]
+
+def ipo_export_query(ipo_ids: Optional[List[int]] = None, start: Optional[date] = None,
+                     end: Optional[date] = None) -> Select:
+    """IPOs by id; `start`/`end` bound the open date, inclusive."""
+    stmt = (
+        select(*[column.label(name) for name, column in IPO_EXPORT_COLUMNS.items()])
+        .outerjoin(IPOSnapshot, IPOSnapshot.ipo_id == IPO.id)
+        .order_by(IPO.id)
+    )
+    if ipo_ids:
+        stmt = stmt.where(IPO.id.in_(ipo_ids))
+    if start is not None:
+        stmt = stmt.where(IPO.open_date >= start)
+    if end is not None:
+        stmt = stmt.where(IPO.open_date <= end)
+    return stmt
+
+def gmp_export_query(ipo_ids: Optional[List[int]] = None, start: Optional[date] = None,
+                     end: Optional[date] = None) -> Select:
+    """
+    Every stored GMP point, raw samples and rolled-up buckets alike, by IPO
+    and time. `start`/`end` are inclusive dates.
+    """
+    raw = select(
+        GMPPrice.ipo_id.label("ipo_id"), GMPPrice.updated_at.label("time"), literal(RAW).label("resolution"),
+        GMPPrice.price.label("open"), GMPPrice.price.label("high"), GMPPrice.price.label("low"),
+        GMPPrice.price.label("close"), literal(1).label("samples"),
+    ).where(GMPPrice.price.isnot(None))
+    buckets = select(
+        GMPBucket.ipo_id, GMPBucket.bucket_start, GMPBucket.resolution,
+        GMPBucket.open, GMPBucket.high, GMPBucket.low, GMPBucket.close, GMPBucket.samples,
+    )
+    if ipo_ids:
+        raw = raw.where(GMPPrice.ipo_id.in_(ipo_ids))
+        buckets = buckets.where(GMPBucket.ipo_id.in_(ipo_ids))
+    if start is not None:
+        start_at = datetime.combine(start, time.min)
+        raw = raw.where(GMPPrice.updated_at >= start_at)
+        buckets = buckets.where(GMPBucket.bucket_start >= start_at)
+    if end is not None:
+        end_at = datetime.combine(end, time.max)
+        raw = raw.where(GMPPrice.updated_at <= end_at)
+        buckets = buckets.where(GMPBucket.bucket_start <= end_at)
+
+    points = union_all(raw, buckets).subquery()
+    return select(*[points.c[f] for f in GMP_EXPORT_FIELDS]).order_by(points.c.ipo_id, points.c.time)
+
+def stream_rows(session_factory: Callable[[], Session], stmt: Select,
+                batch: int = EXPORT_BATCH_ROWS) -> Iterator[dict]:
+    """Rows of `stmt` as dicts, fetched `batch` at a time on a server-side cursor."""
+    session = session_factory()
+    try:
+        result = session.execute(stmt.execution_options(yield_per=batch))
+        for row in result.mappings():
+            yield dict(row)
+    finally:
+        session.close()
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def encode_rows(rows: Iterable[dict], fields: List[str], fmt: str,
+                batch: int = EXPORT_BATCH_ROWS) -> Iterator[bytes]:
+    """NDJSON or CSV (with a header) of `rows`, one chunk per `batch` rows."""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+
+    chunk: List[bytes] = []
+    count = 0
+    for row in rows:
+        if writer is not None:
+            writer.writerow([_csv_value(row[f]) for f in fields])
+        else:
+            chunk.append(dumps(row))
+            chunk.append(b"\n")
+        count += 1
+        if count % batch == 0:
+            yield _flush(buffer, chunk)
+    tail = _flush(buffer, chunk)
+    if tail:
+        yield tail
+
+def _flush(buffer: io.StringIO, chunk: List[bytes]) -> bytes:
+    if buffer.tell():
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+    data = b"".join(chunk)
+    chunk.clear()
+    return data
+
+def export_ipos(session_factory: Callable[[], Session], fmt: str, **filters) -> Iterator[bytes]:
+    rows = stream_rows(session_factory, ipo_export_query(**filters))
+    return encode_rows(rows, list(IPO_EXPORT_COLUMNS), fmt)
+
+def export_gmp(session_factory: Callable[[], Session], fmt: str, **filters) -> Iterator[bytes]:
+    rows = stream_rows(session_factory, gmp_export_query(**filters))
+    return encode_rows(rows, GMP_EXPORT_FIELDS, fmt)
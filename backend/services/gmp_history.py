@@ -0,0 +1,207 @@
+"""
+Tiered GMP history: raw gmp_prices rows for the last GMP_RAW_DAYS, hourly
+OHLC buckets up to GMP_HOURLY_DAYS, daily OHLC buckets after that.
+rollup_gmp_history() moves data down the tiers and is run on a schedule;
+fetch_gmp_history() reads across all tiers at one resolution.
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import os
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.orm import Session
+from models import GMPPrice, GMPBucket
+from services.upsert import dialect_insert, chunked
+
+RAW_DAYS = float(os.getenv("GMP_RAW_DAYS", "7"))
+HOURLY_DAYS = float(os.getenv("GMP_HOURLY_DAYS", "90"))
+# Daily buckets older than this are deleted; 0 keeps them forever
+DAILY_DAYS = float(os.getenv("GMP_DAILY_DAYS", "0"))
+
+RAW, HOUR, DAY = "raw", "hour", "day"
+RESOLUTIONS = (RAW, HOUR, DAY)
+_RANK = {RAW: 0, HOUR: 1, DAY: 2}
+
+OHLC_FIELDS = ["open", "high", "low", "close", "samples", "first_at", "last_at"]
+
+def _bucket_columns():
+    return [GMPBucket.ipo_id, GMPBucket.bucket_start, GMPBucket.resolution] + [getattr(GMPBucket, f) for f in OHLC_FIELDS]
+
+def _ohlc(row) -> dict:
+    return {f: getattr(row, f) for f in OHLC_FIELDS}
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    if resolution == HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if resolution == DAY:
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ts
+
+def _sample(price: float, at: datetime) -> dict:
+    return {"open": price, "high": price, "low": price, "close": price, "samples": 1, "first_at": at, "last_at": at}
+
+def _merge(target: dict, other: dict):
+    if other["first_at"] < target["first_at"]:
+        target["open"], target["first_at"] = other["open"], other["first_at"]
+    if other["last_at"] >= target["last_at"]:
+        target["close"], target["last_at"] = other["close"], other["last_at"]
+    target["high"] = max(target["high"], other["high"])
+    target["low"] = min(target["low"], other["low"])
+    target["samples"] += other["samples"]
+
+def _add(buckets: Dict, key, ohlc: dict):
+    if key in buckets:
+        _merge(buckets[key], ohlc)
+    else:
+        buckets[key] = dict(ohlc)
+
+# --- ROLLUP ---
+
+def _store_buckets(session: Session, resolution: str, buckets: Dict[Tuple[int, datetime], dict]):
+    """Merges {(ipo_id, bucket_start): ohlc} into the stored buckets."""
+    keys = list(buckets)
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        existing = session.execute(
+            select(*_bucket_columns()).where(
+                GMPBucket.resolution == resolution,
+                tuple_(GMPBucket.ipo_id, GMPBucket.bucket_start).in_(chunk),
+            )
+        )
+        for row in existing:
+            _merge(buckets[(row.ipo_id, row.bucket_start)], _ohlc(row))
+
+    rows = [
+        {"ipo_id": ipo_id, "bucket_start": start, "resolution": resolution, **ohlc}
+        for (ipo_id, start), ohlc in buckets.items()
+    ]
+    for chunk in chunked(rows):
+        stmt = dialect_insert(session, GMPBucket).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[GMPBucket.ipo_id, GMPBucket.bucket_start, GMPBucket.resolution],
+            set_={f: stmt.excluded[f] for f in OHLC_FIELDS},
+        )
+        session.execute(stmt)
+
+def _rollup_raw(session: Session, cutoff: datetime) -> int:
+    # Every IPO keeps its latest raw row, which is what the listing's GMP reads
+    ranked = select(
+        GMPPrice.id,
+        GMPPrice.ipo_id,
+        GMPPrice.price,
+        GMPPrice.updated_at,
+        func.row_number().over(
+            partition_by=GMPPrice.ipo_id,
+            order_by=(GMPPrice.updated_at.desc(), GMPPrice.id.desc())
+        ).label("rn")
+    ).subquery()
+    rows = session.execute(
+        select(ranked.c.id, ranked.c.ipo_id, ranked.c.price, ranked.c.updated_at)
+        .where(ranked.c.updated_at < cutoff, ranked.c.rn > 1)
+    ).all()
+    if not rows:
+        return 0
+
+    buckets: Dict[Tuple[int, datetime], dict] = {}
+    for _, ipo_id, price, updated_at in rows:
+        if price is not None:
+            _add(buckets, (ipo_id, bucket_start(updated_at, HOUR)), _sample(price, updated_at))
+    _store_buckets(session, HOUR, buckets)
+
+    ids = [row[0] for row in rows]
+    for start in range(0, len(ids), 500):
+        session.execute(delete(GMPPrice).where(GMPPrice.id.in_(ids[start:start + 500])))
+    return len(ids)
+
+def _rollup_hours(session: Session, cutoff: datetime) -> int:
+    hourly = session.execute(
+        select(*_bucket_columns()).where(GMPBucket.resolution == HOUR, GMPBucket.bucket_start < cutoff)
+    ).all()
+    if not hourly:
+        return 0
+
+    buckets: Dict[Tuple[int, datetime], dict] = {}
+    for row in hourly:
+        _add(buckets, (row.ipo_id, bucket_start(row.bucket_start, DAY)), _ohlc(row))
+    _store_buckets(session, DAY, buckets)
+
+    session.execute(delete(GMPBucket).where(GMPBucket.resolution == HOUR, GMPBucket.bucket_start < cutoff))
+    return len(hourly)
+
+def rollup_gmp_history(session: Session, now: Optional[datetime] = None) -> dict:
+    """
+    Rolls raw samples older than RAW_DAYS into hourly buckets and hourly
+    buckets older than HOURLY_DAYS into daily ones, then applies the daily
+    retention. Only whole hours / days are rolled, and each run only sees
+    what aged past a cutoff since the last one. Does not commit.
+    """
+    now = now or datetime.utcnow()
+    raw_cutoff = bucket_start(now - timedelta(days=RAW_DAYS), HOUR)
+    hourly_cutoff = bucket_start(now - timedelta(days=HOURLY_DAYS), DAY)
+
+    stats = {
+        "raw_rolled": _rollup_raw(session, raw_cutoff),
+        "hourly_rolled": _rollup_hours(session, hourly_cutoff),
+        "daily_expired": 0,
+    }
+    if DAILY_DAYS > 0:
+        result = session.execute(delete(GMPBucket).where(
+            GMPBucket.resolution == DAY,
+            GMPBucket.bucket_start < now - timedelta(days=DAILY_DAYS),
+        ))
+        stats["daily_expired"] = result.rowcount
+    session.flush()
+    return stats
+
+# --- QUERIES ---
+
+def pick_resolution(start: datetime, end: datetime) -> str:
+    """Finest resolution whose tier covers a window this long."""
+    span = end - start
+    if span <= timedelta(days=RAW_DAYS):
+        return RAW
+    if span <= timedelta(days=HOURLY_DAYS):
+        return HOUR
+    return DAY
+
+def fetch_gmp_history(session: Session, ipo_id: int, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None, resolution: Optional[str] = None) -> List[dict]:
+    """
+    GMP history of one IPO as OHLC points {"time", "open", "high", "low",
+    "close", "samples"} in time order, at `resolution` ("raw", "hour",
+    "day"; picked from the window when None). History already rolled up
+    past the asked resolution comes back at its stored one.
+    """
+    end = end or datetime.utcnow()
+
+    raw = select(GMPPrice.price, GMPPrice.updated_at).where(GMPPrice.ipo_id == ipo_id, GMPPrice.updated_at <= end)
+    stored = select(*_bucket_columns()).where(GMPBucket.ipo_id == ipo_id, GMPBucket.bucket_start <= end)
+    if start is not None:
+        raw = raw.where(GMPPrice.updated_at >= start)
+        stored = stored.where(GMPBucket.bucket_start >= bucket_start(start, DAY))
+
+    items = []  # (resolution, start, ohlc)
+    for price, updated_at in session.execute(raw):
+        if price is not None:
+            items.append((RAW, updated_at, _sample(price, updated_at)))
+    for row in session.execute(stored):
+        # Partial buckets at the window start are dropped rather than
+        # reported with samples from outside it
+        if start is not None and row.first_at < start:
+            continue
+        items.append((row.resolution, row.bucket_start, _ohlc(row)))
+
+    if not items:
+        return []
+    if resolution is None:
+        resolution = pick_resolution(start or min(item[1] for item in items), end)
+
+    points: Dict[datetime, dict] = {}
+    for item_resolution, item_start, ohlc in items:
+        if _RANK[item_resolution] < _RANK[resolution]:
+            item_start = bucket_start(item_start, resolution)
+        _add(points, item_start, ohlc)
+
+    return [
+        {"time": time, **{f: ohlc[f] for f in ("open", "high", "low", "close", "samples")}}
+        for time, ohlc in sorted(points.items())
+    ]
@@ -0,0 +1,49 @@
+from typing import Dict, Tuple
+from datetime import datetime, timedelta
+import os
+from sqlalchemy.orm import Session
+from services.ipo_queries import latest_gmp_query
+
+# An unchanged GMP is still written once it is this old, so the history
+# shows the value held; 0 writes every sample
+HEARTBEAT_HOURS = float(os.getenv("GMP_HEARTBEAT_HOURS", "24"))
+
+class GMPChangeWriter:
+    """
+    Decides which GMP samples are worth a gmp_prices row: a changed value,
+    or an unchanged one older than the heartbeat. The last written
+    (price, updated_at) of each IPO is kept in memory, so only IPOs not seen
+    since startup cost a query. Another worker may have written rows while
+    this one did not hold the scheduler lease, so clear() the cache on
+    taking the lease.
+    """
+    def __init__(self, heartbeat: timedelta = timedelta(hours=HEARTBEAT_HOURS)):
+        self.heartbeat = heartbeat
+        self._last: Dict[int, Tuple[float, datetime]] = {}
+
+    def _load(self, session: Session, ipo_ids):
+        missing = [ipo_id for ipo_id in ipo_ids if ipo_id not in self._last]
+        if not missing:
+            return
+        for ipo_id, price, updated_at in session.execute(latest_gmp_query(missing)):
+            self._last[ipo_id] = (price, updated_at)
+
+    def changed(self, session: Session, samples: Dict[int, float], now: datetime) -> Dict[int, float]:
+        """The subset of {ipo_id: gmp} that should be written at `now`."""
+        self._load(session, samples)
+        to_write = {}
+        for ipo_id, price in samples.items():
+            last = self._last.get(ipo_id)
+            if last is None or last[0] != price or now - last[1] >= self.heartbeat:
+                to_write[ipo_id] = price
+        return to_write
+
+    def remember(self, written: Dict[int, float], now: datetime):
+        """Call once the rows from changed() are committed."""
+        for ipo_id, price in written.items():
+            self._last[ipo_id] = (price, now)
+
+    def clear(self):
+        self._last.clear()
+
+gmp_writer = GMPChangeWriter()
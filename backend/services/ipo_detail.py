@@ -0,0 +1,218 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import IPO, IPOSnapshot
+from services.data_version import ipo_data_version, IPOS_SCOPE, SENTIMENT_SCOPE
+from services.gmp_history import fetch_gmp_history
+from services.snapshot import get_snapshot, snapshot_to_dict
+from services.response_cache import CachedResponse, cached_json_response
+from services.json_response import dumps
+
+# Seconds a detail body is served without being rebuilt, as a backstop for
+# writes that do not bump a data version (manual SQL)
+DETAIL_TTL_SECONDS = float(os.getenv("IPO_DETAIL_TTL_SECONDS", "300"))
+MAX_DETAIL_ENTRIES = 512
+
+def build_ipo_detail(session: Session, ipo_id: int, resolution: Optional[str] = None,
+                     days: Optional[int] = None) -> Optional[dict]:
+    """
+    The /ipos row of one IPO plus its dates and GMP history over the last
+    `days` (all of it when None) at `resolution`, and metrics derived from
+    that history. None when the IPO does not exist.
+    """
+    snap = get_snapshot(session, ipo_id)
+    if snap is None:
+        return None
+    ipo = session.get(IPO, ipo_id)
+
+    start = datetime.utcnow() - timedelta(days=days) if days else None
+    history = fetch_gmp_history(session, ipo_id, start=start, resolution=resolution)
+
+    detail = snapshot_to_dict(snap)
+    detail.update({
+        "open_date": ipo.open_date.isoformat() if ipo.open_date else None,
+        "close_date": ipo.close_date.isoformat() if ipo.close_date else None,
+        "issue_size": ipo.issue_size,
+        "price_low": ipo.price_low,
+        "price_high": ipo.price_high,
+        "gmp_history": [
+            {
+                "price": point["close"],
+                "date": point["time"].strftime("%Y-%m-%d"),
+                "time": point["time"],
+                "open": point["open"],
+                "high": point["high"],
+                "low": point["low"],
+                "close": point["close"],
+            }
+            for point in history
+        ],
+        "estimated_listing_price": round(snap.base_price + snap.gmp, 2) if snap.base_price else None,
+        "days_to_listing": (ipo.listing_date - date.today()).days if ipo.listing_date else None,
+    })
+
+    if history:
+        detail.update({
+            "gmp_high": max(point["high"] for point in history),
+            "gmp_low": min(point["low"] for point in history),
+            "gmp_change": round(history[-1]["close"] - history[0]["open"], 2),
+        })
+    else:
+        detail.update({"gmp_high": None, "gmp_low": None, "gmp_change": None})
+    return detail
+
+class IPODetailCache:
+    """
+    Serialized /ipos/{id} bodies, least recently used first out, each kept
+    for at most DETAIL_TTL_SECONDS. Keyed by ipo id and the history
+    parameters. Writers in this process call `invalidate(ipo_ids)` after
+    committing; writes from other processes arrive through
+    `follow_versions` with the data versions.
+
+    The ETag is the IPO id and a hash of the body, so every replica gives
+    the same one for the same data and conditional GETs work behind a load
+    balancer.
+    """
+    def __init__(self, max_entries: int = MAX_DETAIL_ENTRIES, ttl: float = DETAIL_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expires at, response, (bullish, bearish) it was built with)
+        self._entries: "OrderedDict[Tuple[int, tuple], Tuple[float, CachedResponse, tuple]]" = OrderedDict()
+        # Bumped per IPO on invalidation, all at once by clear() and on
+        # every sentiment check, so a build that raced a write is not stored
+        self._generations: Dict[int, int] = {}
+        self._resets = 0
+        self._checks = 0
+        # "ipos" and "sentiment" data versions as of the last follow_versions
+        self._versions: Dict[str, int] = {}
+
+    def _generation(self, ipo_id: int) -> Tuple[int, int]:
+        return (self._resets, self._generations.get(ipo_id, 0))
+
+    def _stamp(self, ipo_id: int) -> Tuple[int, int, int]:
+        """What has to be unchanged when a build finishes for it to be stored."""
+        return self._generation(ipo_id) + (self._checks,)
+
+    def _lookup(self, key) -> CachedResponse | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, entry, _ = item
+            if expires_at < time.monotonic() or entry.version != self._generation(key[0]):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _build(self, key, stamp: Tuple[int, int, int], payload: Optional[dict]) -> CachedResponse | None:
+        if payload is None:
+            return None
+        ipo_id = key[0]
+        body = dumps(payload)
+        etag = '"ipo-%d-%s"' % (ipo_id, hashlib.sha1(body).hexdigest()[:16])
+        entry = CachedResponse(stamp[:2], body, etag)
+        sentiment = (payload.get("sentiment_bullish") or 0, payload.get("sentiment_bearish") or 0)
+
+        with self._lock:
+            if stamp == self._stamp(ipo_id):
+                self._entries[key] = (time.monotonic() + self.ttl, entry, sentiment)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def get_or_build(self, ipo_id: int, params: tuple, builder: Callable[[], Optional[dict]]) -> CachedResponse | None:
+        key = (ipo_id, params)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry
+
+        stamp = self._stamp(ipo_id)
+        return self._build(key, stamp, builder())
+
+    async def get_or_build_async(self, ipo_id: int, params: tuple,
+                                 builder: Callable[[], Awaitable[Optional[dict]]]) -> CachedResponse | None:
+        key = (ipo_id, params)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry
+
+        stamp = self._stamp(ipo_id)
+        return self._build(key, stamp, await builder())
+
+    def respond(self, request: Request, ipo_id: int, params: tuple, builder: Callable[[], Optional[dict]]) -> Response | None:
+        entry = self.get_or_build(ipo_id, params, builder)
+        if entry is None:
+            return None
+        return cached_json_response(request, entry)
+
+    async def respond_async(self, request: Request, ipo_id: int, params: tuple,
+                            builder: Callable[[], Awaitable[Optional[dict]]]) -> Response | None:
+        entry = await self.get_or_build_async(ipo_id, params, builder)
+        if entry is None:
+            return None
+        return cached_json_response(request, entry)
+
+    def invalidate(self, ipo_ids: Iterable[int]):
+        ipo_ids = set(ipo_ids)
+        with self._lock:
+            for ipo_id in ipo_ids:
+                self._generations[ipo_id] = self._generations.get(ipo_id, 0) + 1
+            for key in [key for key in self._entries if key[0] in ipo_ids]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._resets += 1
+            self._entries.clear()
+
+    def follow_versions(self, versions: Dict[str, int], session_factory: Callable[[], Session]):
+        """
+        Data version listener. A write that moved the "ipos" version drops
+        every entry, except a vote flush: it bumps "sentiment" along with
+        "ipos", so when both moved by as much only votes were written, and
+        only the entries whose vote counts are no longer current are dropped.
+        """
+        ipos = versions.get(IPOS_SCOPE, 0)
+        with self._lock:
+            last = self._versions
+            if ipos == last.get(IPOS_SCOPE):
+                return
+            self._versions = {IPOS_SCOPE: ipos, SENTIMENT_SCOPE: versions.get(SENTIMENT_SCOPE, 0)}
+            if not last or ipo_data_version(versions) != ipo_data_version(last):
+                self._resets += 1
+                self._entries.clear()
+                return
+            self._checks += 1
+            built: Dict[int, Set[tuple]] = {}
+            for key, (_, _, counts) in self._entries.items():
+                built.setdefault(key[0], set()).add(counts)
+        if not built:
+            return
+
+        session = session_factory()
+        try:
+            current = {
+                ipo_id: (bullish or 0, bearish or 0)
+                for ipo_id, bullish, bearish in session.execute(
+                    select(IPOSnapshot.ipo_id, IPOSnapshot.sentiment_bullish, IPOSnapshot.sentiment_bearish)
+                    .where(IPOSnapshot.ipo_id.in_(list(built)))
+                )
+            }
+        finally:
+            session.close()
+        self.invalidate(ipo_id for ipo_id, counts in built.items() if counts != {current.get(ipo_id)})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+ipo_detail_cache = IPODetailCache()
@@ -1,4 +1,5 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Any
+from sqlalchemy import func, insert, case
 from sqlalchemy.orm import Session
 from models import IPO, GMPPrice
 from scrapers.base import ScrapedIPOData
@@ -6,71 +7,247 @@ from scrapers.utils import normalize_name
 from scrapers.ipowatch import IPOWatchScraper
 from scrapers.investorgain import InvestorGainScraper
 from scrapers.chittorgarh import ChittorgarhScraper
-from datetime import datetime
-from rapidfuzz import process, fuzz
+from scrapers.runner import run_scrapers, ScrapeResult
+from services.snapshot import refresh_snapshots
+from services.name_index import NameIndex, strict_name_index
+from services.upsert import dialect_insert, chunked
+from services.gmp_writer import gmp_writer
+from services.ipo_queries import parse_price_band, to_date
+from services.ipo_detail import ipo_detail_cache
+from services.data_version import bump_data_version, IPOS_SCOPE
+from datetime import datetime, date
+
+class KnownIPONames:
+    """
+    Normalized names of the IPOs in the DB -> ipo id. Kept across runs and
+    only reloaded when the IPO table changed size behind our back.
+    """
+    def __init__(self):
+        self.index: Optional[NameIndex] = None
+        self.ipo_count = 0
+
+    def load(self, db: Session) -> NameIndex:
+        count = db.query(func.count(IPO.id)).scalar()
+        if self.index is None or count != self.ipo_count:
+            index = strict_name_index()
+            for ipo_id, name in db.query(IPO.id, IPO.name).order_by(IPO.id):
+                index.add(normalize_name(name), ipo_id)
+            self.index = index
+            self.ipo_count = count
+            print(f"Loaded name index with {len(index)} names.")
+        return self.index
+
+    def remember(self, key: str, ipo_id: int, is_new: bool):
+        if self.index is None:
+            return
+        self.index.add(key, ipo_id)
+        if is_new:
+            self.ipo_count += 1
+
+    def clear(self):
+        self.index = None
+        self.ipo_count = 0
+
+known_names = KnownIPONames()
+
+# Records of the latest successful scrape of each source. A run that
+# scrapes only some sources merges them with these for the others.
+source_records: Dict[str, List[ScrapedIPOData]] = {}
+
+def all_scrapers() -> List:
+    return [
+        IPOWatchScraper(),
+        InvestorGainScraper(),
+        ChittorgarhScraper()
+    ]
+
+# Kept from the DB when no source has them this run (None, or this empty value)
+KEEP_IF_MISSING = {
+    "price_band": "", "open_date": None, "close_date": None, "listing_date": None,
+    "lot_size": 0, "issue_size": "",
+}
+
+def group_by_name(items: List[ScrapedIPOData], known: Optional[NameIndex] = None) -> Tuple[Dict[str, List[ScrapedIPOData]], Dict[str, Any]]:
+    """
+    Groups scraped items by fuzzy-matched normalized name.
+
+    Items whose name matches one in `known` are grouped under that name;
+    the rest are matched against the groups created so far in this run.
+    Returns (grouped, matched) where `matched` maps a group key to the value
+    stored for it in `known`.
+    """
+    norms = [normalize_name(item.name) for item in items]
+    if known is not None and len(known):
+        known_hits = known.match_many(norms)
+    else:
+        known_hits = [None] * len(norms)
+
+    grouped: Dict[str, List[ScrapedIPOData]] = {}
+    matched: Dict[str, Any] = {}
+    run_index = NameIndex()
+
+    for item, norm, hit in zip(items, norms, known_hits):
+        if not norm: continue
+
+        if hit:
+            key = hit[0]
+            matched[key] = hit[1]
+        else:
+            # Exact or fuzzy match against groups already formed this run
+            run_hit = run_index.match(norm)
+            if run_hit:
+                key = run_hit[0]
+            else:
+                # New group
+                key = norm
+                run_index.add(key, key)
+
+        grouped.setdefault(key, []).append(item)
+
+    return grouped, matched
 
 class IPOMergerService:
     def __init__(self, db: Session):
         self.db = db
+        # Seconds spent per source in the last scrape_and_merge run
+        self.last_timings: Dict[str, float] = {}
+
+    def scrape_and_merge(self, sources: Optional[List[str]] = None) -> List[ScrapeResult]:
+        """
+        Scrapes `sources` (all when None) and merges their records with the
+        latest ones of the other sources. Returns the scrape results.
+        """
+        scrapers = [s for s in all_scrapers() if sources is None or s.source in sources]
 
-    def scrape_and_merge(self):
-        scrapers = [
-            IPOWatchScraper(),
-            InvestorGainScraper(),
-            ChittorgarhScraper()
-        ]
+        # One shared browser, all sources concurrently
+        results = run_scrapers(scrapers)
+        self.last_timings = {r.source: round(r.seconds, 2) for r in results}
+
+        for result in results:
+            # A failed source keeps its previous records
+            if result.error is None:
+                source_records[result.source] = result.records
 
         all_data: List[ScrapedIPOData] = []
-        for scraper in scrapers:
-            try:
-                data = scraper.scrape()
-                all_data.extend(data)
-            except Exception as e:
-                print(f"Error running scraper {scraper.__class__.__name__}: {e}")
-
-        # Group by normalized name with fuzzy matching
-        grouped: Dict[str, List[ScrapedIPOData]] = {}
-
-        # Keys of grouped dict are normalized names
-        # When processing a new item, check fuzzy match against existing keys
-
-        for item in all_data:
-            norm = normalize_name(item.name)
-            if not norm: continue
-
-            # Try exact match first
-            if norm in grouped:
-                grouped[norm].append(item)
-                continue
-
-            # Try fuzzy match
-            existing_keys = list(grouped.keys())
-            if existing_keys:
-                # Use partial_ratio or token_set_ratio
-                match = process.extractOne(norm, existing_keys, scorer=fuzz.token_set_ratio)
-                if match and match[1] > 85: # Threshold
-                    matched_key = match[0]
-                    grouped[matched_key].append(item)
-                    continue
-
-            # New group
-            grouped[norm] = [item]
-
-        print(f"Found {len(grouped)} unique IPOs (after fuzzy merge).")
-
-        # Pre-fetch existing IPOs to optimize DB queries
-        all_db_ipos = self.db.query(IPO).all()
-        existing_map = {}
-        for ipo in all_db_ipos:
-            n_name = normalize_name(ipo.name)
-            if n_name:
-                existing_map[n_name] = ipo
-
-        # Merge and Update DB
+        for records in source_records.values():
+            all_data.extend(records)
+
+        # Group by normalized name with fuzzy matching, against the names
+        # already in the DB first and then within this run
+        name_index = known_names.load(self.db)
+        grouped, matched = group_by_name(all_data, name_index)
+
+        print(f"Found {len(grouped)} unique IPOs (after fuzzy merge), {len(matched)} already known.")
+
+        # Matched IPOs that still exist; groups that matched the same IPO
+        # under different spellings are merged into one update
+        existing_ids = set()
+        if matched:
+            existing_ids = {row[0] for row in self.db.query(IPO.id).filter(IPO.id.in_(set(matched.values())))}
+
+        existing_groups: Dict[int, List[ScrapedIPOData]] = {}
+        new_groups: Dict[str, List[ScrapedIPOData]] = {}
         for norm_name, items in grouped.items():
-            self._process_group(norm_name, items, existing_map)
+            ipo_id = matched.get(norm_name)
+            if ipo_id in existing_ids:
+                existing_groups.setdefault(ipo_id, []).extend(items)
+            else:
+                new_groups[norm_name] = items
+
+        # Merge and Update DB, all in one transaction
+        try:
+            new_ids, gmp_written, written_at = self._write(existing_groups, new_groups)
+            touched_ids = list(existing_groups) + list(new_ids.values())
+
+            # Keep the read model in step with what was just written
+            refresh_snapshots(self.db, touched_ids)
+            bump_data_version(self.db, IPOS_SCOPE)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        gmp_writer.remember(gmp_written, written_at)
+        ipo_detail_cache.invalidate(touched_ids)
+
+        # Remember new IPOs and new spellings for the next run
+        for norm_name in grouped:
+            ipo_id = matched.get(norm_name)
+            if ipo_id in existing_ids:
+                known_names.remember(norm_name, ipo_id, is_new=False)
+        for norm_name, ipo_id in new_ids.items():
+            known_names.remember(norm_name, ipo_id, is_new=True)
+        return results
+
+    def _write(self, existing_groups: Dict[int, List[ScrapedIPOData]], new_groups: Dict[str, List[ScrapedIPOData]]) -> Tuple[Dict[str, int], Dict[int, float], datetime]:
+        """
+        Upserts every merged IPO and appends a GMP row for each one whose GMP
+        changed, with a few multi-row statements. Returns the ids of the new
+        groups by name key, the GMP values written and their timestamp.
+        Does not commit.
+        """
+        now = datetime.utcnow()
+        gmp_by_id: Dict[int, float] = {}
 
-    def _process_group(self, norm_name: str, items: List[ScrapedIPOData], existing_map: Dict[str, IPO]):
+        # Existing IPOs: upsert on the primary key
+        rows = []
+        for ipo_id, items in existing_groups.items():
+            row = self._process_group(items)
+            gmp_by_id[ipo_id] = row.pop("gmp")
+            rows.append({"id": ipo_id, **row})
+        for chunk in chunked(rows):
+            self.db.execute(self._upsert(chunk, IPO.id))
+
+        # New IPOs: upsert on the normalized name, in case one was added
+        # since the name index was loaded
+        new_ids: Dict[str, int] = {}
+        rows = []
+        gmp_by_key: Dict[str, float] = {}
+        for norm_name, items in new_groups.items():
+            row = self._process_group(items)
+            gmp_by_key[norm_name] = row.pop("gmp")
+            rows.append({"name_key": norm_name, **row})
+        for chunk in chunked(rows):
+            stmt = self._upsert(chunk, IPO.name_key).returning(IPO.id, IPO.name_key)
+            for ipo_id, name_key in self.db.execute(stmt):
+                new_ids[name_key] = ipo_id
+                gmp_by_id[ipo_id] = gmp_by_key[name_key]
+
+        # GMP history: only values that moved, plus heartbeats
+        gmp_written = gmp_writer.changed(self.db, gmp_by_id, now)
+        if gmp_written:
+            self.db.execute(insert(GMPPrice), [
+                {"ipo_id": ipo_id, "price": gmp, "updated_at": now}
+                for ipo_id, gmp in gmp_written.items()
+            ])
+        print(f"GMP: {len(gmp_written)} of {len(gmp_by_id)} values written.")
+
+        return new_ids, gmp_written, now
+
+    def _upsert(self, rows: List[dict], conflict_column):
+        stmt = dialect_insert(self.db, IPO).values(rows)
+        excluded = stmt.excluded
+        # Name, type and status always follow the latest scrape; details
+        # only when some source had them
+        set_ = {
+            "name": excluded.name,
+            "ipo_type": excluded.ipo_type,
+            "status": excluded.status,
+        }
+        for column, empty in KEEP_IF_MISSING.items():
+            value = excluded[column] if empty is None else func.nullif(excluded[column], empty)
+            set_[column] = func.coalesce(value, IPO.__table__.c[column])
+        # The parsed ends follow price_band
+        band_missing = func.nullif(excluded.price_band, "").is_(None)
+        set_["price_low"] = case((band_missing, IPO.price_low), else_=excluded.price_low)
+        set_["price_high"] = case((band_missing, IPO.price_high), else_=excluded.price_high)
+        return stmt.on_conflict_do_update(index_elements=[conflict_column], set_=set_)
+
+    def _process_group(self, items: List[ScrapedIPOData]) -> dict:
+        """
+        Consolidates the scraped items of one IPO into its column values
+        plus "gmp".
+        """
         # Strategy:
         # 1. Base info from Chittorgarh (most detailed), fallback to others.
         # 2. GMP from IPOWatch (reliable), fallback to InvestorGain.
@@ -90,24 +267,26 @@ class IPOMergerService:
         name = primary.name
         ipo_type = primary.ipo_type
         price_band = primary.price_band
-        open_date = primary.open_date
-        close_date = primary.close_date
-        listing_date = primary.listing_date
+        open_date = to_date(primary.open_date)
+        close_date = to_date(primary.close_date)
+        listing_date = to_date(primary.listing_date)
         lot_size = primary.lot_size
         issue_size = primary.issue_size
 
         # Fill gaps from others
         for item in items_details_sorted[1:]:
             if not price_band: price_band = item.price_band
-            if not open_date: open_date = item.open_date
-            if not close_date: close_date = item.close_date
-            if not listing_date: listing_date = item.listing_date
+            if not open_date: open_date = to_date(item.open_date)
+            if not close_date: close_date = to_date(item.close_date)
+            if not listing_date: listing_date = to_date(item.listing_date)
             if not lot_size: lot_size = item.lot_size
             if not issue_size: issue_size = item.issue_size
 
+        price_low, price_high = parse_price_band(price_band)
+
         # Determine Status
         status = "Upcoming"
-        today = datetime.now().strftime("%Y-%m-%d")
+        today = date.today()
         if open_date and close_date:
             if today >= open_date and today <= close_date:
                 status = "Open"
@@ -130,45 +309,17 @@ class IPOMergerService:
         elif investor_item and investor_item.gmp:
             gmp = investor_item.gmp
 
-        # DB Update
-        existing_ipo = existing_map.get(norm_name)
-
-        if existing_ipo:
-            # Update
-            existing_ipo.name = name # Update name to preferred format if changed
-            existing_ipo.ipo_type = ipo_type
-            if price_band: existing_ipo.price_band = price_band
-            if open_date: existing_ipo.open_date = open_date
-            if close_date: existing_ipo.close_date = close_date
-            if listing_date: existing_ipo.listing_date = listing_date
-            if lot_size: existing_ipo.lot_size = lot_size
-            if issue_size: existing_ipo.issue_size = issue_size
-            existing_ipo.status = status
-            self.db.commit()
-            ipo_id = existing_ipo.id
-        else:
-            # Create
-            new_ipo = IPO(
-                name=name,
-                ipo_type=ipo_type,
-                price_band=price_band,
-                open_date=open_date,
-                close_date=close_date,
-                listing_date=listing_date,
-                lot_size=lot_size,
-                issue_size=issue_size,
-                status=status
-            )
-            self.db.add(new_ipo)
-            self.db.commit()
-            self.db.refresh(new_ipo)
-            ipo_id = new_ipo.id
-
-        # Add GMP Entry
-        new_gmp = GMPPrice(
-            ipo_id=ipo_id,
-            price=gmp,
-            updated_at=datetime.utcnow()
-        )
-        self.db.add(new_gmp)
-        self.db.commit()
+        return {
+            "name": name,
+            "ipo_type": ipo_type,
+            "price_band": price_band,
+            "price_low": price_low,
+            "price_high": price_high,
+            "open_date": open_date,
+            "close_date": close_date,
+            "listing_date": listing_date,
+            "lot_size": lot_size,
+            "issue_size": issue_size,
+            "status": status,
+            "gmp": gmp,
+        }
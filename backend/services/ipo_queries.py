@@ -0,0 +1,175 @@
+from typing import List, Dict, Optional, Iterable, Tuple
+from datetime import date
+import re
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from models import IPO, GMPPrice, GMPBucket
+
+# Number of GMP points returned as the sparkline trend for each IPO
+TREND_POINTS = 20
+
+_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+def parse_price_band(price_band: str | None) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Low and high end of a price band, e.g. "100-120" -> (100, 120),
+    "₹93.00 to ₹103.00" -> (93, 103), "₹100" -> (100, 100).
+    (None, None) when it holds no number.
+    """
+    if not price_band:
+        return None, None
+    numbers = [float(n.replace(",", "")) for n in _NUMBER.findall(price_band)]
+    if not numbers:
+        return None, None
+    return numbers[0], numbers[-1]
+
+def parse_base_price(price_band: str | None) -> float:
+    """
+    Upper end of the price band, e.g. "100-120" -> 120, "₹100" -> 100.
+    """
+    return parse_price_band(price_band)[1] or 0.0
+
+def to_date(value) -> Optional[date]:
+    """YYYY-MM-DD string (as the scrapers produce) or date -> date, else None."""
+    if isinstance(value, date):
+        return value
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value.strip())
+    except ValueError:
+        return None
+
+def growth_percent(gmp: float, base_price: float) -> float:
+    if base_price > 0:
+        return round((gmp / base_price) * 100, 2)
+    return 0.0
+
+def latest_gmp_query(ipo_ids: Optional[Iterable[int]] = None):
+    """
+    One row per IPO with its most recent GMP, ranked with a window function
+    so every IPO is resolved in a single pass over gmp_prices.
+    """
+    ranked = select(
+        GMPPrice.ipo_id,
+        GMPPrice.price,
+        GMPPrice.updated_at,
+        func.row_number().over(
+            partition_by=GMPPrice.ipo_id,
+            order_by=(GMPPrice.updated_at.desc(), GMPPrice.id.desc())
+        ).label("rn")
+    )
+    if ipo_ids is not None:
+        ranked = ranked.where(GMPPrice.ipo_id.in_(list(ipo_ids)))
+    ranked = ranked.subquery()
+
+    return select(ranked.c.ipo_id, ranked.c.price, ranked.c.updated_at).where(ranked.c.rn == 1)
+
+def trend_query(points: int = TREND_POINTS, ipo_ids: Optional[Iterable[int]] = None):
+    """
+    Latest `points` raw GMP samples of every IPO, newest first.
+    """
+    ranked = select(
+        GMPPrice.ipo_id,
+        GMPPrice.price,
+        GMPPrice.updated_at,
+        func.row_number().over(
+            partition_by=GMPPrice.ipo_id,
+            order_by=(GMPPrice.updated_at.desc(), GMPPrice.id.desc())
+        ).label("rn")
+    )
+    if ipo_ids is not None:
+        ranked = ranked.where(GMPPrice.ipo_id.in_(list(ipo_ids)))
+    ranked = ranked.subquery()
+
+    return (
+        select(ranked.c.ipo_id, ranked.c.price, ranked.c.updated_at)
+        .where(ranked.c.rn <= points)
+        .order_by(ranked.c.ipo_id, ranked.c.rn)
+    )
+
+def bucket_trend_query(points: int = TREND_POINTS, ipo_ids: Optional[Iterable[int]] = None):
+    """
+    Closing GMP of the latest `points` rolled-up buckets of every IPO,
+    newest first. Fills the trend of IPOs with few recent raw samples.
+    """
+    ranked = select(
+        GMPBucket.ipo_id,
+        GMPBucket.close,
+        GMPBucket.bucket_start,
+        func.row_number().over(
+            partition_by=GMPBucket.ipo_id,
+            order_by=GMPBucket.bucket_start.desc()
+        ).label("rn")
+    )
+    if ipo_ids is not None:
+        ranked = ranked.where(GMPBucket.ipo_id.in_(list(ipo_ids)))
+    ranked = ranked.subquery()
+
+    return (
+        select(ranked.c.ipo_id, ranked.c.close, ranked.c.bucket_start)
+        .where(ranked.c.rn <= points)
+        .order_by(ranked.c.ipo_id, ranked.c.rn)
+    )
+
+def fetch_ipo_listing(session: Session, ipo_ids: Optional[Iterable[int]] = None) -> List[dict]:
+    """
+    Builds the /ipos payload with three set-based queries: IPOs joined to
+    their latest GMP, then the latest raw and rolled-up trend points of all
+    IPOs together.
+    Pass `ipo_ids` to derive the rows of a subset only.
+    """
+    if ipo_ids is not None:
+        ipo_ids = list(ipo_ids)
+
+    latest = latest_gmp_query(ipo_ids).subquery()
+    stmt = (
+        select(IPO, latest.c.price)
+        .outerjoin(latest, latest.c.ipo_id == IPO.id)
+        .order_by(IPO.id)
+    )
+    if ipo_ids is not None:
+        stmt = stmt.where(IPO.id.in_(ipo_ids))
+    rows = session.execute(stmt).all()
+
+    # Latest points from raw samples and buckets together, oldest first
+    samples: Dict[int, list] = {}
+    for ipo_id, price, at in session.execute(trend_query(ipo_ids=ipo_ids)):
+        samples.setdefault(ipo_id, []).append((at, price))
+    for ipo_id, price, at in session.execute(bucket_trend_query(ipo_ids=ipo_ids)):
+        samples.setdefault(ipo_id, []).append((at, price))
+
+    trends: Dict[int, List[dict]] = {}
+    for ipo_id, points in samples.items():
+        points.sort(key=lambda point: point[0])
+        trends[ipo_id] = [
+            {"price": price, "date": at.strftime("%Y-%m-%d")}
+            for at, price in points[-TREND_POINTS:]
+        ]
+
+    result = []
+    for ipo, latest_price in rows:
+        gmp_val = latest_price if latest_price is not None else 0.0
+        base_price = ipo.price_high if ipo.price_high is not None else parse_base_price(ipo.price_band)
+
+        result.append({
+            "id": ipo.id,
+            "name": ipo.name,
+            "symbol": ipo.symbol,
+            "ipo_type": ipo.ipo_type,
+            "gmp": gmp_val,
+            "growth_percent": growth_percent(gmp_val, base_price),
+            "listing_date": ipo.listing_date.isoformat() if ipo.listing_date else None,
+            "base_price": base_price,
+            "status": ipo.status,
+            "price_band": ipo.price_band,
+            "type": ipo.ipo_type,
+            "trend": trends.get(ipo.id, []),
+            "lot_size": ipo.lot_size,
+            "kostak_rate": ipo.kostak_rate,
+            "retail_subscription_x": ipo.retail_subscription_x,
+            "allotment_url": ipo.allotment_url,
+            "sentiment_bullish": ipo.sentiment_bullish,
+            "sentiment_bearish": ipo.sentiment_bearish
+        })
+    return result
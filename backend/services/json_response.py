@@ -0,0 +1,76 @@
+"""
+JSON encoding and compression of API responses. Bodies are encoded with
+orjson straight from the dicts the services build (dates and datetimes
+included), without a jsonable_encoder pass, and compressed with brotli
+or gzip when they are over COMPRESS_MIN_BYTES and the client accepts it.
+orjson and brotli are optional; without them this falls back to the
+standard json module and gzip only.
+"""
+import gzip
+import json
+import os
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def _fallback(value: Any) -> Any:
+    # Anything orjson does not know natively (Decimal, pydantic models...)
+    return jsonable_encoder(value)
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_fallback, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """JSONResponse that encodes with dumps() instead of jsonable_encoder + json."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def pick_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    "br" or "gzip" from an Accept-Encoding header, whichever the client
+    prefers (brotli on ties, when available); None for identity.
+    """
+    if not accept_encoding:
+        return None
+    best, best_q = None, 0.0
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if name not in ("br", "gzip") or (name == "br" and brotli is None):
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if q > best_q or (q == best_q and name == "br"):
+            best, best_q = name, q
+    return best
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding}")
@@ -0,0 +1,83 @@
+"""
+Leader election through a row of the scheduler_leases table, so that only
+one worker process runs the scheduled jobs even when several are started.
+"""
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import SchedulerLease
+
+# A holder that stops renewing loses the lease after this many seconds
+LEASE_SECONDS = float(os.getenv("SCHEDULER_LEASE_SECONDS", "60"))
+
+def default_holder() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class LeaderLease:
+    """
+    try_acquire() takes the lease when it is free or expired and renews it
+    when it is already ours; call it every ttl/3 or so. held() says whether
+    the lease was ours at the last successful renewal and has not expired
+    since.
+    """
+    def __init__(self, session_factory: Callable[[], Session], name: str = "scheduler",
+                 holder: Optional[str] = None, ttl: float = LEASE_SECONDS):
+        self.session_factory = session_factory
+        self.name = name
+        self.holder = holder or default_holder()
+        self.ttl = ttl
+        self.expires_at: Optional[datetime] = None
+
+    def try_acquire(self, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        session = self.session_factory()
+        try:
+            result = session.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now),
+                )
+                .values(holder=self.holder, expires_at=expires_at)
+            )
+            if result.rowcount == 0:
+                if session.get(SchedulerLease, self.name) is not None:
+                    # Someone else holds it
+                    session.rollback()
+                    self.expires_at = None
+                    return False
+                session.add(SchedulerLease(name=self.name, holder=self.holder, expires_at=expires_at))
+            session.commit()
+        except IntegrityError:
+            # Another process created the row first
+            session.rollback()
+            self.expires_at = None
+            return False
+        finally:
+            session.close()
+
+        self.expires_at = expires_at
+        return True
+
+    def held(self, now: Optional[datetime] = None) -> bool:
+        return self.expires_at is not None and (now or datetime.utcnow()) < self.expires_at
+
+    def release(self):
+        if self.expires_at is None:
+            return
+        session = self.session_factory()
+        try:
+            session.execute(
+                update(SchedulerLease)
+                .where(SchedulerLease.name == self.name, SchedulerLease.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+            )
+            session.commit()
+        finally:
+            session.close()
+        self.expires_at = None
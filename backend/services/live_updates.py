@@ -0,0 +1,146 @@
+"""
+Server-Sent Events for the dashboards. One LiveBroker per API process
+follows the data versions (it is subscribed to the DataVersionWatcher),
+reloads a channel once per version change, diffs it against what it last
+sent and fans the same encoded event out to every connected stream. An
+idle stream costs a queue and a heartbeat, not a query.
+
+Events:
+    snapshot  {"channel", "version", "rows"}               on connect
+    diff      {"channel", "version", "changed", "removed"} after a write
+"""
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from services.json_response import dumps
+
+# Seconds between keep-alive comments on an idle stream
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Events buffered per stream; a client this far behind is disconnected
+# and gets a fresh snapshot when its EventSource reconnects
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "32"))
+
+def sse_event(event: str, payload) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(payload) + b"\n\n"
+
+class _Channel:
+    def __init__(self, loader: Callable[[Session], List[dict]], key: str):
+        self.loader = loader
+        self.key = key
+        self.version: Optional[int] = None
+        self.rows: Optional[Dict] = None
+        self.snapshot: Optional[bytes] = None
+        self.lock = asyncio.Lock()
+
+class _Stream:
+    __slots__ = ("channels", "queue")
+
+    def __init__(self, channels: Set[str]):
+        self.channels = channels
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(LIVE_QUEUE_SIZE)
+
+class LiveBroker:
+    """
+    `notify(scope, version)` may be called from any thread; reloads run on
+    the event loop passed to start(), with the query itself on a worker
+    thread.
+    """
+    def __init__(self, session_factory: Callable[[], Session],
+                 channels: Dict[str, Tuple[Callable[[Session], List[dict]], str]]):
+        """`channels` maps a data scope to (row loader, name of the row key)."""
+        self.session_factory = session_factory
+        self.channels = {name: _Channel(loader, key) for name, (loader, key) in channels.items()}
+        self.streams: Set[_Stream] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def stop(self):
+        for stream in list(self.streams):
+            self._close(stream)
+        self.loop = None
+
+    def notify(self, scope: str, version: int):
+        """DataVersionWatcher listener."""
+        loop = self.loop
+        if loop is None or scope not in self.channels:
+            return
+        loop.call_soon_threadsafe(lambda: loop.create_task(self.refresh(scope, version)))
+
+    def _load(self, channel: _Channel) -> Dict:
+        session = self.session_factory()
+        try:
+            return {row[channel.key]: row for row in channel.loader(session)}
+        finally:
+            session.close()
+
+    async def _ensure(self, name: str, version: Optional[int] = None) -> _Channel:
+        channel = self.channels[name]
+        async with channel.lock:
+            if channel.rows is None:
+                channel.rows = await asyncio.to_thread(self._load, channel)
+                channel.version = version
+                channel.snapshot = sse_event("snapshot", {
+                    "channel": name, "version": version, "rows": list(channel.rows.values()),
+                })
+        return channel
+
+    async def refresh(self, name: str, version: int):
+        """Reloads `name` and sends what changed to every stream on it."""
+        channel = self.channels[name]
+        if channel.rows is None:
+            # Nobody has asked for it yet; load lazily on first connect
+            channel.version = version
+            return
+        async with channel.lock:
+            if channel.version is not None and version <= channel.version:
+                return
+            rows = await asyncio.to_thread(self._load, channel)
+            changed = [row for key, row in rows.items() if channel.rows.get(key) != row]
+            removed = [key for key in channel.rows if key not in rows]
+            channel.rows, channel.version = rows, version
+            channel.snapshot = sse_event("snapshot", {"channel": name, "version": version, "rows": list(rows.values())})
+            if not changed and not removed:
+                return
+            event = sse_event("diff", {"channel": name, "version": version, "changed": changed, "removed": removed})
+
+        self.publish(name, event)
+
+    def publish(self, name: str, event: bytes):
+        for stream in list(self.streams):
+            if name not in stream.channels:
+                continue
+            try:
+                stream.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._close(stream)
+
+    def _close(self, stream: _Stream):
+        self.streams.discard(stream)
+        # Makes room for the end marker if the queue is full
+        while stream.queue.full():
+            stream.queue.get_nowait()
+        stream.queue.put_nowait(None)
+
+    async def stream(self, channels: List[str], heartbeat: float = LIVE_HEARTBEAT_SECONDS):
+        """SSE body: a snapshot per channel, then diffs as they happen."""
+        stream = _Stream(set(channels))
+        self.streams.add(stream)
+        try:
+            # Reconnecting clients wait this long before retrying
+            yield b"retry: 3000\n\n"
+            for name in channels:
+                yield (await self._ensure(name, self.channels[name].version)).snapshot
+            while True:
+                try:
+                    event = await asyncio.wait_for(stream.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.streams.discard(stream)
@@ -1,6 +1,13 @@
+import os
 import yfinance as yf
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from models import MarketIndex
+from services.data_version import bump_data_version, MARKET_SCOPE
+from services.upsert import dialect_insert, chunked
 import logging
 
 # Configure Logging
@@ -21,72 +28,115 @@ NIFTY_50_TICKERS = [
     "BPCL.NS", "HEROMOTOCO.NS", "INDUSINDBK.NS"
 ]
 
+# Two trading days are enough for the latest price and the previous close
+MARKET_DATA_PERIOD = os.getenv("MARKET_DATA_PERIOD", "2d")
+# Tickers per yf.download call, and how many calls run at once
+MARKET_DATA_CHUNK = int(os.getenv("MARKET_DATA_CHUNK", "13"))
+MARKET_DATA_WORKERS = int(os.getenv("MARKET_DATA_WORKERS", "4"))
+
 INDICES = {
     "^NSEI": "NIFTY 50",
     "^BSESN": "SENSEX"
 }
 
-def update_market_data(session: Session):
+def _ticker_frame(data, ticker):
+    """One ticker's rows out of a yf.download result."""
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker not in data.columns.get_level_values(0):
+            return None
+        return data[ticker]
+    return data
+
+def _download_chunk(tickers: List[str]) -> Dict[str, object]:
+    # group_by='ticker' gives a MultiIndex with the ticker on level 0
+    data = yf.download(tickers, period=MARKET_DATA_PERIOD, group_by='ticker',
+                       progress=False, threads=False)
+    frames = {}
+    for ticker in tickers:
+        df = _ticker_frame(data, ticker)
+        if df is not None:
+            frames[ticker] = df.dropna()
+    return frames
+
+def download_quotes(tickers: List[str]) -> Dict[str, object]:
+    """Recent daily rows per ticker, downloaded in concurrent chunks."""
+    chunks = [tickers[i:i + MARKET_DATA_CHUNK] for i in range(0, len(tickers), MARKET_DATA_CHUNK)]
+    frames = {}
+    with ThreadPoolExecutor(max_workers=min(MARKET_DATA_WORKERS, len(chunks)) or 1) as pool:
+        for chunk, result in zip(chunks, pool.map(_download_chunk, chunks)):
+            frames.update(result)
+    return frames
+
+def _previous_close(df, existing: Optional[MarketIndex], latest_at: Optional[datetime]) -> Optional[float]:
+    if len(df) >= 2:
+        return float(df.iloc[-2]['Close'])
+    # Only today's row in the window: the stored row of the same day still
+    # knows the previous close through its change percent
+    if (existing is not None and existing.current_price and existing.change_percent is not None
+            and latest_at is not None and existing.last_updated is not None
+            and existing.last_updated.date() == latest_at.date()):
+        return existing.current_price / (1 + existing.change_percent / 100)
+    return None
+
+def update_market_data(session: Session) -> Optional[int]:
     """
     Fetches real-time data for NIFTY 50, SENSEX, and NIFTY 50 constituents
-    and updates the MarketIndex table.
+    and upserts the MarketIndex table in one statement. Returns how many
+    prices changed, or None when the download failed.
     """
     logger.info("Starting Market Data Update...")
 
     all_tickers = list(INDICES.keys()) + NIFTY_50_TICKERS
 
     try:
-        # Download data for last 5 days to ensure we have previous close
-        # group_by='ticker' ensures we get a MultiIndex if len(tickers) > 1
-        data = yf.download(all_tickers, period="5d", group_by='ticker', progress=False)
+        frames = download_quotes(all_tickers)
+        existing = {row.name: row for row in session.query(MarketIndex)}
 
+        rows = []
+        changed = 0
         for ticker in all_tickers:
             try:
-                # Handle different dataframe structures
-                if len(all_tickers) == 1:
-                    df = data
-                else:
-                    df = data[ticker]
-
-                # Drop NaN rows
-                df = df.dropna()
-
-                if df.empty or len(df) < 2:
-                    logger.warning(f"Not enough data for {ticker}")
+                df = frames.get(ticker)
+                if df is None or df.empty:
+                    logger.warning(f"No data for {ticker}")
                     continue
 
-                # Get latest price and previous close
-                latest_row = df.iloc[-1]
-                prev_row = df.iloc[-2]
-
                 # 'Close' is the current price during market hours in yfinance (usually)
+                latest_row = df.iloc[-1]
                 current_price = float(latest_row['Close'])
-                previous_close = float(prev_row['Close'])
-
-                change = current_price - previous_close
-                change_percent = (change / previous_close) * 100
+                last_updated = latest_row.name.to_pydatetime() if hasattr(latest_row.name, 'to_pydatetime') else None
 
-                # Determine Name
                 name = INDICES.get(ticker, ticker.replace(".NS", ""))
+                previous_close = _previous_close(df, existing.get(name), last_updated)
+                if not previous_close:
+                    logger.warning(f"Not enough data for {ticker}")
+                    continue
 
-                # Update or Insert DB
-                market_index = session.query(MarketIndex).filter(MarketIndex.name == name).first()
-
-                if not market_index:
-                    market_index = MarketIndex(name=name)
-                    session.add(market_index)
-
-                market_index.current_price = current_price
-                market_index.change_percent = round(change_percent, 2)
-                market_index.last_updated = latest_row.name.to_pydatetime() if hasattr(latest_row.name, 'to_pydatetime') else None
+                change_percent = round((current_price - previous_close) / previous_close * 100, 2)
+                stored = existing.get(name)
+                if stored is None or stored.current_price != current_price:
+                    changed += 1
+                rows.append(dict(name=name, current_price=current_price,
+                                 change_percent=change_percent, last_updated=last_updated))
 
             except Exception as e:
                 logger.error(f"Error processing {ticker}: {e}")
                 continue
 
+        # ~50 rows, a single multi-row upsert
+        for chunk in chunked(rows):
+            stmt = dialect_insert(session, MarketIndex).values(chunk)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=[MarketIndex.name],
+                set_={col: stmt.excluded[col] for col in ("current_price", "change_percent", "last_updated")},
+            ))
+        if changed:
+            bump_data_version(session, MARKET_SCOPE)
         session.commit()
-        logger.info("Market Data Update Completed Successfully.")
+        logger.info(f"Market Data Update Completed Successfully, {changed} prices changed.")
+        return changed
 
     except Exception as e:
         logger.error(f"Failed to fetch market data: {e}")
         session.rollback()
+        return None
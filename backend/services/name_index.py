@@ -0,0 +1,101 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple, Iterable
+from rapidfuzz import process, fuzz
+
+# (matched key, stored value, score)
+Match = Tuple[str, Any, float]
+
+class NameIndex:
+    """
+    Fuzzy lookup of normalized names.
+
+    Candidates are blocked by the prefix of each token, so a query is only
+    scored against the few names sharing a word stem with it instead of
+    every key. Blocks of very common stems ("shre", "indu") are skipped
+    when the query has a more selective one.
+
+    Candidates shorter or longer than the query by more than
+    `min_length_ratio` are never scored. With the default token_set_ratio
+    a name whose words are a subset of another's scores 100, which is fine
+    for spellings within one scrape but not for issuers sharing a prefix;
+    see strict_name_index.
+    """
+    def __init__(self, threshold: float = 85, prefix_len: int = 4, max_block: int = 50, scorer=fuzz.token_set_ratio,
+                 min_length_ratio: float = 0.0):
+        self.threshold = threshold
+        self.prefix_len = prefix_len
+        self.max_block = max_block
+        self.scorer = scorer
+        self.min_length_ratio = min_length_ratio
+        self._keys: List[str] = []
+        self._values: List[Any] = []
+        self._positions: Dict[str, int] = {}
+        self._blocks: Dict[str, List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _block_keys(self, key: str) -> set:
+        return {token[:self.prefix_len] for token in key.split()}
+
+    def add(self, key: str, value: Any):
+        if not key:
+            return
+        pos = self._positions.get(key)
+        if pos is not None:
+            self._values[pos] = value
+            return
+        pos = len(self._keys)
+        self._keys.append(key)
+        self._values.append(value)
+        self._positions[key] = pos
+        for block in self._block_keys(key):
+            self._blocks[block].append(pos)
+
+    def get(self, key: str) -> Any:
+        pos = self._positions.get(key)
+        return self._values[pos] if pos is not None else None
+
+    def _candidates(self, key: str) -> List[int]:
+        blocks = [self._blocks[b] for b in self._block_keys(key) if b in self._blocks]
+        if not blocks:
+            return []
+        selective = [b for b in blocks if len(b) <= self.max_block]
+        positions = set()
+        for block in selective or [min(blocks, key=len)]:
+            positions.update(block)
+        return sorted(positions)
+
+    def _length_ok(self, a: str, b: str) -> bool:
+        return min(len(a), len(b)) >= self.min_length_ratio * max(len(a), len(b))
+
+    def match(self, key: str) -> Optional[Match]:
+        """
+        Best match scoring above the threshold, or None. Exact hits skip
+        scoring; ties go to the oldest key, as with extractOne over a list.
+        """
+        pos = self._positions.get(key)
+        if pos is not None:
+            return (key, self._values[pos], 100.0)
+        cands = self._candidates(key) if key else []
+        if cands and self.min_length_ratio:
+            cands = [p for p in cands if self._length_ok(key, self._keys[p])]
+        if not cands:
+            return None
+        hit = process.extractOne(key, [self._keys[p] for p in cands], scorer=self.scorer, score_cutoff=self.threshold)
+        if hit and hit[1] > self.threshold:
+            pos = cands[hit[2]]
+            return (self._keys[pos], self._values[pos], float(hit[1]))
+        return None
+
+    def match_many(self, keys: Iterable[str]) -> List[Optional[Match]]:
+        """Best match scoring above the threshold for every key, or None."""
+        return [self.match(key) for key in keys]
+
+def strict_name_index() -> NameIndex:
+    """
+    Index for matching against names already in the DB, where a wrong match
+    overwrites another IPO's data: whole-name token_sort_ratio, so "shree
+    sai" no longer matches "shree sai industries", and a length guard.
+    """
+    return NameIndex(scorer=fuzz.token_sort_ratio, min_length_ratio=0.8)
@@ -0,0 +1,91 @@
+"""
+Profit and allotment estimates for many (ipo_id, lots, category)
+scenarios at once: one snapshot prefetch for all of them, then NumPy over
+the scenario arrays. /predict/profit and /predict/allotment are the
+one-scenario case of the same code.
+"""
+import os
+from typing import List, NamedTuple, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from services.snapshot import get_snapshots
+
+# Largest batch a client can send in one request
+MAX_BATCH_SCENARIOS = int(os.getenv("MAX_BATCH_SCENARIOS", "1000"))
+
+# Lots one scenario may apply for; far above any real application, and
+# keeps the int64 arithmetic below from overflowing
+MAX_LOTS = 100_000
+
+# Standard IPO lot is ~15000 INR; used when the lot size is unknown
+STANDARD_LOT_VALUE = 15000
+
+PROBABILITIES = np.array(["Very Low", "Low", "Low", "High", "High"])
+REASONS = [
+    "GMP is very high ({growth:.1f}%). Oversubscription likely > 50x. Lottery basis.",
+    # 1 lot vs multiple lots logic for Retail (RII usually 1 lot max benefit in oversub)
+    "High demand. Applying for >1 lot in Retail usually doesn't increase chance (1 lot lottery).",
+    "Moderate to High demand. Lottery basis likely.",
+    "Low GMP suggests low subscription interest.",
+    "Low demand expected, allotment likely.",
+]
+
+class Scenario(NamedTuple):
+    ipo_id: int
+    lots: int
+    category: str = "RII"
+
+def predict_batch(session: Session, scenarios: List[Scenario]) -> List[Optional[dict]]:
+    """
+    {"profit": ..., "allotment": ...} per scenario, in order; None for
+    scenarios whose IPO does not exist.
+    """
+    snaps = get_snapshots(session, {s.ipo_id for s in scenarios})
+    found = [i for i, s in enumerate(scenarios) if s.ipo_id in snaps]
+    results: List[Optional[dict]] = [None] * len(scenarios)
+    if not found:
+        return results
+
+    rows = [snaps[scenarios[i].ipo_id] for i in found]
+    gmp = np.array([snap.gmp or 0.0 for snap in rows], dtype=float)
+    base_price = np.array([snap.base_price or 0.0 for snap in rows], dtype=float)
+    lot_size = np.array([snap.lot_size or 0 for snap in rows], dtype=np.int64)
+    growth = np.array([snap.growth_percent or 0.0 for snap in rows], dtype=float)
+    lots = np.array([scenarios[i].lots for i in found], dtype=np.int64)
+    retail = np.array([scenarios[i].category == "RII" for i in found])
+
+    # Heuristic for lot size if 0
+    guessed = np.floor(STANDARD_LOT_VALUE / np.where(base_price > 0, base_price, 1)).astype(np.int64)
+    lot_size = np.where(lot_size != 0, lot_size, np.where(base_price > 0, guessed, 1))
+
+    profit = gmp * lot_size * lots
+    investment = base_price * lot_size * lots
+
+    # Index into PROBABILITIES / REASONS
+    reason = np.select(
+        [growth > 50, (growth > 20) & retail & (lots > 1), growth > 20, growth < 5],
+        [0, 1, 2, 3],
+        default=4,
+    )
+
+    columns = zip(found, rows, gmp.tolist(), lot_size.tolist(), profit.tolist(), investment.tolist(),
+                  growth.tolist(), reason.tolist())
+    for i, snap, gmp_val, lot, total_profit, invested, growth_pct, r in columns:
+        scenario = scenarios[i]
+        results[i] = {
+            "profit": {
+                "ipo_name": snap.name,
+                "estimated_profit": total_profit,
+                "investment_amount": invested,
+                "gmp": gmp_val,
+                "lot_size": lot,
+                "lots": scenario.lots,
+            },
+            "allotment": {
+                "ipo_name": snap.name,
+                "probability": str(PROBABILITIES[r]),
+                "reasoning": REASONS[r].format(growth=growth_pct),
+                "category": scenario.category,
+            },
+        }
+    return results
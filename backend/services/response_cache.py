@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Any, Dict, NamedTuple, Optional
+from fastapi import Request, Response
+from services.json_response import dumps, pick_encoding, compress, COMPRESS_MIN_BYTES
+
+
+# Distinct query strings kept per scope
+MAX_ENTRIES_PER_SCOPE = 256
+
+class CachedResponse:
+    __slots__ = ("version", "body", "etag", "headers", "_compressed")
+
+    def __init__(self, version: int, body: bytes, etag: str, headers: Optional[Dict[str, str]] = None):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.headers = headers or {}
+        self._compressed: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        """The body compressed with `encoding`, compressed once per entry."""
+        body = self._compressed.get(encoding)
+        if body is None:
+            body = self._compressed[encoding] = compress(self.body, encoding)
+        return body
+
+class WithHeaders(NamedTuple):
+    """A builder result whose extra response headers are cached with the body."""
+    payload: Any
+    headers: Dict[str, str]
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match uses the weak comparison function
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def cached_json_response(request: Request, entry: CachedResponse) -> Response:
+    encoding = None
+    if len(entry.body) >= COMPRESS_MIN_BYTES:
+        encoding = pick_encoding(request.headers.get("accept-encoding"))
+    # Each encoding is its own representation, so its own ETag
+    etag = entry.etag if encoding is None else f'{entry.etag[:-1]}-{encoding}"'
+    headers = {
+        **entry.headers,
+        "ETag": etag,
+        # Let browsers keep the body but revalidate on every poll
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(content=entry.encoded(encoding), media_type="application/json", headers=headers)
+
+class ResponseCache:
+    """
+    Serialized GET responses keyed by request path/query and the version of
+    the data scope they were built from. The version follows data_versions
+    through `set_version` (or a local `bump`); readers get the cached bytes
+    (or a 304) until it moves.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._entries: Dict[str, "OrderedDict[str, CachedResponse]"] = {}
+
+    def version(self, scope: str) -> int:
+        return self._versions.get(scope, 0)
+
+    def bump(self, scope: str):
+        with self._lock:
+            self._versions[scope] = self._versions.get(scope, 0) + 1
+            self._entries.pop(scope, None)
+
+    def set_version(self, scope: str, version: int):
+        """
+        Adopts the version of `scope` from data_versions. Only ever moves
+        forward: a flush reporting the version it bumped may arrive after
+        the watcher has already seen a newer one.
+        """
+        with self._lock:
+            if version > self._versions.get(scope, 0):
+                self._versions[scope] = version
+                self._entries.pop(scope, None)
+
+    def _lookup(self, scope: str, key: str) -> CachedResponse | None:
+        entry = self._entries.get(scope, {}).get(key)
+        if entry is not None and entry.version == self.version(scope):
+            return entry
+        return None
+
+    def _store(self, scope: str, key: str, entry: CachedResponse):
+        with self._lock:
+            # Built from data that has since been replaced
+            if entry.version != self.version(scope):
+                return
+            entries = self._entries.setdefault(scope, OrderedDict())
+            entries[key] = entry
+            entries.move_to_end(key)
+            while len(entries) > MAX_ENTRIES_PER_SCOPE:
+                entries.popitem(last=False)
+
+    def _build(self, scope: str, key: str, version: int, payload: Any) -> CachedResponse:
+        headers = None
+        if isinstance(payload, WithHeaders):
+            payload, headers = payload
+        body = dumps(payload)
+        etag = '"%s-%d-%s"' % (scope, version, hashlib.sha1(body).hexdigest()[:16])
+        entry = CachedResponse(version, body, etag, headers)
+        self._store(scope, key, entry)
+        return entry
+
+    def get_or_build(self, scope: str, key: str, builder: Callable[[], Any]) -> CachedResponse:
+        entry = self._lookup(scope, key)
+        if entry is not None:
+            return entry
+
+        # Two concurrent misses may both build; the result is identical.
+        version = self.version(scope)
+        return self._build(scope, key, version, builder())
+
+    async def get_or_build_async(self, scope: str, key: str, builder: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        """get_or_build for async builders; hits never leave the event loop."""
+        entry = self._lookup(scope, key)
+        if entry is not None:
+            return entry
+
+        version = self.version(scope)
+        return self._build(scope, key, version, await builder())
+
+    @staticmethod
+    def _request_key(request: Request) -> str:
+        key = request.url.path
+        if request.url.query:
+            key = f"{key}?{request.url.query}"
+        return key
+
+    def respond(self, request: Request, scope: str, builder: Callable[[], Any]) -> Response:
+        return cached_json_response(request, self.get_or_build(scope, self._request_key(request), builder))
+
+    async def respond_async(self, request: Request, scope: str, builder: Callable[[], Awaitable[Any]]) -> Response:
+        entry = await self.get_or_build_async(scope, self._request_key(request), builder)
+        return cached_json_response(request, entry)
+
+response_cache = ResponseCache()
@@ -0,0 +1,163 @@
+"""
+When each source is scraped next. The interval of a source depends on the
+time of day in IST, on whether NSE/BSE are trading, and on whether any IPO
+is open or about to list (GMP moves fastest then). A source whose data
+came back unchanged is backed off, doubling its interval each time up to
+MAX_INTERVAL, and goes back to its base interval as soon as it changes.
+"""
+import hashlib
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from models import IPO
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+GMP_SOURCES = ("ipowatch", "investorgain")
+DETAIL_SOURCES = ("chittorgarh",)
+MARKET_SOURCE = "market"
+
+# NSE/BSE regular session, IST
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+# Grey market quotes are updated through the working day and evening
+DAY_START = time(8, 0)
+DAY_END = time(22, 0)
+
+# IPOs open or listing within this many days make the GMP sources hot
+HOT_DAYS = 2
+
+INTERVALS = {
+    # (source kind, phase) -> base interval
+    ("gmp", "hot"): timedelta(minutes=15),
+    ("gmp", "hot_night"): timedelta(minutes=120),
+    ("gmp", "day"): timedelta(minutes=60),
+    ("gmp", "off"): timedelta(minutes=180),
+    ("detail", "hot"): timedelta(minutes=60),
+    ("detail", "day"): timedelta(minutes=180),
+    ("detail", "off"): timedelta(minutes=360),
+    ("market", "session"): timedelta(minutes=15),
+    ("market", "off"): timedelta(minutes=240),
+}
+MAX_INTERVAL = timedelta(hours=6)
+# A failed scrape is retried after at most this long
+RETRY_INTERVAL = timedelta(minutes=15)
+
+def market_holidays() -> Set[date]:
+    """Exchange holidays from MARKET_HOLIDAYS (comma separated YYYY-MM-DD)."""
+    days = set()
+    for value in os.getenv("MARKET_HOLIDAYS", "").split(","):
+        value = value.strip()
+        if value:
+            days.add(date.fromisoformat(value))
+    return days
+
+def is_trading_day(day: date, holidays: Set[date]) -> bool:
+    return day.weekday() < 5 and day not in holidays
+
+def count_hot_ipos(session: Session, today: date) -> int:
+    """IPOs open now, opening by tomorrow, or listing within HOT_DAYS."""
+    soon = today + timedelta(days=HOT_DAYS)
+    return session.query(func.count(IPO.id)).filter(or_(
+        IPO.status == "Open",
+        IPO.open_date.between(today, today + timedelta(days=1)),
+        IPO.listing_date.between(today, soon),
+    )).scalar()
+
+def base_interval(source: str, now_ist: datetime, hot: bool, holidays: Set[date]) -> timedelta:
+    clock = now_ist.time()
+    trading_day = is_trading_day(now_ist.date(), holidays)
+    daytime = DAY_START <= clock < DAY_END
+
+    if source == MARKET_SOURCE:
+        in_session = trading_day and SESSION_OPEN <= clock < SESSION_CLOSE
+        return INTERVALS[("market", "session" if in_session else "off")]
+
+    if source in GMP_SOURCES:
+        if hot:
+            return INTERVALS[("gmp", "hot" if daytime else "hot_night")]
+        return INTERVALS[("gmp", "day" if daytime and trading_day else "off")]
+
+    if hot and daytime:
+        return INTERVALS[("detail", "hot")]
+    return INTERVALS[("detail", "day" if daytime and trading_day else "off")]
+
+# Stamped with the scrape time, so never the same twice
+FINGERPRINT_EXCLUDE = {"gmp_updated"}
+
+def fingerprint(records: Iterable) -> str:
+    """Order-independent hash of scraped records (pydantic models or dicts)."""
+    rows = sorted(
+        json.dumps(r.model_dump(exclude=FINGERPRINT_EXCLUDE) if hasattr(r, "model_dump") else r,
+                   sort_keys=True, default=str)
+        for r in records
+    )
+    return hashlib.sha1("\n".join(rows).encode("utf-8")).hexdigest()
+
+class SourceState:
+    __slots__ = ("last_run", "fingerprint", "unchanged_runs", "failed")
+
+    def __init__(self):
+        self.last_run: Optional[datetime] = None
+        self.fingerprint: Optional[str] = None
+        self.unchanged_runs = 0
+        self.failed = False
+
+class AdaptiveSchedule:
+    """
+    Tracks the last run of every source. `due(now, hot)` re-derives each
+    source's interval from the current phase on every call, so a source
+    speeds up as soon as the market opens or an IPO turns hot, without
+    waiting out an interval planned earlier.
+    """
+    def __init__(self, sources: Iterable[str], holidays: Optional[Set[date]] = None):
+        self.states: Dict[str, SourceState] = {source: SourceState() for source in sources}
+        self.holidays = market_holidays() if holidays is None else holidays
+
+    def reset(self):
+        """Forgets every run, so all sources are due on the next tick."""
+        self.states = {source: SourceState() for source in self.states}
+
+    def interval(self, source: str, now: datetime, hot: bool) -> timedelta:
+        state = self.states[source]
+        base = base_interval(source, now.replace(tzinfo=timezone.utc).astimezone(IST), hot, self.holidays)
+        if state.failed:
+            return min(base, RETRY_INTERVAL)
+        return min(base * (2 ** state.unchanged_runs), max(base, MAX_INTERVAL))
+
+    def next_run(self, source: str, now: datetime, hot: bool) -> datetime:
+        state = self.states[source]
+        if state.last_run is None:
+            return now
+        return state.last_run + self.interval(source, now, hot)
+
+    def due(self, now: datetime, hot: bool) -> List[str]:
+        """Sources to run now; `now` is naive UTC like the rest of the DB."""
+        return [source for source in self.states if self.next_run(source, now, hot) <= now]
+
+    def record(self, source: str, now: datetime, fingerprint: Optional[str], failed: bool = False):
+        """
+        Notes a run of `source`. Unchanged data backs the source off;
+        failures keep the backoff and retry soon.
+        """
+        state = self.states[source]
+        state.last_run = now
+        state.failed = failed
+        if failed:
+            return
+        if fingerprint is not None and fingerprint == state.fingerprint:
+            # Backoff is capped by MAX_INTERVAL, no need to count further
+            state.unchanged_runs = min(state.unchanged_runs + 1, 8)
+        else:
+            state.unchanged_runs = 0
+        state.fingerprint = fingerprint
+
+    def describe(self, now: datetime, hot: bool) -> str:
+        parts = []
+        for source, state in self.states.items():
+            minutes = int((self.next_run(source, now, hot) - now).total_seconds() // 60)
+            parts.append(f"{source} in {max(minutes, 0)}m (x{2 ** state.unchanged_runs})")
+        return ", ".join(parts)
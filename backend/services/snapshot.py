@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Iterable, Tuple
+from datetime import date, datetime
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from models import IPO, IPOSnapshot
+from services.ipo_queries import fetch_ipo_listing
+
+# Columns copied verbatim from a listing row into the snapshot
+SNAPSHOT_FIELDS = [
+    "name", "symbol", "ipo_type", "status", "listing_date", "price_band",
+    "lot_size", "kostak_rate", "retail_subscription_x", "allotment_url",
+    "sentiment_bullish", "sentiment_bearish",
+    "gmp", "base_price", "growth_percent", "trend",
+]
+
+# /ipos row key -> snapshot column, in response order
+LISTING_COLUMNS = {
+    "id": IPOSnapshot.ipo_id,
+    "name": IPOSnapshot.name,
+    "symbol": IPOSnapshot.symbol,
+    "ipo_type": IPOSnapshot.ipo_type,
+    "gmp": IPOSnapshot.gmp,
+    "growth_percent": IPOSnapshot.growth_percent,
+    "listing_date": IPOSnapshot.listing_date,
+    "base_price": IPOSnapshot.base_price,
+    "status": IPOSnapshot.status,
+    "price_band": IPOSnapshot.price_band,
+    "type": IPOSnapshot.ipo_type,
+    "trend": IPOSnapshot.trend,
+    "lot_size": IPOSnapshot.lot_size,
+    "kostak_rate": IPOSnapshot.kostak_rate,
+    "retail_subscription_x": IPOSnapshot.retail_subscription_x,
+    "allotment_url": IPOSnapshot.allotment_url,
+    "sentiment_bullish": IPOSnapshot.sentiment_bullish,
+    "sentiment_bearish": IPOSnapshot.sentiment_bearish,
+}
+LISTING_FIELDS = list(LISTING_COLUMNS)
+
+# Largest page a client can ask for
+MAX_PAGE_SIZE = 500
+
+def refresh_snapshots(session: Session, ipo_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Re-derives the snapshot rows of the given IPOs (all IPOs when None).
+    Does not commit; the caller owns the transaction.
+    """
+    if ipo_ids is not None:
+        ipo_ids = list(ipo_ids)
+        if not ipo_ids:
+            return 0
+
+    rows = fetch_ipo_listing(session, ipo_ids)
+
+    query = session.query(IPOSnapshot)
+    if ipo_ids is not None:
+        query = query.filter(IPOSnapshot.ipo_id.in_(ipo_ids))
+    existing = {snap.ipo_id: snap for snap in query.all()}
+
+    now = datetime.utcnow()
+    for row in rows:
+        snap = existing.pop(row["id"], None)
+        if snap is None:
+            snap = IPOSnapshot(ipo_id=row["id"])
+            session.add(snap)
+        for field in SNAPSHOT_FIELDS:
+            setattr(snap, field, row[field])
+        snap.refreshed_at = now
+
+    # Snapshots whose IPO no longer exists
+    for snap in existing.values():
+        session.delete(snap)
+
+    session.flush()
+    return len(rows)
+
+def ensure_snapshots(session: Session):
+    """
+    Rebuilds the read model if it is missing rows, e.g. on first boot after
+    the table was introduced.
+    """
+    ipo_count = session.query(func.count(IPO.id)).scalar()
+    snapshot_count = session.query(func.count(IPOSnapshot.ipo_id)).scalar()
+    if ipo_count != snapshot_count:
+        print(f"Rebuilding IPO snapshots ({snapshot_count}/{ipo_count} present)...")
+        refresh_snapshots(session)
+        session.commit()
+
+def get_snapshot(session: Session, ipo_id: int) -> Optional[IPOSnapshot]:
+    snap = session.get(IPOSnapshot, ipo_id)
+    if snap is None and session.get(IPO, ipo_id) is not None:
+        # IPO written outside the merger (e.g. seed_data.py)
+        refresh_snapshots(session, [ipo_id])
+        session.commit()
+        snap = session.get(IPOSnapshot, ipo_id)
+    return snap
+
+def get_snapshots(session: Session, ipo_ids: Iterable[int]) -> Dict[int, IPOSnapshot]:
+    """Snapshots of `ipo_ids` by id, in one query; missing IPOs are left out."""
+    ipo_ids = set(ipo_ids)
+    snaps = {snap.ipo_id: snap for snap in session.query(IPOSnapshot).filter(IPOSnapshot.ipo_id.in_(ipo_ids))}
+    missing = ipo_ids - snaps.keys()
+    if missing:
+        stale = [row[0] for row in session.query(IPO.id).filter(IPO.id.in_(missing))]
+        if stale:
+            # IPOs written outside the merger (e.g. seed_data.py)
+            refresh_snapshots(session, stale)
+            session.commit()
+            snaps.update((snap.ipo_id, snap) for snap in session.query(IPOSnapshot).filter(IPOSnapshot.ipo_id.in_(stale)))
+    return snaps
+
+def snapshot_to_dict(snap: IPOSnapshot) -> dict:
+    row = {field: getattr(snap, column.key) for field, column in LISTING_COLUMNS.items()}
+    row["trend"] = row["trend"] or []
+    return row
+
+def fetch_snapshot_listing(session: Session) -> List[dict]:
+    return fetch_snapshot_page(session)[0]
+
+def fetch_snapshot_page(session: Session, fields: Optional[List[str]] = None,
+                        status: Optional[List[str]] = None, ipo_type: Optional[List[str]] = None,
+                        open_from: Optional[date] = None, open_to: Optional[date] = None,
+                        after: Optional[int] = None, limit: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    /ipos rows in id order, filtered, projected onto `fields` (all when
+    None) and paged in SQL. `after` is the id of the last row of the
+    previous page. Returns the rows and the `after` of the next page, None
+    on the last one. Status and type match case-insensitively; the open
+    date range is inclusive.
+    """
+    fields = fields or LISTING_FIELDS
+    stmt = select(IPOSnapshot.ipo_id, *[LISTING_COLUMNS[f] for f in fields]).order_by(IPOSnapshot.ipo_id)
+
+    if status:
+        stmt = stmt.where(func.lower(IPOSnapshot.status).in_([s.lower() for s in status]))
+    if ipo_type:
+        stmt = stmt.where(func.lower(IPOSnapshot.ipo_type).in_([t.lower() for t in ipo_type]))
+    if open_from is not None or open_to is not None:
+        # Only the IPO row has the typed date
+        stmt = stmt.join(IPO, IPO.id == IPOSnapshot.ipo_id)
+        if open_from is not None:
+            stmt = stmt.where(IPO.open_date >= open_from)
+        if open_to is not None:
+            stmt = stmt.where(IPO.open_date <= open_to)
+    if after is not None:
+        stmt = stmt.where(IPOSnapshot.ipo_id > after)
+    if limit is not None:
+        # One extra row tells whether there is a next page
+        stmt = stmt.limit(limit + 1)
+
+    rows = session.execute(stmt).all()
+    next_after = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_after = rows[-1][0]
+
+    result = []
+    for row in rows:
+        item = dict(zip(fields, row[1:]))
+        if "trend" in item:
+            item["trend"] = item["trend"] or []
+        result.append(item)
+    return result, next_after
@@ -0,0 +1,23 @@
+from typing import Iterable, List
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Rows per statement; keeps SQLite and Postgres under their bind-parameter limits
+UPSERT_CHUNK = 500
+
+def dialect_insert(session: Session, model):
+    """
+    INSERT for the session's database that supports
+    .on_conflict_do_update() / .on_conflict_do_nothing() and .excluded.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"No upsert support for {dialect}")
+
+def chunked(rows: Iterable[dict], size: int = UPSERT_CHUNK) -> Iterable[List[dict]]:
+    rows = list(rows)
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
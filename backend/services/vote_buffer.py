@@ -0,0 +1,195 @@
+"""
+Write-behind sentiment votes. A vote only adds to an in-memory counter;
+a background thread folds the pending counts into the database every
+VOTE_FLUSH_SECONDS with relative updates (x = x + :delta), so concurrent
+votes are never lost and a hyped IPO does not serialize the API on one
+row. Votes still pending when the process dies are lost.
+"""
+import os
+import threading
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+from models import IPO, IPOSnapshot, Session as DBSession
+from services.data_version import bump_data_version, IPOS_SCOPE, SENTIMENT_SCOPE
+from services.snapshot import get_snapshot
+
+VOTE_FLUSH_SECONDS = float(os.getenv("VOTE_FLUSH_SECONDS", "1"))
+# Counters are spread over this many locks, picked by IPO id, so reading
+# one IPO's pending votes only takes its own shard's lock
+VOTE_BUFFER_SHARDS = int(os.getenv("VOTE_BUFFER_SHARDS", "8"))
+
+VOTE_TYPES = ("bullish", "bearish")
+
+class _Shard:
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # ipo_id -> [bullish, bearish] not yet written
+        self.pending: Dict[int, List[int]] = {}
+
+class VoteBuffer:
+    """
+    add() counts a vote and returns the IPO's near-real-time totals: the
+    totals at this process's last flush plus the votes pending here. Votes
+    pending in other API processes show up after their next flush.
+    """
+    def __init__(self, session_factory: Callable[[], Session], interval: float = VOTE_FLUSH_SECONDS,
+                 shards: int = VOTE_BUFFER_SHARDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._shards = [_Shard() for _ in range(max(shards, 1))]
+        # ipo_id -> (bullish, bearish) as of the last flush or load
+        self._totals: Dict[int, Tuple[int, int]] = {}
+        # Votes drained by a flush that has not finished yet
+        self._inflight: Dict[int, List[int]] = {}
+        self._totals_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._listeners: List[Callable[[List[int], int], None]] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, listener: Callable[[List[int], int], None]):
+        """listener(ipo_ids, version) runs after every flush that wrote votes."""
+        self._listeners.append(listener)
+
+    def known(self, ipo_id: int) -> bool:
+        return ipo_id in self._totals
+
+    def load(self, session: Session, ipo_id: int) -> bool:
+        """Reads the stored totals of `ipo_id`; False when it does not exist."""
+        snap = get_snapshot(session, ipo_id)
+        if snap is None:
+            return False
+        with self._totals_lock:
+            self._totals.setdefault(ipo_id, (snap.sentiment_bullish or 0, snap.sentiment_bearish or 0))
+        return True
+
+    def _shard(self, ipo_id: int) -> _Shard:
+        return self._shards[ipo_id % len(self._shards)]
+
+    def add(self, ipo_id: int, vote_type: str) -> Tuple[int, int]:
+        """Counts one vote for a loaded IPO and returns (bullish, bearish)."""
+        column = VOTE_TYPES.index(vote_type)
+        shard = self._shard(ipo_id)
+        with shard.lock:
+            counts = shard.pending.setdefault(ipo_id, [0, 0])
+            counts[column] += 1
+        return self.totals(ipo_id)
+
+    def totals(self, ipo_id: int) -> Tuple[int, int]:
+        with self._totals_lock:
+            bullish, bearish = self._totals.get(ipo_id, (0, 0))
+            inflight = self._inflight.get(ipo_id)
+            if inflight:
+                bullish += inflight[0]
+                bearish += inflight[1]
+        shard = self._shard(ipo_id)
+        with shard.lock:
+            counts = shard.pending.get(ipo_id)
+            if counts:
+                bullish += counts[0]
+                bearish += counts[1]
+        return bullish, bearish
+
+    def _drain(self) -> Dict[int, List[int]]:
+        deltas: Dict[int, List[int]] = {}
+        with self._totals_lock:
+            for shard in self._shards:
+                with shard.lock:
+                    pending, shard.pending = shard.pending, {}
+                for ipo_id, (bullish, bearish) in pending.items():
+                    counts = deltas.setdefault(ipo_id, [0, 0])
+                    counts[0] += bullish
+                    counts[1] += bearish
+            self._inflight = deltas
+        return deltas
+
+    def _requeue(self, deltas: Dict[int, List[int]]):
+        with self._totals_lock:
+            for ipo_id, (bullish, bearish) in deltas.items():
+                shard = self._shard(ipo_id)
+                with shard.lock:
+                    counts = shard.pending.setdefault(ipo_id, [0, 0])
+                    counts[0] += bullish
+                    counts[1] += bearish
+            self._inflight = {}
+
+    def flush(self) -> int:
+        """
+        Writes the pending votes in one transaction and returns how many
+        there were. On failure they go back into the buffer.
+        """
+        with self._flush_lock:
+            deltas = self._drain()
+            if not deltas:
+                return 0
+
+            rows = [{"b_id": ipo_id, "d_bull": b, "d_bear": s} for ipo_id, (b, s) in deltas.items()]
+            session = None
+            try:
+                session = self.session_factory()
+                for model, key in ((IPO, IPO.id), (IPOSnapshot, IPOSnapshot.ipo_id)):
+                    session.execute(
+                        update(model.__table__)
+                        .where(key == bindparam("b_id"))
+                        .values(
+                            sentiment_bullish=func.coalesce(model.sentiment_bullish, 0) + bindparam("d_bull"),
+                            sentiment_bearish=func.coalesce(model.sentiment_bearish, 0) + bindparam("d_bear"),
+                        ),
+                        rows,
+                    )
+                version = bump_data_version(session, IPOS_SCOPE)
+                bump_data_version(session, SENTIMENT_SCOPE)
+                # Includes votes flushed by other processes
+                totals = session.execute(
+                    select(IPO.id, IPO.sentiment_bullish, IPO.sentiment_bearish).where(IPO.id.in_(list(deltas)))
+                ).all()
+                session.commit()
+            except Exception:
+                if session is not None:
+                    session.rollback()
+                self._requeue(deltas)
+                raise
+            finally:
+                if session is not None:
+                    session.close()
+
+            # The stored totals now include the drained votes
+            with self._totals_lock:
+                for ipo_id, bullish, bearish in totals:
+                    self._totals[ipo_id] = (bullish or 0, bearish or 0)
+                self._inflight = {}
+
+        ipo_ids = list(deltas)
+        for listener in self._listeners:
+            listener(ipo_ids, version)
+        return sum(b + s for b, s in deltas.values())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Vote flush failed: {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vote-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the flusher and writes what is still pending."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Final vote flush failed: {e}")
+
+vote_buffer = VoteBuffer(DBSession)
@@ -0,0 +1,211 @@
+"""
+Vectorized GMP analytics against hand-computed values, and the frame being
+built once per data version.
+"""
+import asyncio
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import IPO, IPOSnapshot, GMPPrice, GMPBucket
+from services.analytics import AnalyticsStore, screen
+from services.data_version import IPOS_SCOPE, SENTIMENT_SCOPE, IPO_DATA_SCOPE
+from conftest import TempDB
+
+NOW = datetime(2026, 10, 16, 12, 0)
+
+def seed(db):
+    session = db.Session()
+    session.add_all([
+        IPO(id=1, name="Alpha", name_key="alpha", ipo_type="Mainboard", status="Open",
+            listing_date=date.today() + timedelta(days=4)),
+        IPO(id=2, name="Beta", name_key="beta", ipo_type="SME", status="Closed"),
+        IPO(id=3, name="Gamma", name_key="gamma", ipo_type="Mainboard", status="Upcoming"),
+        IPOSnapshot(ipo_id=1, name="Alpha", ipo_type="Mainboard", status="Open", gmp=50.0, base_price=100.0, growth_percent=50.0),
+        IPOSnapshot(ipo_id=2, name="Beta", ipo_type="SME", status="Closed", gmp=4.0, base_price=40.0, growth_percent=10.0),
+        IPOSnapshot(ipo_id=3, name="Gamma", ipo_type="Mainboard", status="Upcoming", gmp=0.0, base_price=0.0, growth_percent=0.0),
+    ])
+    # Alpha: a daily bucket 10 days back, then raw samples
+    session.add(GMPBucket(ipo_id=1, bucket_start=datetime(2026, 10, 6), resolution="day", open=10.0, high=25.0,
+                          low=10.0, close=20.0, samples=3, first_at=datetime(2026, 10, 6, 9), last_at=datetime(2026, 10, 6, 18)))
+    for days_ago, price in [(5, 30.0), (3, 40.0), (1, 45.0), (0, 50.0)]:
+        session.add(GMPPrice(ipo_id=1, price=price, updated_at=NOW - timedelta(days=days_ago)))
+    # Beta: a single sample
+    session.add(GMPPrice(ipo_id=2, price=4.0, updated_at=NOW))
+    session.commit()
+    session.close()
+
+def test_statistics_per_ipo():
+    with TempDB() as db:
+        seed(db)
+        session = db.Session()
+        rows = {row["id"]: row for row in screen(AnalyticsStore().frame(session, 1))}
+        session.close()
+
+        alpha = rows[1]
+        assert (alpha["gmp_max"], alpha["gmp_min"], alpha["samples"]) == (50.0, 20.0, 5)
+        # 50 now vs 40 three days earlier
+        assert alpha["gmp_momentum"] == 10.0
+        moves = [10.0, 10.0, 5.0, 5.0]
+        mean = sum(moves) / len(moves)
+        assert alpha["gmp_volatility"] == pytest.approx((sum((m - mean) ** 2 for m in moves) / len(moves)) ** 0.5, abs=0.01)
+        # The windows are half-open: (t - 3 days, t]
+        assert alpha["gmp_avg_3d"] == pytest.approx((45 + 50) / 2, abs=0.01)
+        assert alpha["gmp_avg_7d"] == pytest.approx((30 + 40 + 45 + 50) / 4, abs=0.01)
+        assert alpha["days_to_listing"] == 4
+        assert alpha["last_sample_at"] == "2026-10-16T12:00:00"
+
+        beta = rows[2]
+        assert (beta["gmp_momentum"], beta["samples"], beta["days_to_listing"]) == (0.0, 1, None)
+        # No history at all
+        gamma = rows[3]
+        assert (gamma["gmp_max"], gamma["gmp_momentum"], gamma["samples"], gamma["last_sample_at"]) == (None, None, 0, None)
+
+def test_screen_and_version_cache():
+    with TempDB() as db:
+        seed(db)
+        store = AnalyticsStore()
+        session = db.Session()
+        frame = store.frame(session, 1)
+        assert store.frame(session, 1) is frame
+        assert store.frame(session, 2) is not frame
+        session.close()
+
+        assert [r["id"] for r in screen(frame, status=["open", "UPCOMING"])] == [1, 3]
+        assert [r["id"] for r in screen(frame, ipo_type=["mainboard"], sort="gmp_max")] == [1, 3]
+        assert [r["id"] for r in screen(frame, sort="growth_percent", limit=2)] == [1, 2]
+
+def test_analytics_endpoint():
+    from fastapi.testclient import TestClient
+    import main
+    from models import get_async_session
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import NullPool
+
+    with TempDB() as db:
+        seed(db)
+        # No pooled connections left behind on the TestClient's event loop
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db.path}", poolclass=NullPool)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def session_override():
+            async with factory() as session:
+                yield session
+
+        main.app.dependency_overrides[get_async_session] = session_override
+        main.analytics_store.clear()
+        main.response_cache.bump(IPO_DATA_SCOPE)
+        try:
+            client = TestClient(main.app)
+            response = client.get("/analytics?status=Open,Closed&sort=gmp")
+            assert response.status_code == 200
+            assert [r["id"] for r in response.json()] == [1, 2]
+            assert client.get("/analytics?sort=nope").status_code == 400
+        finally:
+            main.app.dependency_overrides.pop(get_async_session, None)
+            main.analytics_store.clear()
+            main.response_cache.bump(IPO_DATA_SCOPE)
+
+def test_votes_keep_analytics_cached():
+    from fastapi.testclient import TestClient
+    import main
+    from models import get_async_session
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import NullPool
+
+    with TempDB() as db:
+        seed(db)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db.path}", poolclass=NullPool)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        queries = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+        async def session_override():
+            async with factory() as session:
+                yield session
+
+        def poll(ipos, sentiment):
+            # What the data version watcher reports for a poll
+            main.data_versions.versions.update({IPOS_SCOPE: ipos, SENTIMENT_SCOPE: sentiment})
+            main.apply_data_version(IPOS_SCOPE, ipos)
+            main.apply_data_version(SENTIMENT_SCOPE, sentiment)
+
+        saved = dict(main.data_versions.versions)
+        sentiment = main.response_cache.version(SENTIMENT_SCOPE) + 1
+        ipos = main.response_cache.version(IPO_DATA_SCOPE) + sentiment + 1
+        main.app.dependency_overrides[get_async_session] = session_override
+        main.analytics_store.clear()
+        try:
+            client = TestClient(main.app)
+            poll(ipos, sentiment)
+            etag = client.get("/analytics").headers["etag"]
+            built = len(queries)
+            assert built
+
+            # A vote flush bumps both, and neither the frame nor the cached response goes
+            poll(ipos + 1, sentiment + 1)
+            assert client.get("/analytics", headers={"If-None-Match": etag}).status_code == 304
+            assert client.get("/analytics").headers["etag"] == etag
+            assert len(queries) == built
+
+            # Any other write rebuilds them
+            poll(ipos + 2, sentiment + 1)
+            assert client.get("/analytics").status_code == 200
+            assert len(queries) == 2 * built
+        finally:
+            main.data_versions.versions.clear()
+            main.data_versions.versions.update(saved)
+            main.app.dependency_overrides.pop(get_async_session, None)
+            main.analytics_store.clear()
+            main.response_cache.bump(IPO_DATA_SCOPE)
+
+def test_concurrent_requests_on_cold_cache():
+    import httpx
+    import main
+    from models import get_async_session
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import NullPool
+
+    with TempDB() as db:
+        seed(db)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db.path}", poolclass=NullPool)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def session_override():
+            async with factory() as session:
+                yield session
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                # Different queries so the response cache cannot answer any of them
+                return await asyncio.gather(*[client.get(f"/analytics?limit={n}") for n in range(1, 9)])
+
+        results = []
+        original = main.analytics_store
+        main.analytics_store = AnalyticsStore()
+        main.app.dependency_overrides[get_async_session] = session_override
+        main.response_cache.bump(IPO_DATA_SCOPE)
+        try:
+            # A deadlock blocks the event loop itself, so watch it from outside
+            runner = threading.Thread(target=lambda: results.append(asyncio.run(scenario())), daemon=True)
+            runner.start()
+            runner.join(30)
+            assert not runner.is_alive(), "concurrent /analytics requests deadlocked"
+            responses = results[0]
+            assert [r.status_code for r in responses] == [200] * 8
+            assert [len(r.json()) for r in responses] == [1, 2, 3, 3, 3, 3, 3, 3]
+        finally:
+            main.app.dependency_overrides.pop(get_async_session, None)
+            main.analytics_store = original
+            main.response_cache.bump(IPO_DATA_SCOPE)
+
+if __name__ == "__main__":
+    test_statistics_per_ipo()
+    test_screen_and_version_cache()
+    test_analytics_endpoint()
+    test_votes_keep_analytics_cached()
+    test_concurrent_requests_on_cold_cache()
+    print("Analytics OK")
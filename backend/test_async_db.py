@@ -0,0 +1,80 @@
+"""
+The async engine setup and the async read path of the caches, against a
+throwaway SQLite database through aiosqlite.
+"""
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from models import async_database_url
+from services.ipo_detail import IPODetailCache, build_ipo_detail
+from services.response_cache import ResponseCache
+from services.snapshot import fetch_snapshot_listing, fetch_snapshot_page
+from conftest import MergerEnv
+
+def test_async_database_url():
+    url, args = async_database_url("sqlite:////tmp/ipo.db")
+    assert (url.drivername, url.database, args) == ("sqlite+aiosqlite", "/tmp/ipo.db", {})
+
+    url, args = async_database_url("postgresql://u:p@db.example.com:5432/postgres?sslmode=require")
+    assert url.drivername == "postgresql+asyncpg"
+    assert dict(url.query) == {"ssl": "require"} and args == {}
+
+    # Transaction pooler: no prepared statement caching on either side
+    url, args = async_database_url("postgresql://u:p@pooler.example.com:6543/postgres")
+    assert dict(url.query) == {"prepared_statement_cache_size": "0"}
+    assert args == {"statement_cache_size": 0}
+    url, args = async_database_url("postgresql+psycopg2://u:p@host/db?pgbouncer=true")
+    assert "pgbouncer" not in url.query and args == {"statement_cache_size": 0}
+
+    # Other databases need an async driver named in the URL
+    url, args = async_database_url("mysql+aiomysql://u:p@host/db")
+    assert (url.drivername, args) == ("mysql+aiomysql", {})
+    try:
+        async_database_url("mysql://u:p@host/db")
+        assert False, "a sync-only driver should be refused"
+    except ValueError as e:
+        assert "mysql+<async driver>" in str(e)
+
+def test_async_reads_match_sync_reads():
+    env = MergerEnv()
+    try:
+        env.merge()
+        session = env.Session()
+        expected = fetch_snapshot_listing(session)
+        ipo_id = expected[0]["id"]
+        expected_detail = build_ipo_detail(session, ipo_id)
+        session.close()
+
+        url, args = async_database_url(str(env.engine.url))
+        async_engine = create_async_engine(url, connect_args=args)
+        AsyncSession = async_sessionmaker(bind=async_engine)
+        listing_cache, detail_cache = ResponseCache(), IPODetailCache()
+
+        async def read():
+            async def listing():
+                async with AsyncSession() as s:
+                    rows, _ = await s.run_sync(fetch_snapshot_page)
+                    return rows
+
+            async def detail():
+                async with AsyncSession() as s:
+                    return await s.run_sync(build_ipo_detail, ipo_id)
+
+            entry = await listing_cache.get_or_build_async("ipos", "/ipos", listing)
+            # The second read is served from the cache without a builder call
+            assert await listing_cache.get_or_build_async("ipos", "/ipos", None) is entry
+            detail_entry = await detail_cache.get_or_build_async(ipo_id, (), detail)
+            await async_engine.dispose()
+            return entry, detail_entry
+
+        entry, detail_entry = asyncio.run(read())
+        assert entry.body == ResponseCache().get_or_build("ipos", "/ipos", lambda: expected).body
+        assert detail_entry.body == IPODetailCache().get_or_build(ipo_id, (), lambda: expected_detail).body
+    finally:
+        env.close()
+
+if __name__ == "__main__":
+    test_async_database_url()
+    test_async_reads_match_sync_reads()
+    print("Async DB OK")
@@ -0,0 +1,70 @@
+"""
+Pool checkout metrics and the per-request session dependency.
+"""
+import threading
+import time
+
+from sqlalchemy import exc, text
+from sqlalchemy.pool import QueuePool
+
+import models
+from services.db_metrics import timed_pool, pool_metrics, render_metrics
+from conftest import TempDB
+
+def test_checkout_waits_are_recorded():
+    db = TempDB(migrate=False, poolclass=timed_pool(QueuePool, "test"), pool_size=1, max_overflow=0, pool_timeout=0.2)
+    engine = db.engine
+    metric = pool_metrics["test"]
+    try:
+        held = engine.connect()
+        released = threading.Event()
+
+        def release_later():
+            time.sleep(0.1)
+            held.close()
+            released.set()
+
+        threading.Thread(target=release_later).start()
+        # Waits for the held connection to come back
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        released.wait()
+        snap = metric.snapshot()
+        assert snap["count"] == 2 and snap["max"] >= 0.09 and snap["timeouts"] == 0
+
+        held = engine.connect()
+        try:
+            engine.connect()
+            assert False, "checkout should have timed out"
+        except exc.TimeoutError:
+            pass
+        held.close()
+        assert metric.snapshot()["timeouts"] == 1
+
+        output = render_metrics()
+        assert 'db_pool_checkout_wait_seconds_count{engine="test"} 4' in output
+        assert 'db_pool_checkout_wait_seconds_bucket{engine="test",le="+Inf"} 4' in output
+        assert 'db_pool_checkout_timeouts_total{engine="test"} 1' in output
+    finally:
+        db.close()
+        pool_metrics.pop("test", None)
+
+def test_session_dependency_closes_session():
+    dependency = models.get_session()
+    session = next(dependency)
+    session.execute(text("SELECT 1"))
+    assert session.in_transaction()
+    dependency.close()
+    assert not session.in_transaction()
+
+def test_engines_use_configured_pool():
+    for engine in (models.engine, models.async_engine):
+        assert engine.pool.size() == models.DB_POOL_SIZE
+        assert engine.pool._recycle == models.DB_POOL_RECYCLE
+        assert engine.pool._pre_ping == models.DB_POOL_PRE_PING
+
+if __name__ == "__main__":
+    test_checkout_waits_are_recorded()
+    test_session_dependency_closes_session()
+    test_engines_use_configured_pool()
+    print("DB pool OK")
@@ -0,0 +1,116 @@
+"""
+Streaming exports: every stored GMP point in (ipo, time) order, the
+filters, both formats, and memory that does not grow with the table.
+"""
+import csv
+import io
+import json
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from models import IPO, IPOSnapshot, GMPPrice, GMPBucket
+from services.export import export_gmp, export_ipos, gmp_export_query, stream_rows
+from conftest import TempDB
+
+START = datetime(2026, 9, 1)
+
+def seed(db, ipos=3, samples=10):
+    session = db.Session()
+    session.bulk_insert_mappings(IPO, [
+        dict(id=i, name=f"IPO {i}", name_key=f"ipo {i}", ipo_type="SME", status="Open",
+             open_date=date(2026, 9, i % 28 + 1))
+        for i in range(1, ipos + 1)
+    ])
+    session.bulk_insert_mappings(IPOSnapshot, [
+        dict(ipo_id=i, name=f"IPO {i}", ipo_type="SME", status="Open", gmp=float(i)) for i in range(1, ipos + 1)
+    ])
+    session.bulk_insert_mappings(GMPPrice, [
+        dict(ipo_id=i, price=float(j), updated_at=START + timedelta(days=10, hours=j))
+        for i in range(1, ipos + 1) for j in range(samples)
+    ])
+    session.commit()
+    session.close()
+
+def test_gmp_export_merges_tiers_in_order():
+    with TempDB() as db:
+        seed(db)
+        session = db.Session()
+        # Older history already rolled up into a daily bucket
+        session.add(GMPBucket(ipo_id=2, bucket_start=START, resolution="day", open=1.0, high=4.0, low=1.0,
+                              close=3.0, samples=5, first_at=START, last_at=START + timedelta(hours=8)))
+        session.commit()
+        session.close()
+
+        rows = list(stream_rows(db.Session, gmp_export_query(), batch=4))
+        assert len(rows) == 31
+        assert [(r["ipo_id"], r["time"]) for r in rows] == sorted((r["ipo_id"], r["time"]) for r in rows)
+        bucket = [r for r in rows if r["resolution"] == "day"]
+        assert bucket == [dict(ipo_id=2, time=START, resolution="day", open=1.0, high=4.0, low=1.0, close=3.0, samples=5)]
+
+        rows = list(stream_rows(db.Session, gmp_export_query(ipo_ids=[2], start=date(2026, 9, 11))))
+        assert len(rows) == 10 and {r["resolution"] for r in rows} == {"raw"}
+        rows = list(stream_rows(db.Session, gmp_export_query(end=date(2026, 9, 10))))
+        assert [r["resolution"] for r in rows] == ["day"]
+
+def test_formats():
+    with TempDB() as db:
+        seed(db, ipos=5, samples=3)
+        lines = b"".join(export_ipos(db.Session, "ndjson", start=date(2026, 9, 3))).decode().splitlines()
+        ipos = [json.loads(line) for line in lines]
+        assert [ipo["id"] for ipo in ipos] == [2, 3, 4, 5]
+        assert ipos[0]["open_date"] == "2026-09-03" and ipos[0]["gmp"] == 2.0
+
+        chunks = list(export_gmp(db.Session, "csv", ipo_ids=[1, 3]))
+        table = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        assert table[0] == ["ipo_id", "time", "resolution", "open", "high", "low", "close", "samples"]
+        assert len(table) == 7
+        assert table[1][:3] == ["1", "2026-09-11T00:00:00", "raw"]
+
+def test_memory_does_not_grow_with_rows():
+    def peak(samples):
+        with TempDB() as db:
+            seed(db, ipos=10, samples=samples)
+            tracemalloc.start()
+            try:
+                total = 0
+                for chunk in export_gmp(db.Session, "ndjson"):
+                    total += len(chunk)
+                return tracemalloc.get_traced_memory()[1], total
+            finally:
+                tracemalloc.stop()
+
+    small, small_bytes = peak(200)
+    large, large_bytes = peak(2000)
+    assert large_bytes > 9 * small_bytes
+    # Ten times the rows, nowhere near ten times the memory
+    assert large < 2 * small, (small, large)
+
+def test_export_endpoints():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TempDB() as db:
+        seed(db, ipos=3, samples=2)
+        original = main.DBSession
+        main.DBSession = db.Session
+        try:
+            client = TestClient(main.app)
+            response = client.get("/export/gmp?format=csv&ipo_id=2,3")
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/csv")
+            assert 'filename="gmp.csv"' in response.headers["content-disposition"]
+            assert len(response.text.strip().splitlines()) == 5
+
+            response = client.get("/export/ipos?end=2026-09-03")
+            assert [json.loads(line)["id"] for line in response.text.splitlines()] == [1, 2]
+            assert client.get("/export/ipos?format=xml").status_code == 400
+            assert client.get("/export/gmp?ipo_id=abc").status_code == 400
+        finally:
+            main.DBSession = original
+
+if __name__ == "__main__":
+    test_gmp_export_merges_tiers_in_order()
+    test_formats()
+    test_memory_does_not_grow_with_rows()
+    test_export_endpoints()
+    print("Export OK")
@@ -0,0 +1,134 @@
+"""
+Rollup, retention and reads of the tiered GMP history against a throwaway
+SQLite database.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert
+
+from models import IPO, GMPPrice, GMPBucket
+from services.gmp_history import (
+    rollup_gmp_history, fetch_gmp_history, bucket_start, RAW_DAYS, HOURLY_DAYS, RAW, HOUR, DAY,
+)
+from services.ipo_queries import fetch_ipo_listing, TREND_POINTS
+from conftest import TempDB
+
+NOW = datetime(2026, 10, 17, 12, 30)
+DAYS = 120
+
+def price_at(i: int) -> float:
+    return float(40 + (i * 7) % 13)
+
+class HistoryDB(TempDB):
+    """A TempDB seeded with GMP samples: two-hourly for IPO 1, a few old ones for IPO 2."""
+    def __init__(self):
+        super().__init__()
+        self.samples = []
+        with self.engine.begin() as conn:
+            conn.execute(insert(IPO), [
+                {"id": 1, "name": "Alpha Tech", "ipo_type": "Mainboard"},
+                {"id": 2, "name": "Beta Foods", "ipo_type": "SME"},
+            ])
+            # IPO 1: a sample every two hours for DAYS days
+            start = NOW - timedelta(days=DAYS)
+            for i in range(DAYS * 12):
+                self.samples.append((start + timedelta(hours=2 * i), price_at(i)))
+            rows = [{"ipo_id": 1, "price": p, "updated_at": at} for at, p in self.samples]
+            # IPO 2: stopped being scraped a month ago
+            rows += [{"ipo_id": 2, "price": 10.0 + i, "updated_at": NOW - timedelta(days=30, hours=10 - i)} for i in range(5)]
+            conn.execute(insert(GMPPrice), rows)
+
+    def rollup(self, now):
+        session = self.Session()
+        try:
+            stats = rollup_gmp_history(session, now)
+            session.commit()
+            return stats
+        finally:
+            session.close()
+
+def total_samples(session, ipo_id) -> int:
+    raw = session.query(func.count(GMPPrice.id)).filter(GMPPrice.ipo_id == ipo_id).scalar()
+    bucketed = session.query(func.coalesce(func.sum(GMPBucket.samples), 0)).filter(GMPBucket.ipo_id == ipo_id).scalar()
+    return raw + bucketed
+
+def test_rollup_moves_samples_down_the_tiers():
+    with HistoryDB() as db:
+        stats = db.rollup(NOW)
+        assert stats["raw_rolled"] > 0 and stats["hourly_rolled"] > 0
+
+        raw_cutoff = bucket_start(NOW - timedelta(days=RAW_DAYS), HOUR)
+        hourly_cutoff = bucket_start(NOW - timedelta(days=HOURLY_DAYS), DAY)
+        session = db.Session()
+        assert session.query(func.min(GMPPrice.updated_at)).filter(GMPPrice.ipo_id == 1).scalar() >= raw_cutoff
+        hours = session.query(GMPBucket).filter_by(ipo_id=1, resolution=HOUR)
+        assert all(hourly_cutoff <= b.bucket_start < raw_cutoff for b in hours)
+        days = session.query(GMPBucket).filter_by(ipo_id=1, resolution=DAY).all()
+        assert days and all(b.bucket_start < hourly_cutoff for b in days)
+
+        # Nothing lost, and a day's OHLC matches its raw samples
+        assert total_samples(session, 1) == len(db.samples)
+        day = days[3]
+        prices = [p for at, p in db.samples if bucket_start(at, DAY) == day.bucket_start]
+        assert (day.open, day.high, day.low, day.close, day.samples) == (prices[0], max(prices), min(prices), prices[-1], len(prices))
+
+        # The latest sample of an IPO that is no longer scraped stays raw
+        assert session.query(GMPPrice).filter_by(ipo_id=2).one().price == 14.0
+        assert total_samples(session, 2) == 5
+        session.close()
+
+def test_rollup_is_incremental():
+    with HistoryDB() as db:
+        db.rollup(NOW)
+        assert db.rollup(NOW) == {"raw_rolled": 0, "hourly_rolled": 0, "daily_expired": 0}
+
+        stats = db.rollup(NOW + timedelta(days=1))
+        # One more day of two-hourly samples aged out of each tier
+        assert stats["raw_rolled"] == 12
+        assert stats["hourly_rolled"] == 12
+        session = db.Session()
+        assert total_samples(session, 1) == len(db.samples)
+        session.close()
+
+def test_history_resolution_follows_window():
+    with HistoryDB() as db:
+        db.rollup(NOW)
+        session = db.Session()
+
+        recent = fetch_gmp_history(session, 1, NOW - timedelta(days=3), NOW)
+        assert len(recent) == 3 * 12
+        assert all(p["samples"] == 1 for p in recent)
+
+        month = fetch_gmp_history(session, 1, NOW - timedelta(days=30), NOW)
+        # Hourly points, one per two-hour sample; raw ones bucketed to the hour
+        assert all(p["time"].minute == 0 for p in month)
+        assert sum(p["samples"] for p in month) == 30 * 12
+
+        everything = fetch_gmp_history(session, 1)
+        assert all(p["time"] == bucket_start(p["time"], DAY) for p in everything)
+        assert sum(p["samples"] for p in everything) == len(db.samples)
+        assert everything[-1]["close"] == db.samples[-1][1]
+
+        # Asking for raw points of rolled-up history returns the stored buckets
+        old = fetch_gmp_history(session, 1, NOW - timedelta(days=20), NOW - timedelta(days=19), resolution=RAW)
+        # Both ends of the window are inclusive
+        assert len(old) == 13 and all(p["time"].minute == 0 for p in old)
+        session.close()
+
+def test_trend_shows_latest_points():
+    with HistoryDB() as db:
+        db.rollup(NOW)
+        session = db.Session()
+        trends = {row["id"]: row["trend"] for row in fetch_ipo_listing(session)}
+        assert len(trends[1]) == TREND_POINTS
+        assert trends[1][-1] == {"price": db.samples[-1][1], "date": NOW.strftime("%Y-%m-%d")}
+        # Closes of the rolled-up buckets, then the raw sample kept as the latest
+        assert [p["price"] for p in trends[2]] == [10.0, 11.0, 12.0, 13.0, 14.0]
+        session.close()
+
+if __name__ == "__main__":
+    test_rollup_moves_samples_down_the_tiers()
+    test_rollup_is_incremental()
+    test_history_resolution_follows_window()
+    test_trend_shows_latest_points()
+    print("GMP history OK")
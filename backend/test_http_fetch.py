@@ -0,0 +1,145 @@
+"""
+Offline checks for the HTTP-first scraper tier, against a local stub server
+that serves the recorded pages in fixtures/ with ETag / Last-Modified.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from scrapers.fetch import HTTPFetcher
+from scrapers.chittorgarh import ChittorgarhScraper
+from scrapers.ipowatch import IPOWatchScraper
+import scrapers.base
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LAST_MODIFIED = "Mon, 12 Oct 2026 06:00:00 GMT"
+
+class StubHandler(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        name = self.path.lstrip("/")
+        if name == "no-table.html":
+            body = b"<html><body><div id='app'>Loading...</div></body></html>"
+        else:
+            path = os.path.join(FIXTURES_DIR, name)
+            if not os.path.exists(path):
+                self.send_response(404)
+                self.end_headers()
+                return
+            with open(path, "rb") as f:
+                body = f.read()
+
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            StubHandler.hits.append((name, 304))
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        StubHandler.hits.append((name, 200))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub():
+    server = HTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+async def no_browser():
+    raise AssertionError("browser should not be launched")
+
+def test_conditional_get():
+    server, base = start_stub()
+    fetcher = HTTPFetcher()
+    try:
+        first = fetcher.fetch(f"{base}/ipowatch.html")
+        second = fetcher.fetch(f"{base}/ipowatch.html")
+        assert first and first == second
+        assert fetcher.last_status[f"{base}/ipowatch.html"] == "304"
+        assert StubHandler.hits[-2:] == [("ipowatch.html", 200), ("ipowatch.html", 304)]
+    finally:
+        fetcher.close()
+        server.shutdown()
+
+def test_http_tier_serves_table_without_browser():
+    server, base = start_stub()
+    fetcher = HTTPFetcher()
+    original = scrapers.base.http_fetcher
+    scrapers.base.http_fetcher = fetcher
+
+    class StubChittorgarh(ChittorgarhScraper):
+        url = f"{base}/chittorgarh.html"
+
+    try:
+        scraper = StubChittorgarh()
+        records = asyncio.run(scraper.run(no_browser))
+        assert len(records) == 150
+        assert scraper.last_fetch_mode == "http"
+
+        records = asyncio.run(scraper.run(no_browser))
+        assert len(records) == 150
+        assert scraper.last_fetch_mode == "http-304"
+    finally:
+        scrapers.base.http_fetcher = original
+        fetcher.close()
+        server.shutdown()
+
+def test_missing_table_escalates_to_browser():
+    server, base = start_stub()
+    fetcher = HTTPFetcher()
+    original = scrapers.base.http_fetcher
+    scrapers.base.http_fetcher = fetcher
+    launched = []
+
+    class StubIPOWatch(IPOWatchScraper):
+        url = f"{base}/no-table.html"
+
+        async def scrape_with_browser(self, browser):
+            return [browser]
+
+    async def fake_browser():
+        launched.append(True)
+        return "browser"
+
+    try:
+        scraper = StubIPOWatch()
+        records = asyncio.run(scraper.run(fake_browser))
+        assert records == ["browser"]
+        assert launched == [True]
+        assert scraper.last_fetch_mode == "browser"
+    finally:
+        scrapers.base.http_fetcher = original
+        fetcher.close()
+        server.shutdown()
+
+def test_scraper_without_table_parser_fails_to_instantiate():
+    class NoParser(scrapers.base.BaseScraper):
+        source = "none"
+
+        async def scrape_page(self, page):
+            return []
+
+    try:
+        NoParser()
+        assert False, "a scraper without parse_tables should not instantiate"
+    except TypeError as e:
+        assert "parse_tables" in str(e)
+
+if __name__ == "__main__":
+    test_conditional_get()
+    test_http_tier_serves_table_without_browser()
+    test_missing_table_escalates_to_browser()
+    test_scraper_without_table_parser_fails_to_instantiate()
+    print("HTTP fetch tier OK")
@@ -0,0 +1,174 @@
+"""
+/ipos/{id} payload and the per-IPO detail cache, without starting the app.
+"""
+import json
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from models import IPO, GMPPrice
+from services.data_version import DataVersionWatcher
+from services.ipo_detail import IPODetailCache, build_ipo_detail
+from services.vote_buffer import VoteBuffer
+import services.ipo_merger as merger
+from conftest import MergerEnv
+
+def test_detail_payload():
+    env = MergerEnv()
+    try:
+        env.merge()
+        session = env.Session()
+        ipo_id = session.query(IPO.id).filter_by(name_key="alpha tech").scalar()
+        now = datetime.utcnow()
+        session.execute(insert(GMPPrice), [
+            {"ipo_id": ipo_id, "price": price, "updated_at": now - timedelta(days=3 - i)}
+            for i, price in enumerate([30.0, 50.0, 35.0])
+        ])
+        session.commit()
+
+        detail = build_ipo_detail(session, ipo_id, resolution="raw")
+        assert detail["name"] == "Alpha Tech"
+        assert (detail["open_date"], detail["close_date"], detail["listing_date"]) == ("2026-10-15", "2026-10-20", "2026-10-23")
+        assert (detail["type"], detail["lot_size"], detail["price_high"]) == ("Mainboard", 150, 100.0)
+        # What the detail page reads: oldest first, the last one is the
+        # current GMP written by the merge
+        assert [p["price"] for p in detail["gmp_history"]] == [30.0, 50.0, 35.0, 42.0]
+        assert detail["gmp_history"][-1]["date"] == now.strftime("%Y-%m-%d")
+        assert (detail["gmp_high"], detail["gmp_low"], detail["gmp_change"]) == (50.0, 30.0, 12.0)
+        assert detail["estimated_listing_price"] == 142.0
+
+        recent = build_ipo_detail(session, ipo_id, days=2)
+        assert [p["price"] for p in recent["gmp_history"]] == [35.0, 42.0]
+
+        assert build_ipo_detail(session, 9999) is None
+        session.close()
+    finally:
+        env.close()
+
+def test_cache_hits_until_invalidated():
+    cache = IPODetailCache()
+    builds = []
+
+    def builder():
+        builds.append(1)
+        return {"id": 1, "builds": len(builds)}
+
+    first = cache.get_or_build(1, ("raw", None), builder)
+    assert cache.get_or_build(1, ("raw", None), builder) is first
+    assert len(builds) == 1
+
+    # Other parameters are their own entry, and all go with the IPO
+    cache.get_or_build(1, ("day", 30), builder)
+    cache.get_or_build(2, ("raw", None), builder)
+    cache.invalidate([1])
+    assert len(cache) == 1
+    rebuilt = cache.get_or_build(1, ("raw", None), builder)
+    assert json.loads(rebuilt.body)["builds"] == 4
+    assert rebuilt.etag != first.etag
+
+    assert cache.get_or_build(3, ("raw", None), lambda: None) is None
+
+def test_cache_ttl_and_lru():
+    cache = IPODetailCache(max_entries=2, ttl=0.05)
+    cache.get_or_build(1, (), lambda: {"id": 1})
+    cache.get_or_build(2, (), lambda: {"id": 2})
+    cache.get_or_build(1, (), lambda: {"id": "rebuilt"})
+    cache.get_or_build(3, (), lambda: {"id": 3})
+    # 2 was the least recently used
+    assert sorted(key[0] for key in cache._entries) == [1, 3]
+
+    time.sleep(0.06)
+    assert json.loads(cache.get_or_build(1, (), lambda: {"id": "expired"}).body) == {"id": "expired"}
+
+def test_build_racing_a_write_is_not_stored():
+    cache = IPODetailCache()
+
+    def builder():
+        # The merger commits while this body is being built
+        cache.invalidate([1])
+        return {"id": 1, "stale": True}
+
+    assert json.loads(cache.get_or_build(1, (), builder).body)["stale"]
+    assert len(cache) == 0
+
+def test_merger_invalidates_touched_ipos():
+    env = MergerEnv()
+    original = merger.ipo_detail_cache
+    merger.ipo_detail_cache = cache = IPODetailCache()
+    try:
+        env.merge()
+        session = env.Session()
+        ipo_id = session.query(IPO.id).filter_by(name_key="alpha tech").scalar()
+        session.close()
+        cache.get_or_build(ipo_id, (), lambda: {"id": ipo_id})
+        cache.get_or_build(9999, (), lambda: {"id": 9999})
+
+        env.merge()
+        assert [key[0] for key in cache._entries] == [9999]
+    finally:
+        merger.ipo_detail_cache = original
+        env.close()
+
+def test_etag_is_the_same_on_every_replica():
+    # Two API processes that built the same body, one after some local
+    # invalidations and a clear
+    a, b = IPODetailCache(), IPODetailCache()
+    a.invalidate([1])
+    a.clear()
+    first = a.get_or_build(1, (), lambda: {"id": 1, "gmp": 42.0})
+    assert first.etag == b.get_or_build(1, (), lambda: {"id": 1, "gmp": 42.0}).etag
+    assert first.etag.startswith('"ipo-1-')
+    a.invalidate([1])
+    assert a.get_or_build(1, (), lambda: {"id": 1, "gmp": 43.0}).etag != first.etag
+
+def test_vote_flushes_keep_unrelated_entries():
+    env = MergerEnv()
+    try:
+        env.merge()
+        session = env.Session()
+        ids = [ipo_id for ipo_id, in session.query(IPO.id).order_by(IPO.id)]
+        session.close()
+
+        cache = IPODetailCache()
+        watcher = DataVersionWatcher(env.Session)
+        watcher.subscribe(lambda scope, version: cache.follow_versions(watcher.versions, env.Session))
+        watcher.poll()
+
+        def build_all():
+            session = env.Session()
+            try:
+                return [cache.get_or_build(ipo_id, (), lambda: build_ipo_detail(session, ipo_id)) for ipo_id in ids]
+            finally:
+                session.close()
+
+        entries = build_all()
+        # Another process flushes votes for the first IPO
+        votes = VoteBuffer(env.Session)
+        session = env.Session()
+        votes.load(session, ids[0])
+        session.close()
+        votes.add(ids[0], "bullish")
+        votes.flush()
+        watcher.poll()
+
+        again = build_all()
+        assert again[0] is not entries[0] and json.loads(again[0].body)["sentiment_bullish"] == 1
+        assert again[1] is entries[1]
+
+        # Any other write drops everything
+        env.merge()
+        watcher.poll()
+        assert len(cache) == 0
+    finally:
+        env.close()
+
+if __name__ == "__main__":
+    test_detail_payload()
+    test_cache_hits_until_invalidated()
+    test_cache_ttl_and_lru()
+    test_build_racing_a_write_is_not_stored()
+    test_merger_invalidates_touched_ipos()
+    test_etag_is_the_same_on_every_replica()
+    test_vote_flushes_keep_unrelated_entries()
+    print("IPO detail OK")
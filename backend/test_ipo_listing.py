@@ -0,0 +1,91 @@
+"""
+Filters, field projection and keyset paging of /ipos, run against the
+snapshot table of a throwaway SQLite database.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from models import IPO
+from services.snapshot import refresh_snapshots, fetch_snapshot_page, fetch_snapshot_listing, LISTING_FIELDS
+from conftest import MergerEnv
+
+START = date(2026, 1, 1)
+
+def listing_env(count: int = 30) -> MergerEnv:
+    env = MergerEnv()
+    session = env.Session()
+    session.execute(insert(IPO), [
+        {
+            "name": f"IPO {i}",
+            "ipo_type": "SME" if i % 3 == 0 else "Mainboard",
+            "status": ["Open", "Upcoming", "Closed"][i % 3],
+            "open_date": START + timedelta(days=i),
+            "price_band": "₹100",
+        }
+        for i in range(count)
+    ])
+    refresh_snapshots(session)
+    session.commit()
+    session.close()
+    return env
+
+def test_unfiltered_listing_is_unchanged():
+    env = listing_env()
+    try:
+        session = env.Session()
+        rows = fetch_snapshot_listing(session)
+        assert len(rows) == 30
+        assert list(rows[0]) == LISTING_FIELDS
+        assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+        assert rows[0]["trend"] == []
+        session.close()
+    finally:
+        env.close()
+
+def test_filters_and_projection():
+    env = listing_env()
+    try:
+        session = env.Session()
+        rows, next_after = fetch_snapshot_page(session, fields=["name", "status"], status=["open"], ipo_type=["sme"])
+        assert next_after is None
+        # Every third IPO is an open SME
+        assert len(rows) == 10
+        assert all(list(row) == ["name", "status"] and row["status"] == "Open" for row in rows)
+
+        rows, _ = fetch_snapshot_page(session, fields=["name"], open_from=START + timedelta(days=5), open_to=START + timedelta(days=9))
+        assert [row["name"] for row in rows] == [f"IPO {i}" for i in range(5, 10)]
+
+        rows, _ = fetch_snapshot_page(session, status=["Upcoming", "Closed"])
+        assert len(rows) == 20
+        session.close()
+    finally:
+        env.close()
+
+def test_keyset_pages_cover_everything_once():
+    env = listing_env()
+    try:
+        session = env.Session()
+        seen, after, pages = [], None, 0
+        while True:
+            rows, after = fetch_snapshot_page(session, fields=["id"], limit=7, after=after)
+            seen += [row["id"] for row in rows]
+            pages += 1
+            if after is None:
+                break
+        assert pages == 5 and len(seen) == 30 and len(set(seen)) == 30
+
+        env.statements.clear()
+        fetch_snapshot_page(session, fields=["id", "gmp"], ipo_type=["SME"], limit=3, after=seen[10])
+        sql = env.statements[-1].upper()
+        # Filters, projection and the page bound are all in the query
+        assert "LIMIT" in sql and "LOWER" in sql and "TREND" not in sql
+        session.close()
+    finally:
+        env.close()
+
+if __name__ == "__main__":
+    test_unfiltered_listing_is_unchanged()
+    test_filters_and_projection()
+    test_keyset_pages_cover_everything_once()
+    print("IPO listing OK")
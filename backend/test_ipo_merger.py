@@ -0,0 +1,161 @@
+"""
+Offline checks for the merger's write path against a throwaway SQLite
+database: one transaction per run, upserts instead of per-IPO commits, and
+a clean rollback when the run fails half way.
+"""
+from sqlalchemy import text
+
+from datetime import date, datetime, timedelta
+
+from migrations import run_migrations
+from models import IPO, GMPPrice, IPOSnapshot
+from services.gmp_writer import GMPChangeWriter
+import services.ipo_merger as merger
+from conftest import TempDB, MergerEnv, SCRAPED
+
+def test_merge_writes_in_one_transaction():
+    env = MergerEnv()
+    try:
+        env.merge()
+        writes = [s for s in env.statements if s.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))]
+        # IPO upsert, GMP insert, snapshot writes; no per-IPO statements
+        assert sum(s.lstrip().upper().startswith("INSERT INTO IPOS") for s in writes) == 1
+        assert sum("gmp_prices" in s for s in writes) == 1
+
+        env.merge()
+        session = env.Session()
+        ipos = {ipo.name_key: ipo for ipo in session.query(IPO)}
+        assert set(ipos) == {"alpha tech", "beta foods"}
+        alpha = ipos["alpha tech"]
+        assert (alpha.lot_size, alpha.listing_date, alpha.price_band) == (150, date(2026, 10, 23), "95-100")
+        assert (alpha.price_low, alpha.price_high) == (95.0, 100.0)
+        # Same GMP as the first run, so no second sample
+        assert session.query(GMPPrice).filter_by(ipo_id=alpha.id).count() == 1
+        assert session.get(IPOSnapshot, alpha.id).gmp == 42.0
+        session.close()
+    finally:
+        env.close()
+
+def test_merge_keeps_details_no_source_has():
+    env = MergerEnv()
+    try:
+        env.merge()
+        saved = SCRAPED["chittorgarh"]
+        SCRAPED["chittorgarh"] = []
+        try:
+            env.merge()
+        finally:
+            SCRAPED["chittorgarh"] = saved
+
+        session = env.Session()
+        alpha = session.query(IPO).filter_by(name_key="alpha tech").one()
+        assert (alpha.lot_size, alpha.listing_date) == (150, date(2026, 10, 23))
+        # IPOWatch's band replaces Chittorgarh's, with its parsed ends
+        assert (alpha.price_band, alpha.price_low, alpha.price_high) == ("₹100", 100.0, 100.0)
+        session.close()
+    finally:
+        env.close()
+
+def test_gmp_written_on_change_and_heartbeat():
+    env = MergerEnv()
+    try:
+        env.merge()
+        env.merge()
+
+        SCRAPED["ipowatch"][0]["gmp"] = 45.0
+        try:
+            env.merge()
+        finally:
+            SCRAPED["ipowatch"][0]["gmp"] = 42.0
+
+        # A fresh process loads the last values from the DB, and a zero
+        # heartbeat writes unchanged values too
+        merger.gmp_writer = GMPChangeWriter(heartbeat=timedelta(0))
+        env.merge()
+
+        session = env.Session()
+        alpha = session.query(IPO).filter_by(name_key="alpha tech").one()
+        beta = session.query(IPO).filter_by(name_key="beta foods").one()
+        prices = [g.price for g in session.query(GMPPrice).filter_by(ipo_id=alpha.id).order_by(GMPPrice.id)]
+        assert prices == [42.0, 45.0, 42.0]
+        assert session.query(GMPPrice).filter_by(ipo_id=beta.id).count() == 2
+        session.close()
+    finally:
+        env.close()
+
+def test_failed_merge_rolls_back():
+    env = MergerEnv()
+    original_refresh = merger.refresh_snapshots
+
+    def broken_refresh(session, ipo_ids):
+        raise RuntimeError("snapshot refresh failed")
+
+    merger.refresh_snapshots = broken_refresh
+    try:
+        try:
+            env.merge()
+            assert False, "merge should have failed"
+        except RuntimeError:
+            pass
+
+        session = env.Session()
+        assert session.query(IPO).count() == 0
+        assert session.query(GMPPrice).count() == 0
+        session.close()
+        assert merger.known_names.index is not None and merger.known_names.index.get("alpha tech") is None
+    finally:
+        merger.refresh_snapshots = original_refresh
+        env.close()
+
+def test_migrations_backfill_existing_rows():
+    with TempDB(migrate=False) as db:
+        engine = db.engine
+        with engine.begin() as conn:
+            # ipos as created before the name_key column existed
+            conn.execute(text("CREATE TABLE ipos (id INTEGER PRIMARY KEY, name VARCHAR, symbol VARCHAR, ipo_type VARCHAR, "
+                              "open_date VARCHAR, close_date VARCHAR, listing_date VARCHAR, price_band VARCHAR, "
+                              "lot_size INTEGER, issue_size VARCHAR, status VARCHAR, kostak_rate FLOAT, "
+                              "retail_subscription_x FLOAT, allotment_url VARCHAR, sentiment_bullish INTEGER, "
+                              "sentiment_bearish INTEGER)"))
+            conn.execute(text("INSERT INTO ipos (id, name, price_band, open_date) VALUES "
+                              "(1, 'Alpha Tech Ltd', '₹93.00 to ₹103.00', '2026-10-15'), "
+                              "(2, 'Alpha Tech IPO', NULL, '15 Oct'), (3, 'Beta Foods', '50', '')"))
+
+        run_migrations(engine)
+        run_migrations(engine)
+
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, name_key, price_low, price_high, open_date FROM ipos ORDER BY id")).all()
+        assert [tuple(r) for r in rows] == [
+            (1, "alpha tech", 93.0, 103.0, "2026-10-15"),
+            (2, None, None, None, None),
+            (3, "beta foods", 50.0, 50.0, None),
+        ]
+
+def test_compaction_migration_keeps_changes_and_latest():
+    with TempDB() as db:
+        engine = db.engine
+        start = datetime(2026, 10, 1)
+        prices = [10, 10, 10, 12, 12, 10, 10, 10]
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO ipos (id, name) VALUES (1, 'Alpha Tech')"))
+            conn.execute(text("INSERT INTO gmp_prices (ipo_id, price, updated_at) VALUES (1, :price, :at)"),
+                         [{"price": p, "at": start + timedelta(hours=i)} for i, p in enumerate(prices)])
+            conn.execute(text("DELETE FROM schema_migrations WHERE version = '0002_compact_gmp_runs'"))
+
+        run_migrations(engine)
+
+        with engine.connect() as conn:
+            kept = conn.execute(text("SELECT price, updated_at FROM gmp_prices ORDER BY updated_at")).all()
+        hours = [(datetime.fromisoformat(str(at)) - start).seconds // 3600 for _, at in kept]
+        assert [p for p, _ in kept] == [10, 12, 10, 10]
+        assert hours == [0, 3, 5, 7]
+
+if __name__ == "__main__":
+    test_merge_writes_in_one_transaction()
+    test_merge_keeps_details_no_source_has()
+    test_gmp_written_on_change_and_heartbeat()
+    test_failed_merge_rolls_back()
+    test_migrations_backfill_existing_rows()
+    test_compaction_migration_keeps_changes_and_latest()
+    print("Merger write path OK")
@@ -0,0 +1,110 @@
+"""
+orjson encoding and compressed cached responses, through a small app
+rather than main.py so no database or scheduler is needed.
+"""
+import json
+from datetime import date, datetime
+
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+import services.json_response as json_response
+from services.json_response import dumps, pick_encoding, brotli, COMPRESS_MIN_BYTES
+from services.response_cache import ResponseCache
+
+def test_dumps_matches_default_encoding():
+    payload = {
+        "listing_date": date(2026, 10, 23),
+        "time": datetime(2026, 10, 17, 9, 30, 15, 250),
+        "trend": [{"price": 1.5, "date": "2026-10-17"}],
+        "name": "₹ Alpha",
+        "lot": None,
+    }
+    assert json.loads(dumps(payload)) == jsonable_encoder(payload)
+
+def real_payloads():
+    """/ipos, /ipos/{id} and /market-indices bodies built from a merged DB."""
+    from main import fetch_indices
+    from models import IPO, MarketIndex
+    from services.ipo_detail import build_ipo_detail
+    from services.snapshot import fetch_snapshot_listing
+    from test_ipo_merger import MergerEnv
+
+    env = MergerEnv()
+    try:
+        env.merge()
+        session = env.Session()
+        session.add(MarketIndex(name="NIFTY 50", current_price=25123.45, change_percent=-0.05,
+                                last_updated=datetime(2026, 10, 17, 9, 30, 15, 250)))
+        session.commit()
+        ipo_id = session.query(IPO.id).filter_by(name_key="alpha tech").scalar()
+        payloads = [fetch_snapshot_listing(session), build_ipo_detail(session, ipo_id), fetch_indices(session)]
+        session.close()
+        return payloads
+    finally:
+        env.close()
+
+def test_real_responses_keep_their_shape():
+    # Byte for byte what JSONResponse sent before, for every read route
+    for payload in real_payloads():
+        assert payload
+        expected = JSONResponse(jsonable_encoder(payload)).body
+        assert dumps(payload) == expected
+
+        # ...with or without orjson installed
+        original = json_response.orjson
+        json_response.orjson = None
+        try:
+            assert dumps(payload) == expected
+        finally:
+            json_response.orjson = original
+
+def test_pick_encoding():
+    assert pick_encoding(None) is None
+    assert pick_encoding("identity") is None
+    assert pick_encoding("gzip, deflate") == "gzip"
+    assert pick_encoding("gzip;q=0, deflate") is None
+    assert pick_encoding("br;q=0.5, gzip") == "gzip"
+    assert pick_encoding("gzip, deflate, br") == ("br" if brotli else "gzip")
+
+def client() -> TestClient:
+    app = FastAPI()
+    cache = ResponseCache()
+    big = [{"id": i, "name": f"IPO {i}", "trend": [{"price": 1.0, "date": "2026-10-17"}] * 5} for i in range(200)]
+
+    @app.get("/big")
+    def get_big(request: Request):
+        return cache.respond(request, "big", lambda: big)
+
+    @app.get("/small")
+    def get_small(request: Request):
+        return cache.respond(request, "small", lambda: {"ok": True})
+
+    return TestClient(app)
+
+def test_cached_responses_are_compressed():
+    c = client()
+    plain = c.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and len(plain.content) >= COMPRESS_MIN_BYTES
+
+    r = c.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["vary"] == "Accept-Encoding"
+    assert r.json() == plain.json()
+    assert r.headers["etag"] != plain.headers["etag"]
+    assert int(r.headers["content-length"]) < len(plain.content)
+
+    again = c.get("/big", headers={"Accept-Encoding": "gzip", "If-None-Match": r.headers["etag"]})
+    assert again.status_code == 304
+
+    small = c.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers and small.json() == {"ok": True}
+
+if __name__ == "__main__":
+    test_dumps_matches_default_encoding()
+    test_real_responses_keep_their_shape()
+    test_pick_encoding()
+    test_cached_responses_are_compressed()
+    print("JSON responses OK")
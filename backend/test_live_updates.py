@@ -0,0 +1,112 @@
+"""
+SSE broker: one reload per data version however many streams are open,
+diffs of only what changed, and slow clients cut off instead of buffered.
+"""
+import asyncio
+import json
+
+from services.data_version import bump_data_version, IPOS_SCOPE
+from services.live_updates import LiveBroker, LIVE_QUEUE_SIZE
+from services.snapshot import fetch_snapshot_listing
+from models import IPOSnapshot
+from conftest import MergerEnv
+
+def parse(chunk: bytes):
+    event, data = chunk.decode().strip().split("\n")
+    return event.split(": ", 1)[1], json.loads(data.split(": ", 1)[1])
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, session):
+        self.calls += 1
+        return fetch_snapshot_listing(session)
+
+def set_gmp(env, ipo_id, gmp):
+    session = env.Session()
+    session.query(IPOSnapshot).filter_by(ipo_id=ipo_id).update({IPOSnapshot.gmp: gmp})
+    version = bump_data_version(session, IPOS_SCOPE)
+    session.commit()
+    session.close()
+    return version
+
+def test_diffs_fan_out_from_one_reload():
+    env = MergerEnv()
+    try:
+        env.merge()
+        loader = CountingLoader()
+        broker = LiveBroker(env.Session, {IPOS_SCOPE: (loader, "id")})
+
+        async def scenario():
+            broker.start(asyncio.get_running_loop())
+            streams = [broker.stream([IPOS_SCOPE]) for _ in range(200)]
+            for stream in streams:
+                assert await stream.__anext__() == b"retry: 3000\n\n"
+                event, snapshot = parse(await stream.__anext__())
+                assert event == "snapshot" and len(snapshot["rows"]) == 2
+            assert loader.calls == 1
+
+            version = set_gmp(env, 1, 99.0)
+            # What the DataVersionWatcher thread does on its next poll
+            await asyncio.to_thread(broker.notify, IPOS_SCOPE, version)
+            diffs = [parse(await stream.__anext__()) for stream in streams]
+            assert loader.calls == 2
+            event, diff = diffs[0]
+            assert event == "diff" and diff["version"] == version
+            assert [row["id"] for row in diff["changed"]] == [1] and diff["changed"][0]["gmp"] == 99.0
+            assert diff["removed"] == []
+            assert all(d == diffs[0] for d in diffs)
+
+            # The same version again, or a write that changed nothing we show
+            await broker.refresh(IPOS_SCOPE, version)
+            await broker.refresh(IPOS_SCOPE, set_gmp(env, 1, 99.0))
+            assert all(s.queue.empty() for s in broker.streams)
+
+            # New connections get the current state
+            late = broker.stream([IPOS_SCOPE])
+            await late.__anext__()
+            event, snapshot = parse(await late.__anext__())
+            assert {row["id"]: row["gmp"] for row in snapshot["rows"]}[1] == 99.0
+            # ...from the snapshot kept at the last reload
+            assert loader.calls == 3
+
+            for stream in streams + [late]:
+                await stream.aclose()
+            assert not broker.streams
+            broker.stop()
+
+        asyncio.run(scenario())
+    finally:
+        env.close()
+
+def test_idle_client_kept_alive_and_slow_client_dropped():
+    env = MergerEnv()
+    try:
+        env.merge()
+        broker = LiveBroker(env.Session, {IPOS_SCOPE: (fetch_snapshot_listing, "id")})
+
+        async def scenario():
+            broker.start(asyncio.get_running_loop())
+            idle = broker.stream([IPOS_SCOPE], heartbeat=0.01)
+            await idle.__anext__()
+            await idle.__anext__()
+            assert await idle.__anext__() == b": keep-alive\n\n"
+
+            # The client stops reading while events pile up
+            for n in range(LIVE_QUEUE_SIZE + 1):
+                broker.publish(IPOS_SCOPE, b"event: diff\ndata: {}\n\n")
+            assert len(broker.streams) == 0
+            # It reads what is left, then the stream ends
+            chunks = [chunk async for chunk in idle]
+            assert len(chunks) == LIVE_QUEUE_SIZE - 1
+            assert all(chunk.startswith(b"event: diff") for chunk in chunks)
+
+        asyncio.run(scenario())
+    finally:
+        env.close()
+
+if __name__ == "__main__":
+    test_diffs_fan_out_from_one_reload()
+    test_idle_client_kept_alive_and_slow_client_dropped()
+    print("Live updates OK")
@@ -0,0 +1,104 @@
+"""
+Market data updater against a fake yf.download: the tickers are fetched in
+concurrent chunks and written with one preload query and one upsert.
+"""
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import event
+
+import services.market_data as market_data
+from models import MarketIndex
+from services.data_version import read_data_versions, MARKET_SCOPE
+from conftest import TempDB
+
+DOWNLOAD_SECONDS = 0.1
+
+class FakeDownload:
+    """Stands in for yf.download: two daily closes per ticker, after a delay."""
+    def __init__(self, days=("2026-10-15", "2026-10-16"), bump=0.0):
+        self.days = pd.to_datetime(list(days))
+        self.bump = bump
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, tickers, period=None, **kwargs):
+        with self.lock:
+            self.calls.append((list(tickers), period))
+        time.sleep(DOWNLOAD_SECONDS)
+        frames = {}
+        for n, ticker in enumerate(tickers):
+            closes = [100.0 + n + i * 10 + self.bump for i in range(len(self.days))]
+            frames[ticker] = pd.DataFrame({"Open": closes, "Close": closes}, index=self.days)
+        return pd.concat(frames, axis=1)
+
+def run(db, fake):
+    statements = []
+    count = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", count)
+    original = market_data.yf.download
+    market_data.yf.download = fake
+    session = db.Session()
+    try:
+        started = time.perf_counter()
+        changed = market_data.update_market_data(session)
+        return changed, time.perf_counter() - started, statements
+    finally:
+        market_data.yf.download = original
+        session.close()
+        event.remove(db.engine, "before_cursor_execute", count)
+
+def test_update_is_chunked_and_batched():
+    with TempDB() as db:
+        fake = FakeDownload()
+        changed, seconds, statements = run(db, fake)
+
+        tickers = len(market_data.INDICES) + len(market_data.NIFTY_50_TICKERS)
+        assert changed == tickers
+        assert all(period == market_data.MARKET_DATA_PERIOD for _, period in fake.calls)
+        assert sum(len(chunk) for chunk, _ in fake.calls) == tickers
+        # The chunks download concurrently
+        assert len(fake.calls) > 1
+        assert seconds < DOWNLOAD_SECONDS * len(fake.calls)
+
+        # Preload, upsert, version bump
+        touching = [s for s in statements if "market_indices" in s]
+        assert len(touching) == 2
+        assert len(statements) <= 4
+        print(f"\n{tickers} tickers in {len(fake.calls)} chunks: {seconds * 1000:.0f}ms, {len(statements)} statements")
+
+        session = db.Session()
+        nifty = session.query(MarketIndex).filter_by(name="NIFTY 50").one()
+        assert (nifty.current_price, nifty.change_percent) == (110.0, 10.0)
+        assert session.query(MarketIndex).count() == tickers
+        assert read_data_versions(session) == {MARKET_SCOPE: 1}
+        session.close()
+
+        # Same prices again: nothing changed, caches stay valid
+        changed, _, _ = run(db, FakeDownload())
+        assert changed == 0
+        session = db.Session()
+        assert read_data_versions(session) == {MARKET_SCOPE: 1}
+        session.close()
+
+def test_single_day_window_uses_stored_previous_close():
+    with TempDB() as db:
+        run(db, FakeDownload())
+        # Later the same day only today's row comes back
+        changed, _, _ = run(db, FakeDownload(days=("2026-10-16",), bump=1.0))
+        assert changed == len(market_data.INDICES) + len(market_data.NIFTY_50_TICKERS)
+
+        session = db.Session()
+        nifty = session.query(MarketIndex).filter_by(name="NIFTY 50").one()
+        # 100 -> 101 against the previous close of 100
+        assert nifty.current_price == 101.0
+        assert nifty.change_percent == 1.0
+        assert nifty.last_updated == datetime(2026, 10, 16)
+        session.close()
+
+if __name__ == "__main__":
+    test_update_is_chunked_and_batched()
+    test_single_day_window_uses_stored_previous_close()
+    print("Market data OK")
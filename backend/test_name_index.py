@@ -0,0 +1,65 @@
+"""
+NameIndex: exact hits, the score threshold, prefix blocking, and the
+stricter index used against names already in the DB.
+"""
+from services.name_index import NameIndex, strict_name_index
+
+def test_exact_hit_and_threshold():
+    index = NameIndex()
+    index.add("alpha tech", 1)
+    index.add("alpha tech", 2)
+    assert len(index) == 1 and index.get("alpha tech") == 2
+    assert index.match("alpha tech") == ("alpha tech", 2, 100.0)
+
+    key, value, score = index.match("alpah tech")
+    assert (key, value) == ("alpha tech", 2) and 85 < score < 100
+    # Shares a stem but is nowhere near the threshold
+    assert index.match("alpha foods") is None
+    assert index.match("") is None
+
+def test_blocking_by_token_prefix():
+    index = NameIndex(max_block=2)
+    index.add("zeta metals", 1)
+    # No stem in common: never scored, even though it would match
+    assert index.match("ztea metls") is None
+    assert index.match("zeta metls")[1] == 1
+
+    # A common stem's block is skipped when a selective one exists
+    for n, name in enumerate(["shree ram", "shree krishna", "shree ganesh"], start=2):
+        index.add(name, n)
+    assert index._candidates("shree zeta") == [0]
+    # ...and used when it is the only one
+    assert index._candidates("shree ramm") == [1, 2, 3]
+    assert index.match("shree ramm")[1] == 2
+
+def test_subset_names_are_distinct_issuers_in_the_db():
+    # Within a scrape, a subset of words is another spelling of the same IPO
+    run = NameIndex()
+    run.add("shree sai industries", 1)
+    assert run.match("shree sai")[1] == 1
+
+    # Against the DB it is a different issuer
+    known = strict_name_index()
+    known.add("shree sai industries", 1)
+    known.add("shree sai", 2)
+    assert known.match("shree sai") == ("shree sai", 2, 100.0)
+    known = strict_name_index()
+    known.add("shree sai industries", 1)
+    assert known.match("shree sai") is None
+    assert known.match("shree sai industry")[1] == 1
+    # Same words in another order still match
+    assert known.match("sai shree industries")[1] == 1
+
+def test_match_many():
+    known = strict_name_index()
+    known.add("alpha tech", 1)
+    known.add("beta foods", 2)
+    hits = known.match_many(["alpha tech", "beta food", "gamma"])
+    assert [hit and hit[1] for hit in hits] == [1, 2, None]
+
+if __name__ == "__main__":
+    test_exact_hit_and_threshold()
+    test_blocking_by_token_prefix()
+    test_subset_names_are_distinct_issuers_in_the_db()
+    test_match_many()
+    print("Name index OK")
@@ -0,0 +1,133 @@
+"""
+Batch predictions: the vectorized results match the one-IPO-at-a-time
+rules they replace, and a whole grid costs one snapshot query.
+"""
+import time
+
+from sqlalchemy import event
+
+from models import IPO, IPOSnapshot
+from services.predictions import Scenario, predict_batch
+from conftest import TempDB
+
+def reference(snap, lots, category):
+    """The per-request logic of the old /predict/profit and /predict/allotment."""
+    lot_size = snap.lot_size
+    if lot_size == 0 and snap.base_price > 0:
+        lot_size = int(15000 / snap.base_price)
+    elif lot_size == 0:
+        lot_size = 1
+    profit = {
+        "ipo_name": snap.name, "estimated_profit": snap.gmp * lot_size * lots,
+        "investment_amount": snap.base_price * lot_size * lots,
+        "gmp": snap.gmp, "lot_size": lot_size, "lots": lots,
+    }
+
+    growth_pct = snap.growth_percent
+    probability = "High"
+    details = "Low demand expected, allotment likely."
+    if growth_pct > 50:
+        probability = "Very Low"
+        details = f"GMP is very high ({growth_pct:.1f}%). Oversubscription likely > 50x. Lottery basis."
+    elif growth_pct > 20:
+        probability = "Low"
+        if category == "RII" and lots > 1:
+            details = "High demand. Applying for >1 lot in Retail usually doesn't increase chance (1 lot lottery)."
+        else:
+            details = "Moderate to High demand. Lottery basis likely."
+    elif growth_pct < 5:
+        probability = "High"
+        details = "Low GMP suggests low subscription interest."
+    allotment = {"ipo_name": snap.name, "probability": probability, "reasoning": details, "category": category}
+    return {"profit": profit, "allotment": allotment}
+
+def seed(db, count):
+    session = db.Session()
+    for i in range(1, count + 1):
+        base_price = [0.0, 95.0, 250.0, 1200.0][i % 4]
+        gmp = [0.0, 3.0, 30.0, 140.0, 700.0][i % 5]
+        session.add(IPO(id=i, name=f"IPO {i}", name_key=f"ipo {i}", ipo_type="Mainboard", status="Open"))
+        session.add(IPOSnapshot(
+            ipo_id=i, name=f"IPO {i}", ipo_type="Mainboard", status="Open",
+            lot_size=[0, 150, 14, 0][i % 4], base_price=base_price, gmp=gmp,
+            growth_percent=gmp / base_price * 100 if base_price else 0.0,
+        ))
+    session.commit()
+    session.close()
+
+def test_batch_matches_single_rules():
+    with TempDB() as db:
+        seed(db, 50)
+        scenarios = [Scenario(ipo_id, lots, category)
+                     for ipo_id in range(1, 51) for lots in (1, 2, 5) for category in ("RII", "HNI")]
+        scenarios.append(Scenario(999, 1, "RII"))
+
+        statements = []
+        count = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", count)
+        session = db.Session()
+        try:
+            started = time.perf_counter()
+            results = predict_batch(session, scenarios)
+            seconds = time.perf_counter() - started
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+
+        # Snapshots in one query, plus one to see whether 999 exists
+        assert len(statements) == 2
+        assert results[-1] is None
+        for scenario, result in zip(scenarios[:-1], results):
+            snap = session.get(IPOSnapshot, scenario.ipo_id)
+            assert result == reference(snap, scenario.lots, scenario.category), scenario
+        session.close()
+        print(f"\n{len(scenarios)} scenarios in {seconds * 1000:.1f}ms, {len(statements)} statements")
+
+def test_batch_endpoint():
+    from fastapi.testclient import TestClient
+    import main
+    from models import get_session
+
+    with TempDB() as db:
+        seed(db, 3)
+
+        def session_override():
+            session = db.Session()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        main.app.dependency_overrides[get_session] = session_override
+        try:
+            client = TestClient(main.app)
+            response = client.post("/predict/batch", json={"scenarios": [
+                {"ipo_id": 2, "lots": 2}, {"ipo_id": 7}, {"ipo_id": 3, "lots": 1, "category": "HNI"},
+            ]})
+            assert response.status_code == 200
+            results = response.json()["results"]
+            assert [r["ipo_id"] for r in results] == [2, 7, 3]
+            assert results[0]["profit"]["lot_size"] == 14 and results[0]["profit"]["lots"] == 2
+            assert results[1] == {"ipo_id": 7, "lots": 1, "category": "RII", "error": "IPO not found"}
+            assert results[2]["allotment"]["category"] == "HNI"
+
+            single = client.post("/predict/profit", json={"ipo_id": 2, "lots": 2}).json()
+            assert single == results[0]["profit"]
+            assert client.post("/predict/allotment", json={"ipo_id": 7, "category": "RII", "lots_applied": 1}).status_code == 404
+
+            # Out-of-range lots are a validation error, not an overflow
+            huge = {"ipo_id": 2, "lots": 10 ** 20}
+            assert client.post("/predict/batch", json={"scenarios": [huge]}).status_code == 422
+            assert client.post("/predict/batch", json={"scenarios": [{"ipo_id": 2, "lots": 0}]}).status_code == 422
+            assert client.post("/predict/profit", json=huge).status_code == 422
+            edge = client.post("/predict/batch", json={"scenarios": [{"ipo_id": 2, "lots": main.MAX_LOTS}]})
+            assert edge.status_code == 200 and edge.json()["results"][0]["profit"]["lots"] == main.MAX_LOTS
+
+            too_many = [{"ipo_id": 1}] * (main.MAX_BATCH_SCENARIOS + 1)
+            assert client.post("/predict/batch", json={"scenarios": too_many}).status_code == 400
+        finally:
+            main.app.dependency_overrides.pop(get_session, None)
+
+if __name__ == "__main__":
+    test_batch_matches_single_rules()
+    test_batch_endpoint()
+    print("Predictions OK")
@@ -0,0 +1,48 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot read queries on a migrated SQLite
+database, so a dropped or reshaped index shows up as a failing test instead
+of a slow endpoint.
+"""
+from datetime import date
+
+from sqlalchemy import select, text
+
+from models import IPO
+from services.ipo_queries import latest_gmp_query, trend_query
+from conftest import TempDB
+
+GMP_INDEX = "ix_gmp_prices_ipo_id_updated_at"
+
+def query_plan(engine, stmt) -> list:
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        return [row[3] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+def test_latest_gmp_reads_the_composite_index_in_order():
+    with TempDB() as db:
+        engine = db.engine
+        plan = query_plan(engine, latest_gmp_query())
+        assert f"SCAN gmp_prices USING INDEX {GMP_INDEX}" in plan, plan
+        # Index order matches the window's ORDER BY, so nothing is sorted
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+def test_gmp_lookups_for_some_ipos_search_the_index():
+    with TempDB() as db:
+        engine = db.engine
+        for stmt in (latest_gmp_query([1, 2]), trend_query(ipo_ids=[1, 2])):
+            plan = query_plan(engine, stmt)
+            assert f"SEARCH gmp_prices USING INDEX {GMP_INDEX} (ipo_id=?)" in plan, plan
+
+def test_open_date_range_uses_index():
+    with TempDB() as db:
+        engine = db.engine
+        stmt = select(IPO.id).where(IPO.open_date.between(date(2026, 10, 1), date(2026, 10, 31)))
+        plan = query_plan(engine, stmt)
+        assert any(step.startswith("SEARCH ipos") and "INDEX ix_ipos_open_date (open_date>? AND open_date<?)" in step
+                   for step in plan), plan
+
+if __name__ == "__main__":
+    test_latest_gmp_reads_the_composite_index_in_order()
+    test_gmp_lookups_for_some_ipos_search_the_index()
+    test_open_date_range_uses_index()
+    print("Query plans OK")
@@ -0,0 +1,105 @@
+"""
+Cached GET responses: ETags and 304s, invalidation when a data version
+moves, and builds that raced a write not being kept.
+"""
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from services.data_version import IPOS_SCOPE, MARKET_SCOPE
+from services.response_cache import ResponseCache, WithHeaders, MAX_ENTRIES_PER_SCOPE
+
+def app_with(cache: ResponseCache, data: dict, builds: list) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/ipos")
+    def ipos(request: Request):
+        def build():
+            builds.append(request.url.query)
+            return WithHeaders(data["ipos"], {"X-Next-Cursor": "7"})
+        return cache.respond(request, IPOS_SCOPE, build)
+
+    @app.get("/market-indices")
+    def market(request: Request):
+        return cache.respond(request, MARKET_SCOPE, lambda: data["market"])
+
+    return TestClient(app)
+
+def test_etag_and_304():
+    cache, builds = ResponseCache(), []
+    data = {"ipos": [{"id": 1, "gmp": 42.0}], "market": []}
+    client = app_with(cache, data, builds)
+    cache.set_version(IPOS_SCOPE, 3)
+
+    first = client.get("/ipos")
+    assert first.status_code == 200 and first.json() == data["ipos"]
+    etag = first.headers["etag"]
+    assert etag.startswith('"ipos-3-')
+    assert first.headers["cache-control"] == "no-cache"
+    assert first.headers["x-next-cursor"] == "7"
+
+    for if_none_match in [etag, f"W/{etag}", f'"other", {etag}', "*"]:
+        response = client.get("/ipos", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304 and response.content == b""
+        # Extra headers go out with the 304 too
+        assert response.headers["etag"] == etag and response.headers["x-next-cursor"] == "7"
+    assert client.get("/ipos", headers={"If-None-Match": '"other"'}).status_code == 200
+    # One build for all of the above; another query string is its own entry
+    assert builds == [""]
+    client.get("/ipos?status=Open")
+    assert builds == ["", "status=Open"]
+
+    # Another replica at the same version gives the same ETag
+    other = ResponseCache()
+    other.set_version(IPOS_SCOPE, 3)
+    assert app_with(other, data, []).get("/ipos").headers["etag"] == etag
+
+def test_version_moves_invalidate_one_scope():
+    cache, builds = ResponseCache(), []
+    data = {"ipos": [{"id": 1, "gmp": 42.0}], "market": [{"name": "NIFTY"}]}
+    client = app_with(cache, data, builds)
+    cache.set_version(IPOS_SCOPE, 1)
+    cache.set_version(MARKET_SCOPE, 1)
+    etag = client.get("/ipos").headers["etag"]
+    market_etag = client.get("/market-indices").headers["etag"]
+
+    # A write elsewhere: the same If-None-Match now gets the new body
+    data["ipos"] = [{"id": 1, "gmp": 50.0}]
+    cache.set_version(IPOS_SCOPE, 2)
+    response = client.get("/ipos", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.json()[0]["gmp"] == 50.0
+    assert response.headers["etag"].startswith('"ipos-2-') and len(builds) == 2
+    # The market scope kept its entry
+    assert client.get("/market-indices", headers={"If-None-Match": market_etag}).status_code == 304
+
+    # An older version arriving late changes nothing
+    cache.set_version(IPOS_SCOPE, 1)
+    assert cache.version(IPOS_SCOPE) == 2
+    assert client.get("/ipos", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert len(builds) == 2
+
+def test_build_racing_a_version_move_is_not_kept():
+    cache = ResponseCache()
+    cache.set_version(IPOS_SCOPE, 1)
+
+    def builder():
+        # The data version moves while this body is being built
+        cache.set_version(IPOS_SCOPE, 2)
+        return ["stale"]
+
+    entry = cache.get_or_build(IPOS_SCOPE, "/ipos", builder)
+    assert entry.version == 1
+    assert cache.get_or_build(IPOS_SCOPE, "/ipos", lambda: ["fresh"]).body == b'["fresh"]'
+
+def test_entries_per_scope_are_bounded():
+    cache = ResponseCache()
+    for n in range(MAX_ENTRIES_PER_SCOPE + 10):
+        cache.get_or_build(IPOS_SCOPE, f"/ipos?page={n}", lambda: [n])
+    assert len(cache._entries[IPOS_SCOPE]) == MAX_ENTRIES_PER_SCOPE
+    assert "/ipos?page=0" not in cache._entries[IPOS_SCOPE]
+
+if __name__ == "__main__":
+    test_etag_and_304()
+    test_version_moves_invalidate_one_scope()
+    test_build_racing_a_version_move_is_not_kept()
+    test_entries_per_scope_are_bounded()
+    print("Response cache OK")
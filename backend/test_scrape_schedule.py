@@ -0,0 +1,182 @@
+"""
+Adaptive scrape schedule: intervals by IST market phase, backoff while a
+source keeps returning the same data, and scraping a subset of sources.
+"""
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+from services.scrape_schedule import AdaptiveSchedule, MAX_INTERVAL, RETRY_INTERVAL, fingerprint
+from conftest import MergerEnv, SCRAPED, fake_run_scrapers
+from models import IPO, IPOSnapshot
+from scrapers.base import ScrapedIPOData
+from scrapers.ipowatch import IPOWatchScraper
+from scrapers.runner import ScrapeResult, run_scrapers_async
+import services.ipo_merger as merger
+import worker
+
+# Naive UTC, like the worker; IST is UTC+5:30
+MONDAY_SESSION = datetime(2026, 10, 19, 4, 30)   # 10:00 IST
+MONDAY_NIGHT = datetime(2026, 10, 19, 17, 30)    # 23:00 IST
+SATURDAY_NOON = datetime(2026, 10, 17, 6, 30)    # 12:00 IST
+
+def minutes(schedule, source, now, hot=False):
+    return schedule.interval(source, now, hot).total_seconds() / 60
+
+def test_intervals_follow_market_hours():
+    schedule = AdaptiveSchedule(["ipowatch", "chittorgarh", "market"], holidays=set())
+    assert minutes(schedule, "market", MONDAY_SESSION) == 15
+    assert minutes(schedule, "market", MONDAY_NIGHT) == 240
+    assert minutes(schedule, "market", SATURDAY_NOON) == 240
+    assert minutes(schedule, "ipowatch", MONDAY_SESSION) == 60
+    assert minutes(schedule, "ipowatch", SATURDAY_NOON) == 180
+    assert minutes(schedule, "chittorgarh", MONDAY_NIGHT) == 360
+
+    # An open IPO speeds the GMP sources up, even on a weekend
+    assert minutes(schedule, "ipowatch", SATURDAY_NOON, hot=True) == 15
+    assert minutes(schedule, "ipowatch", MONDAY_NIGHT, hot=True) == 120
+    assert minutes(schedule, "chittorgarh", MONDAY_SESSION, hot=True) == 60
+
+    # Exchange holidays count as closed days
+    holiday = AdaptiveSchedule(["market"], holidays={date(2026, 10, 19)})
+    assert minutes(holiday, "market", MONDAY_SESSION) == 240
+
+def test_unchanged_sources_back_off():
+    schedule = AdaptiveSchedule(["ipowatch"], holidays=set())
+    now = MONDAY_SESSION
+    assert schedule.due(now, hot=True) == ["ipowatch"]
+
+    schedule.record("ipowatch", now, "a")
+    assert schedule.due(now + timedelta(minutes=14), hot=True) == []
+    assert schedule.due(now + timedelta(minutes=15), hot=True) == ["ipowatch"]
+
+    schedule.record("ipowatch", now, "a")
+    schedule.record("ipowatch", now, "a")
+    assert minutes(schedule, "ipowatch", now, hot=True) == 60
+    for _ in range(10):
+        schedule.record("ipowatch", now, "a")
+    assert schedule.interval("ipowatch", now, True) == MAX_INTERVAL
+
+    # Changed data goes straight back to the base interval
+    schedule.record("ipowatch", now, "b")
+    assert minutes(schedule, "ipowatch", now, hot=True) == 15
+
+    # A failure retries soon without forgetting the fingerprint
+    schedule.record("ipowatch", now, None, failed=True)
+    assert schedule.interval("ipowatch", MONDAY_NIGHT, False) == RETRY_INTERVAL
+    schedule.record("ipowatch", now, "b")
+    assert minutes(schedule, "ipowatch", now, hot=True) == 30
+
+def test_due_follows_the_current_phase():
+    schedule = AdaptiveSchedule(["market"], holidays=set())
+    before_open = datetime(2026, 10, 19, 3, 30)   # 09:00 IST
+    schedule.record("market", before_open, "a")
+    # Planned 4h out before the open, but due 15 minutes into the session
+    assert schedule.due(before_open + timedelta(minutes=10), hot=False) == []
+    assert schedule.due(before_open + timedelta(minutes=30), hot=False) == ["market"]
+
+def scrape(**changes):
+    return [
+        ScrapedIPOData(source="ipowatch", **dict(item, **changes.get(item["name"], {})))
+        for item in SCRAPED["ipowatch"]
+    ]
+
+def test_fingerprint_ignores_order_and_scrape_time():
+    first = scrape()
+    time.sleep(0.01)
+    # Scraped again later: the same data, a later gmp_updated
+    second = scrape()
+    assert first[0].gmp_updated != second[0].gmp_updated
+    assert fingerprint(first) == fingerprint(second)
+    assert fingerprint(first) == fingerprint(list(reversed(second)))
+    assert fingerprint(first) != fingerprint(scrape(**{"Alpha Tech Ltd": dict(gmp=43.0)}))
+
+    # ...so identical scrapes back off
+    schedule = AdaptiveSchedule(["ipowatch"], holidays=set())
+    schedule.record("ipowatch", MONDAY_SESSION, fingerprint(first))
+    schedule.record("ipowatch", MONDAY_SESSION, fingerprint(second))
+    assert minutes(schedule, "ipowatch", MONDAY_SESSION, hot=True) == 30
+
+def test_partial_scrape_keeps_other_sources():
+    env = MergerEnv()
+    try:
+        env.merge()
+        saved = SCRAPED["ipowatch"]
+        SCRAPED["ipowatch"] = [dict(saved[0], gmp=55.0)]
+        try:
+            # Only investorgain is due; chittorgarh's details and the last
+            # ipowatch records still take part in the merge
+            results = env.merge(["investorgain"])
+        finally:
+            SCRAPED["ipowatch"] = saved
+
+        assert [r.source for r in results] == ["investorgain"]
+        session = env.Session()
+        ipos = {ipo.name_key: ipo for ipo in session.query(IPO)}
+        assert set(ipos) == {"alpha tech", "beta foods"}
+        assert ipos["alpha tech"].lot_size == 150
+        assert session.get(IPOSnapshot, ipos["alpha tech"].id).gmp == 42.0
+        session.close()
+    finally:
+        env.close()
+
+class UnreachablePage:
+    async def goto(self, url, **kwargs):
+        raise TimeoutError(f"{url} timed out")
+
+class UnreachableIPOWatch(IPOWatchScraper):
+    async def run(self, get_browser):
+        return await self.scrape_page(UnreachablePage())
+
+def test_scraper_errors_reach_the_result():
+    result, = asyncio.run(run_scrapers_async([UnreachableIPOWatch()]))
+    assert result.source == "ipowatch" and result.records == []
+    assert "timed out" in result.error
+
+def failing_run_scrapers(scrapers):
+    return [
+        ScrapeResult(source=s.source, error="timed out") if s.source == "ipowatch" else result
+        for s, result in zip(scrapers, fake_run_scrapers(scrapers))
+    ]
+
+def test_failed_source_keeps_records_and_retries():
+    env = MergerEnv()
+    original = (worker.DBSession, worker.schedule)
+    try:
+        env.merge()
+        merger.run_scrapers = failing_run_scrapers
+        worker.DBSession = env.Session
+        worker.schedule = AdaptiveSchedule(["ipowatch", "investorgain"], holidays=set())
+        # Both unchanged once already, so backed off
+        for source in worker.schedule.states:
+            worker.schedule.record(source, MONDAY_SESSION, "same")
+            worker.schedule.record(source, MONDAY_SESSION, "same")
+
+        worker.scrape_sources(["ipowatch", "investorgain"], MONDAY_SESSION)
+
+        # ipowatch's last records still give Alpha its GMP and Beta its row
+        session = env.Session()
+        ipos = {ipo.name_key: ipo for ipo in session.query(IPO)}
+        assert set(ipos) == {"alpha tech", "beta foods"}
+        assert session.get(IPOSnapshot, ipos["alpha tech"].id).gmp == 42.0
+        session.close()
+        assert merger.source_records["ipowatch"]
+
+        # The failed source retries soon; the other ran fine
+        state = worker.schedule.states["ipowatch"]
+        assert state.failed and state.fingerprint == "same"
+        assert worker.schedule.interval("ipowatch", MONDAY_NIGHT, False) == RETRY_INTERVAL
+        assert not worker.schedule.states["investorgain"].failed
+    finally:
+        worker.DBSession, worker.schedule = original
+        env.close()
+
+if __name__ == "__main__":
+    test_intervals_follow_market_hours()
+    test_unchanged_sources_back_off()
+    test_due_follows_the_current_phase()
+    test_fingerprint_ignores_order_and_scrape_time()
+    test_partial_scrape_keeps_other_sources()
+    test_scraper_errors_reach_the_result()
+    test_failed_source_keeps_records_and_retries()
+    print("Scrape schedule OK")
@@ -0,0 +1,71 @@
+"""
+Scraper runner: every source concurrently, one shared browser launched
+only when a source needs it, results in the order of the scrapers.
+"""
+import asyncio
+import time
+
+import scrapers.runner as runner
+from scrapers.ipowatch import IPOWatchScraper
+from scrapers.runner import run_scrapers_async
+
+class FakePlaywright:
+    launches = 0
+
+    def __init__(self):
+        self.chromium = self
+        self.stopped = False
+
+    async def start(self):
+        return self
+
+    async def launch(self, headless=True):
+        FakePlaywright.launches += 1
+        return self
+
+    async def close(self):
+        pass
+
+    async def stop(self):
+        self.stopped = True
+
+class SlowScraper(IPOWatchScraper):
+    def __init__(self, source, needs_browser):
+        self.source = source
+        self.needs_browser = needs_browser
+
+    async def run(self, get_browser):
+        if self.needs_browser:
+            await get_browser()
+        self.last_fetch_mode = "browser" if self.needs_browser else "http"
+        await asyncio.sleep(0.2)
+        return []
+
+def run(scrapers):
+    original = runner.async_playwright
+    runner.async_playwright = FakePlaywright
+    FakePlaywright.launches = 0
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(run_scrapers_async(scrapers))
+        return results, time.perf_counter() - started
+    finally:
+        runner.async_playwright = original
+
+def test_sources_run_concurrently_in_one_browser():
+    results, seconds = run([SlowScraper(f"site{n}", needs_browser=True) for n in range(5)])
+    # As long as the slowest one, not the sum
+    assert seconds < 0.6
+    assert [r.source for r in results] == [f"site{n}" for n in range(5)]
+    assert all(r.error is None and r.fetch_mode == "browser" for r in results)
+    assert FakePlaywright.launches == 1
+
+def test_http_only_cycle_never_launches_a_browser():
+    results, _ = run([SlowScraper("a", needs_browser=False), SlowScraper("b", needs_browser=False)])
+    assert [r.fetch_mode for r in results] == ["http", "http"]
+    assert FakePlaywright.launches == 0
+
+if __name__ == "__main__":
+    test_sources_run_concurrently_in_one_browser()
+    test_http_only_cycle_never_launches_a_browser()
+    print("Scraper runner OK")
@@ -0,0 +1,70 @@
+"""
+Request blocking in scraping contexts: images, media, fonts and foreign
+hosts aborted, the rest let through and counted. Playwright is replaced by
+stand-ins for the context, route and response objects.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from scrapers.context import host_allowed, new_scraping_context
+
+class FakeRoute:
+    def __init__(self, url, resource_type="document"):
+        self.request = SimpleNamespace(url=url, resource_type=resource_type)
+        self.outcome = None
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+    async def abort(self):
+        self.outcome = "aborted"
+
+class FakeContext:
+    def __init__(self):
+        self.handlers = {}
+
+    async def route(self, pattern, handler):
+        self.handlers["route"] = handler
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+class FakeBrowser:
+    async def new_context(self, user_agent=None):
+        return FakeContext()
+
+def test_host_allowed():
+    assert host_allowed("investorgain.com", ["investorgain.com"])
+    assert host_allowed("api.investorgain.com", ["investorgain.com"])
+    assert not host_allowed("notinvestorgain.com", ["investorgain.com"])
+    assert not host_allowed("doubleclick.net", ["investorgain.com"])
+    assert not host_allowed(None, ["investorgain.com"])
+
+def test_blocks_and_counts_requests():
+    async def scenario():
+        context, stats = await new_scraping_context(FakeBrowser(), ("investorgain.com",))
+        route_request = context.handlers["route"]
+        routes = [
+            FakeRoute("https://www.investorgain.com/report/live-ipo-gmp/331/"),
+            FakeRoute("https://webnodejs.investorgain.com/cloud/report/data", "fetch"),
+            FakeRoute("https://www.investorgain.com/logo.png", "image"),
+            FakeRoute("https://www.investorgain.com/font.woff2", "font"),
+            FakeRoute("https://securepubads.g.doubleclick.net/tag/js/gpt.js", "script"),
+            FakeRoute("data:image/png;base64,AAAA", "image"),
+        ]
+        for route in routes:
+            await route_request(route)
+        count_response = context.handlers["response"]
+        count_response(SimpleNamespace(headers={"content-length": "2048"}))
+        count_response(SimpleNamespace(headers={}))
+        return routes, stats
+
+    routes, stats = asyncio.run(scenario())
+    assert [r.outcome for r in routes] == ["continued", "continued", "aborted", "aborted", "aborted", "continued"]
+    # Inline data: URLs are neither network requests nor counted
+    assert (stats.allowed, stats.blocked, stats.bytes_received) == (2, 3, 2048)
+
+if __name__ == "__main__":
+    test_host_allowed()
+    test_blocks_and_counts_requests()
+    print("Scraping context OK")
@@ -0,0 +1,83 @@
+"""
+The ipo_snapshots read model after merges: rows equal to what the listing
+queries derive, refreshed for the IPOs a merge touched, rebuilt when rows
+are missing and dropped when their IPO goes.
+"""
+from models import IPO, IPOSnapshot, GMPPrice
+from services.ipo_queries import fetch_ipo_listing
+from services.snapshot import ensure_snapshots, fetch_snapshot_listing, get_snapshot, refresh_snapshots
+from conftest import MergerEnv, SCRAPED
+
+def derived(session):
+    """The listing rows computed from the source tables, by id."""
+    return {row["id"]: row for row in fetch_ipo_listing(session)}
+
+def snapshots(session):
+    return {row["id"]: row for row in fetch_snapshot_listing(session)}
+
+def assert_in_sync(session):
+    live, stored = derived(session), snapshots(session)
+    assert set(live) == set(stored)
+    for ipo_id, row in live.items():
+        for field, value in stored[ipo_id].items():
+            assert row[field] == value, (ipo_id, field, row[field], value)
+
+def test_merge_refreshes_snapshots():
+    env = MergerEnv()
+    try:
+        env.merge()
+        session = env.Session()
+        assert_in_sync(session)
+        alpha = session.query(IPO.id).filter_by(name_key="alpha tech").scalar()
+        assert snapshots(session)[alpha]["gmp"] == 42.0
+        session.close()
+
+        saved = SCRAPED["ipowatch"]
+        SCRAPED["ipowatch"] = [dict(saved[0], gmp=60.0), saved[1]]
+        try:
+            env.merge()
+        finally:
+            SCRAPED["ipowatch"] = saved
+
+        session = env.Session()
+        assert_in_sync(session)
+        row = snapshots(session)[alpha]
+        assert row["gmp"] == 60.0
+        assert row["growth_percent"] == round(60.0 / row["base_price"] * 100, 2)
+        assert [point["price"] for point in row["trend"]][-2:] == [42.0, 60.0]
+        session.close()
+    finally:
+        env.close()
+
+def test_missing_and_orphaned_snapshots():
+    env = MergerEnv()
+    try:
+        env.merge()
+        session = env.Session()
+        # An IPO written outside the merger, e.g. by seed_data.py
+        session.add(IPO(id=50, name="Gamma", name_key="gamma", ipo_type="SME", status="Upcoming", price_band="₹80"))
+        session.add(GMPPrice(ipo_id=50, price=8.0))
+        session.commit()
+        assert session.get(IPOSnapshot, 50) is None
+        assert get_snapshot(session, 50).gmp == 8.0
+
+        session.query(IPOSnapshot).delete()
+        session.commit()
+        ensure_snapshots(session)
+        assert_in_sync(session)
+
+        # A full refresh drops snapshots whose IPO is gone
+        session.query(GMPPrice).filter_by(ipo_id=50).delete()
+        session.query(IPO).filter_by(id=50).delete()
+        refresh_snapshots(session)
+        session.commit()
+        assert 50 not in snapshots(session)
+        assert_in_sync(session)
+        session.close()
+    finally:
+        env.close()
+
+if __name__ == "__main__":
+    test_merge_refreshes_snapshots()
+    test_missing_and_orphaned_snapshots()
+    print("Snapshots OK")
@@ -0,0 +1,159 @@
+"""
+Write-behind vote counter: concurrent votes are all counted, totals are
+visible before the flush, and a flush is a few relative UPDATEs.
+"""
+import threading
+
+from sqlalchemy import event
+
+from models import IPO, IPOSnapshot
+from services.data_version import read_data_versions, IPOS_SCOPE, SENTIMENT_SCOPE
+from services.vote_buffer import VoteBuffer
+from conftest import MergerEnv
+
+def stored(env, ipo_id):
+    session = env.Session()
+    try:
+        ipo, snap = session.get(IPO, ipo_id), session.get(IPOSnapshot, ipo_id)
+        return (ipo.sentiment_bullish, ipo.sentiment_bearish), (snap.sentiment_bullish, snap.sentiment_bearish)
+    finally:
+        session.close()
+
+def test_concurrent_votes_are_not_lost():
+    env = MergerEnv()
+    try:
+        env.merge()
+        buffer = VoteBuffer(env.Session, shards=4)
+        flushed = []
+        buffer.subscribe(lambda ipo_ids, version: flushed.append((ipo_ids, version)))
+        session = env.Session()
+        assert buffer.load(session, 1) and buffer.load(session, 2)
+        assert not buffer.load(session, 99)
+        session.close()
+
+        threads, votes = 8, 250
+        stop = threading.Event()
+
+        def vote(n):
+            for i in range(votes):
+                buffer.add(1 + i % 2, "bullish" if (n + i) % 3 else "bearish")
+
+        def flush_loop():
+            while not stop.is_set():
+                buffer.flush()
+
+        flusher = threading.Thread(target=flush_loop)
+        flusher.start()
+        voters = [threading.Thread(target=vote, args=(n,)) for n in range(threads)]
+        for t in voters:
+            t.start()
+        for t in voters:
+            t.join()
+        stop.set()
+        flusher.join()
+
+        total = sum(buffer.totals(1)) + sum(buffer.totals(2))
+        assert total == threads * votes
+        buffer.flush()
+        counts = [stored(env, ipo_id) for ipo_id in (1, 2)]
+        assert sum(sum(ipo) for ipo, snap in counts) == threads * votes
+        for ipo, snap in counts:
+            assert ipo == snap
+        assert counts[0][0] == buffer.totals(1)
+        assert flushed and flushed[-1][1] == len(flushed) + 1
+    finally:
+        env.close()
+
+def test_totals_before_flush_and_batched_write():
+    env = MergerEnv()
+    try:
+        env.merge()
+        buffer = VoteBuffer(env.Session)
+        session = env.Session()
+        buffer.load(session, 1)
+        session.close()
+
+        # Votes from another process are already in the database
+        session = env.Session()
+        session.query(IPO).filter_by(id=1).update({IPO.sentiment_bullish: 10})
+        session.commit()
+        session.close()
+
+        assert buffer.add(1, "bullish") == (1, 0)
+        assert buffer.add(1, "bearish") == (1, 1)
+
+        statements = []
+        count = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(env.engine, "before_cursor_execute", count)
+        try:
+            assert buffer.flush() == 2
+        finally:
+            event.remove(env.engine, "before_cursor_execute", count)
+        # IPO and snapshot updates, version bumps, totals read back
+        assert len(statements) == 5
+        assert buffer.totals(1) == (11, 1)
+        assert buffer.flush() == 0
+
+        session = env.Session()
+        assert read_data_versions(session) == {IPOS_SCOPE: 2, SENTIMENT_SCOPE: 1}
+        session.close()
+    finally:
+        env.close()
+
+def test_failed_flush_keeps_votes():
+    env = MergerEnv()
+    try:
+        env.merge()
+        session = env.Session()
+        buffer = VoteBuffer(env.Session)
+        buffer.load(session, 1)
+        session.close()
+        buffer.add(1, "bullish")
+        buffer.add(1, "bullish")
+
+        def broken():
+            raise RuntimeError("database down")
+        buffer.session_factory = broken
+        try:
+            buffer.flush()
+            assert False, "flush should fail"
+        except RuntimeError:
+            pass
+        assert buffer.totals(1) == (2, 0)
+
+        buffer.session_factory = env.Session
+        assert buffer.flush() == 2
+        assert stored(env, 1)[0] == (2, 0)
+    finally:
+        env.close()
+
+def test_votes_sharded_by_ipo():
+    buffer = VoteBuffer(lambda: None, shards=4)
+    for ipo_id in (1, 2, 5):
+        buffer.add(ipo_id, "bullish")
+    assert [sorted(shard.pending) for shard in buffer._shards] == [[], [1, 5], [2], []]
+    assert buffer.totals(5) == (1, 0)
+
+def test_flush_never_moves_the_cache_version_back():
+    from services.response_cache import ResponseCache
+    import main
+
+    original = main.response_cache
+    main.response_cache = ResponseCache()
+    try:
+        # The watcher already saw a later write from another process
+        main.response_cache.set_version(IPOS_SCOPE, 10)
+        main.apply_vote_flush([1], 7)
+        assert main.response_cache.version(IPOS_SCOPE) == 10
+        main.apply_vote_flush([1], 11)
+        assert main.response_cache.version(IPOS_SCOPE) == 11
+    finally:
+        main.response_cache = original
+
+if __name__ == "__main__":
+    test_concurrent_votes_are_not_lost()
+    test_totals_before_flush_and_batched_write()
+    test_failed_flush_keeps_votes()
+    test_votes_sharded_by_ipo()
+    test_flush_never_moves_the_cache_version_back()
+    print("Vote buffer OK")
@@ -0,0 +1,148 @@
+"""
+Scheduler lease and data version invalidation across processes, against a
+throwaway SQLite database.
+"""
+from datetime import datetime, timedelta
+
+from services.data_version import DataVersionWatcher, bump_data_version, read_data_versions, IPOS_SCOPE, MARKET_SCOPE
+from services.ipo_detail import IPODetailCache
+from services.leader_lease import LeaderLease
+from services.response_cache import ResponseCache
+from conftest import TempDB, MergerEnv
+
+def test_only_one_worker_holds_the_lease():
+    with TempDB() as db:
+        now = datetime(2026, 10, 17, 9, 0)
+        a = LeaderLease(db.Session, holder="a", ttl=60)
+        b = LeaderLease(db.Session, holder="b", ttl=60)
+
+        assert a.try_acquire(now)
+        assert not b.try_acquire(now)
+        # Renewing keeps it
+        assert a.try_acquire(now + timedelta(seconds=30))
+        assert not b.try_acquire(now + timedelta(seconds=80))
+        assert a.held(now + timedelta(seconds=80)) and not b.held(now + timedelta(seconds=80))
+
+        # a stops renewing; b takes over once it expires
+        later = now + timedelta(seconds=91)
+        assert not a.held(later)
+        assert b.try_acquire(later)
+        assert not a.try_acquire(later)
+
+        b.release()
+        assert a.try_acquire()
+
+def test_versions_reach_other_processes():
+    with TempDB() as db:
+        session = db.Session()
+        assert bump_data_version(session, IPOS_SCOPE) == 1
+        assert bump_data_version(session, IPOS_SCOPE) == 2
+        bump_data_version(session, MARKET_SCOPE)
+        session.commit()
+        assert read_data_versions(session) == {IPOS_SCOPE: 2, MARKET_SCOPE: 1}
+
+        # An API process with a cached listing
+        cache, details = ResponseCache(), IPODetailCache()
+        watcher = DataVersionWatcher(db.Session)
+        watcher.subscribe(cache.set_version)
+        watcher.subscribe(lambda scope, version: details.follow_versions(watcher.versions, db.Session))
+        assert watcher.poll() == {IPOS_SCOPE: 2, MARKET_SCOPE: 1}
+        listing = cache.get_or_build(IPOS_SCOPE, "/ipos", lambda: [1])
+        market = cache.get_or_build(MARKET_SCOPE, "/market-indices", lambda: [])
+        details.get_or_build(1, (), lambda: {"id": 1})
+        assert watcher.poll() == {}
+
+        # The worker commits a scrape
+        bump_data_version(session, IPOS_SCOPE)
+        session.commit()
+        assert watcher.poll() == {IPOS_SCOPE: 3}
+        assert cache.get_or_build(IPOS_SCOPE, "/ipos", lambda: [1, 2]) is not listing
+        assert cache.get_or_build(MARKET_SCOPE, "/market-indices", lambda: [0]) is market
+        assert len(details) == 0
+        session.close()
+
+def test_merge_bumps_the_ipos_version():
+    env = MergerEnv()
+    try:
+        env.merge()
+        env.merge()
+        session = env.Session()
+        assert read_data_versions(session) == {IPOS_SCOPE: 2}
+        session.close()
+    finally:
+        env.close()
+
+def test_new_leader_forgets_its_cached_state():
+    import worker
+    from models import IPO, GMPPrice
+
+    env = MergerEnv()
+    states = worker.schedule.states
+    try:
+        env.merge()
+        now = datetime.utcnow()
+        for source in worker.schedule.states:
+            worker.schedule.record(source, now, "same")
+        assert worker.schedule.due(now, hot=False) == []
+
+        # Another worker held the lease meanwhile and saw a different GMP
+        session = env.Session()
+        alpha = session.query(IPO).filter_by(name_key="alpha tech").one()
+        session.add(GMPPrice(ipo_id=alpha.id, price=50.0, updated_at=now))
+        session.commit()
+
+        worker.forget_cached_state()
+        assert worker.schedule.due(now, hot=False) == list(worker.schedule.states)
+        assert worker.ipo_merger.known_names.index is None
+        assert worker.ipo_merger.source_records == {}
+
+        # Back at 42, which differs from the other worker's row
+        env.merge()
+        prices = [p for p, in session.query(GMPPrice.price).filter_by(ipo_id=alpha.id).order_by(GMPPrice.id)]
+        assert prices == [42.0, 50.0, 42.0]
+        session.close()
+    finally:
+        worker.schedule.states = states
+        env.close()
+
+def test_workers_started_together_migrate_once():
+    import threading
+    import migrations
+    import worker
+
+    db = TempDB(migrate=False, connect_args={"timeout": 30})
+    original = (worker.engine, worker.DBSession, migrations.MIGRATIONS)
+    applied = []
+
+    def counted(version, migrate):
+        def run(conn):
+            applied.append(version)
+            migrate(conn)
+        return run
+
+    worker.engine, worker.DBSession = db.engine, db.Session
+    migrations.MIGRATIONS = [(version, counted(version, m)) for version, m in original[2]]
+    try:
+        start = threading.Barrier(4)
+
+        def start_worker(n):
+            start.wait()
+            worker.migrate(holder=f"worker-{n}", poll=0.05)
+
+        workers = [threading.Thread(target=start_worker, args=(n,)) for n in range(4)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        assert sorted(applied) == sorted(version for version, _ in original[2])
+    finally:
+        worker.engine, worker.DBSession, migrations.MIGRATIONS = original
+        db.close()
+
+if __name__ == "__main__":
+    test_only_one_worker_holds_the_lease()
+    test_versions_reach_other_processes()
+    test_merge_bumps_the_ipos_version()
+    test_new_leader_forgets_its_cached_state()
+    test_workers_started_together_migrate_once()
+    print("Worker OK")
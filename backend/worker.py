@@ -0,0 +1,216 @@
+"""
+Background worker: owns the scheduled scrape, market data and GMP rollup
+jobs, which the API processes no longer run. Scrapes and market data run
+from a one-minute tick that asks services.scrape_schedule which sources
+are due, so they follow IST market hours and back off when unchanged.
+Any number of workers may be started; a lease in the database
+(services.leader_lease) lets exactly one of them schedule at a time, and
+another takes over within SCHEDULER_LEASE_SECONDS when it dies. Startup
+migrations run under a lease of their own, so they are applied once.
+
+    python worker.py
+"""
+import datetime
+import os
+import signal
+import sys
+import time
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_PAUSED
+from sqlalchemy import inspect
+from sqlalchemy.exc import DBAPIError
+from models import engine, Session as DBSession, SchedulerLease
+from migrations import run_migrations
+from services.data_version import bump_data_version, IPOS_SCOPE
+from services.gmp_history import rollup_gmp_history
+from services import ipo_merger
+from services.ipo_merger import IPOMergerService
+from services.leader_lease import LeaderLease
+from services.market_data import update_market_data
+from services.scrape_schedule import (
+    AdaptiveSchedule, GMP_SOURCES, DETAIL_SOURCES, MARKET_SOURCE, IST, count_hot_ipos, fingerprint,
+)
+from services.snapshot import ensure_snapshots
+
+lease = LeaderLease(DBSession)
+
+# A worker that dies while migrating holds up the others this long
+MIGRATION_LEASE_SECONDS = float(os.getenv("MIGRATION_LEASE_SECONDS", "900"))
+schedule = AdaptiveSchedule(GMP_SOURCES + DETAIL_SOURCES + (MARKET_SOURCE,))
+
+# --- TASKS ---
+# Each job commits its data together with a bump of the data version, which
+# is how the API processes learn that their caches are stale.
+
+def leader_only(job):
+    def run():
+        # The lease may have been lost since the job was scheduled
+        if not lease.held():
+            print(f"Skipping {job.__name__}: scheduler lease not held")
+            return
+        job()
+    run.__name__ = job.__name__
+    return run
+
+def scrape_sources(sources, now):
+    print(f"Scraping {', '.join(sources)}...")
+    session = DBSession()
+    try:
+        service = IPOMergerService(session)
+        results = service.scrape_and_merge(sources)
+        for result in results:
+            schedule.record(result.source, now, fingerprint(result.records), failed=result.error is not None)
+    except Exception as e:
+        print(f"Scrape Job Failed: {e}")
+        for source in sources:
+            schedule.record(source, now, None, failed=True)
+    finally:
+        session.close()
+
+def market_data(now):
+    print("Running market data update...")
+    session = DBSession()
+    try:
+        changed = update_market_data(session)
+    except Exception as e:
+        print(f"Market Data Update Failed: {e}")
+        changed = None
+    finally:
+        session.close()
+
+    if changed is None:
+        schedule.record(MARKET_SOURCE, now, None, failed=True)
+    else:
+        # No price moved: same fingerprint as last time, which backs it off
+        previous = schedule.states[MARKET_SOURCE].fingerprint
+        schedule.record(MARKET_SOURCE, now, previous if changed == 0 else now.isoformat())
+
+@leader_only
+def scheduling_tick():
+    now = datetime.datetime.utcnow()
+    session = DBSession()
+    try:
+        today = now.replace(tzinfo=datetime.timezone.utc).astimezone(IST).date()
+        hot = count_hot_ipos(session, today) > 0
+    except Exception as e:
+        print(f"Hot IPO count failed: {e}")
+        hot = False
+    finally:
+        session.close()
+
+    due = schedule.due(now, hot)
+    sources = [s for s in due if s != MARKET_SOURCE]
+    if sources:
+        scrape_sources(sources, now)
+    if MARKET_SOURCE in due:
+        market_data(now)
+    if due:
+        print(f"Next runs{' (hot IPOs)' if hot else ''}: {schedule.describe(datetime.datetime.utcnow(), hot)}")
+
+@leader_only
+def gmp_rollup_job():
+    session = DBSession()
+    try:
+        stats = rollup_gmp_history(session)
+        if stats["raw_rolled"] or stats["hourly_rolled"] or stats["daily_expired"]:
+            bump_data_version(session, IPOS_SCOPE)
+        session.commit()
+        print(f"GMP history rollup: {stats}")
+    except Exception as e:
+        session.rollback()
+        print(f"GMP History Rollup Failed: {e}")
+    finally:
+        session.close()
+
+def forget_cached_state():
+    """
+    Drops what this worker remembers from its last term as leader. Another
+    worker may have scraped and written GMP rows since, so the caches are
+    reloaded from the DB and every source is due on the next tick.
+    """
+    ipo_merger.gmp_writer.clear()
+    ipo_merger.known_names.clear()
+    ipo_merger.source_records.clear()
+    schedule.reset()
+
+def build_scheduler() -> BackgroundScheduler:
+    scheduler = BackgroundScheduler()
+    # Sources are due per services.scrape_schedule; the tick only checks.
+    # max_instances=1 lets a long scrape delay the next tick instead of
+    # overlapping it.
+    scheduler.add_job(scheduling_tick, 'interval', minutes=1, max_instances=1, coalesce=True)
+    scheduler.add_job(gmp_rollup_job, 'interval', hours=1)
+    return scheduler
+
+def migrate(holder: Optional[str] = None, poll: float = 1.0):
+    """
+    Applies pending migrations while holding the "migrations" lease.
+    Workers started together wait for it in turn, and all but the first
+    find nothing left to apply.
+    """
+    try:
+        SchedulerLease.__table__.create(engine, checkfirst=True)
+    except DBAPIError:
+        # Created by another worker between the check and the CREATE
+        if not inspect(engine).has_table(SchedulerLease.__tablename__):
+            raise
+
+    migration_lease = LeaderLease(DBSession, name="migrations", holder=holder or lease.holder,
+                                  ttl=MIGRATION_LEASE_SECONDS)
+    while not migration_lease.try_acquire():
+        print(f"Worker {migration_lease.holder} waiting for another worker's migrations...")
+        time.sleep(poll)
+    try:
+        run_migrations(engine)
+    finally:
+        migration_lease.release()
+
+def stop(signum, frame):
+    raise SystemExit(0)
+
+def main():
+    migrate()
+    session = DBSession()
+    try:
+        ensure_snapshots(session)
+    finally:
+        session.close()
+
+    signal.signal(signal.SIGTERM, stop)
+    scheduler = build_scheduler()
+    print(f"Worker {lease.holder} waiting for the scheduler lease...")
+    try:
+        while True:
+            try:
+                leader = lease.try_acquire()
+            except Exception as e:
+                print(f"Scheduler lease renewal failed: {e}")
+                leader = lease.held()
+
+            if leader and not scheduler.running:
+                print(f"Worker {lease.holder} holds the scheduler lease; starting jobs.")
+                forget_cached_state()
+                scheduler.start()
+            elif leader and scheduler.state == STATE_PAUSED:
+                print(f"Worker {lease.holder} got the scheduler lease back; resuming jobs.")
+                forget_cached_state()
+                scheduler.resume()
+            elif not leader and scheduler.running and scheduler.state != STATE_PAUSED:
+                print(f"Worker {lease.holder} lost the scheduler lease; pausing jobs.")
+                scheduler.pause()
+
+            time.sleep(lease.ttl / 3)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        lease.release()
+        print(f"Worker {lease.holder} stopped.")
+
+if __name__ == "__main__":
+    main()
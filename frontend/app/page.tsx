@@ -10,6 +10,7 @@ import { PredictorModal } from "@/components/predictor-modal";
 import { AuthButton } from "@/components/auth-button";
 import { IPODrawer } from "@/components/ipo-drawer";
 import { ProfitCalculator, AllotmentProbability, SentimentVoting } from "@/components/detail-components";
+import { useLiveRows } from "@/lib/live";
 
 // --- COMPONENTS ---
 
@@ -61,9 +62,9 @@ function MarketTicker() {
       }
     }
     fetchData();
-    const interval = setInterval(fetchData, 60000); // Update every minute
-    return () => clearInterval(interval);
   }, []);
+  // Pushed by the API when the market data changes, instead of polling
+  useLiveRows<MarketIndex>("market", "name", setData);
 
   return (
     <div className="bg-white dark:bg-slate-900 border-b border-gray-200 dark:border-gray-800 text-xs py-2 overflow-hidden flex items-center h-10 w-full z-40 relative">
@@ -446,6 +447,8 @@ export default function Home() {
     }
     loadData();
   }, []);
+  // GMP, status and sentiment changes pushed by the API
+  useLiveRows<IPO>("ipos", "id", setIpos);
 
   useEffect(() => {
       let res = ipos;
@@ -1,6 +1,6 @@
 "use client";
-import { useEffect, useState } from 'react';
-import axios from 'axios';
+import { useState } from 'react';
+import { useLiveRows } from '@/lib/live';
 import { motion } from 'framer-motion';
 
 interface IndexData {
@@ -14,21 +14,8 @@ interface IndexData {
 export default function Ticker() {
   const [indices, setIndices] = useState<IndexData[]>([]);
 
-  useEffect(() => {
-    // In a real app, use SWR or React Query
-    const fetchData = async () => {
-      try {
-        const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
-        const res = await axios.get(`${API_URL}/market-indices`);
-        setIndices(res.data);
-      } catch (e) {
-        console.error("Failed to fetch ticker data", e);
-      }
-    };
-    fetchData();
-    const interval = setInterval(fetchData, 30000); // Update every 30s
-    return () => clearInterval(interval);
-  }, []);
+  // Snapshot on connect, then pushed whenever the market data changes
+  useLiveRows<IndexData>("market", "name", setIndices);
 
   if (indices.length === 0) return null;
 
@@ -24,23 +24,16 @@ export function PredictorModal({ ipos }: PredictorModalProps) {
     try {
       const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
-      // Parallel requests
-      const p1 = axios.post(`${API_URL}/predict/profit`, {
-        ipo_id: parseInt(selectedIPO),
-        lots: lots
+      // Profit and allotment in one request
+      const res = await axios.post(`${API_URL}/predict/batch`, {
+        scenarios: [{ ipo_id: parseInt(selectedIPO), lots: lots, category: category }]
       });
-
-      const p2 = axios.post(`${API_URL}/predict/allotment`, {
-        ipo_id: parseInt(selectedIPO),
-        category: category,
-        lots_applied: lots
-      });
-
-      const [resProfit, resAllotment] = await Promise.all([p1, p2]);
+      const [scenario] = res.data.results;
+      if (scenario.error) throw new Error(scenario.error);
 
       setResult({
-        profit: resProfit.data,
-        allotment: resAllotment.data
+        profit: scenario.profit,
+        allotment: scenario.allotment
       });
     } catch (e) {
       console.error(e);
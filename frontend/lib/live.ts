@@ -0,0 +1,34 @@
+"use client";
+import { useEffect } from "react";
+
+// Rows of one channel of the API's /stream endpoint ("ipos" or "market").
+// A snapshot replaces the rows; a diff replaces changed rows by key and
+// drops removed ones. EventSource reconnects by itself and gets a fresh
+// snapshot when it does.
+export function useLiveRows<T extends object>(
+  channel: "ipos" | "market",
+  key: keyof T,
+  setRows: (update: (rows: T[]) => T[]) => void
+) {
+  useEffect(() => {
+    const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+    const source = new EventSource(`${API_URL}/stream?channels=${channel}`);
+
+    source.addEventListener("snapshot", (e) => {
+      const { rows } = JSON.parse((e as MessageEvent).data);
+      setRows(() => rows);
+    });
+
+    source.addEventListener("diff", (e) => {
+      const { changed, removed } = JSON.parse((e as MessageEvent).data);
+      setRows((rows) => {
+        const byKey = new Map(rows.map((row) => [row[key], row]));
+        for (const row of changed as T[]) byKey.set(row[key], row);
+        for (const k of removed as T[keyof T][]) byKey.delete(k);
+        return Array.from(byKey.values());
+      });
+    });
+
+    return () => source.close();
+  }, [channel, key, setRows]);
+}